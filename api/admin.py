@@ -1,12 +1,30 @@
+import csv
+
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
-from .models import Post, StudentProfile
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils.html import format_html
+from . import images, profiling
+from .models import Post, ProfilingRule, StudentProfile
 
 class StudentProfileInline(admin.StackedInline):
     model = StudentProfile
     can_delete = False
     verbose_name_plural = 'Профіль студента'
+    readonly_fields = ('photo_thumbnail',)
+
+    @admin.display(description='Мініатюра фото')
+    def photo_thumbnail(self, obj):
+        photo = obj.student_id_photo if obj else None
+        if not photo:
+            return '—'
+        # Мініатюра важить кілька КБ - сторінка користувача не тягне повне фото
+        name = images.id_photo_thumbnail_name(photo.name)
+        src = photo.storage.url(name) if photo.storage.exists(name) else photo.url
+        return format_html('<a href="{}" target="_blank"><img src="{}" alt="" style="max-height:160px" loading="lazy"></a>', photo.url, src)
 
 class UserAdmin(BaseUserAdmin):
     inlines = (StudentProfileInline,)
@@ -14,4 +32,94 @@ class UserAdmin(BaseUserAdmin):
 
 admin.site.unregister(User)
 admin.site.register(User, UserAdmin)
-admin.site.register(Post)
+
+# Рядків, що читаються за раз під час експорту (на PostgreSQL - серверний курсор)
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FIELDS = ('id', 'title', 'slug', 'dorm_number', 'author__username', 'category__name', 'pinned',
+                 'is_published', 'created_at', 'updated_at')
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+class PostAdmin(admin.ModelAdmin):
+    list_display = ('title', 'dorm_number', 'author', 'category', 'pinned', 'is_published', 'created_at')
+    list_filter = ('dorm_number', 'pinned', 'is_published')
+    list_select_related = ('author', 'category')
+    search_fields = ('title',)
+    # Без COUNT(*) усієї таблиці на кожній сторінці списку
+    show_full_result_count = False
+    actions = ('export_csv',)
+
+    @admin.action(description='Експортувати вибрані пости в CSV')
+    def export_csv(self, request, queryset):
+        # .iterator() не кешує результат, а на PostgreSQL читає серверним
+        # курсором - пам'ять не росте з кількістю постів
+        rows = queryset.order_by('id').values_list(*EXPORT_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        writer = csv.writer(_Echo())
+
+        def lines():
+            yield writer.writerow(EXPORT_FIELDS)
+            for row in rows:
+                yield writer.writerow(row)
+
+        response = StreamingHttpResponse(lines(), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = 'attachment; filename="posts.csv"'
+        return response
+
+admin.site.register(Post, PostAdmin)
+
+
+class ProfilingRuleAdmin(admin.ModelAdmin):
+    list_display = ('view', 'mode', 'sample_rate', 'enabled', 'expires_at', 'created_at')
+    list_filter = ('enabled', 'mode')
+    change_list_template = 'admin/api/profilingrule/change_list.html'
+
+    # Профілі лежать на диску, а не в БД - власні сторінки поруч зі списком правил
+    def get_urls(self):
+        urls = [
+            path('profiles/', self.admin_site.admin_view(self.profiles_view), name='api_profile_list'),
+            path('profiles/<str:profile_id>/', self.admin_site.admin_view(self.profile_view), name='api_profile_detail'),
+            path('profiles/<str:profile_id>/collapsed.txt', self.admin_site.admin_view(self.collapsed_view),
+                 name='api_profile_collapsed'),
+        ]
+        return urls + super().get_urls()
+
+    def profiles_view(self, request):
+        if not self.has_view_permission(request):
+            raise Http404
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Профілі запитів',
+            'profiles': profiling.list_profiles(),
+            'header': profiling.HEADER,
+            'tokens': {mode: profiling.make_token(mode) for mode in profiling.MODES},
+        }
+        return TemplateResponse(request, 'admin/api/profilingrule/profiles.html', context)
+
+    def _load(self, request, profile_id):
+        profile = profiling.load_profile(profile_id) if self.has_view_permission(request) else None
+        if profile is None:
+            raise Http404
+        return profile
+
+    def profile_view(self, request, profile_id):
+        profile = self._load(request, profile_id)
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': f"{profile['method']} {profile['path']}",
+            'profile': profile,
+        }
+        return TemplateResponse(request, 'admin/api/profilingrule/profile.html', context)
+
+    def collapsed_view(self, request, profile_id):
+        profile = self._load(request, profile_id)
+        response = HttpResponse(profile['collapsed'] + '\n', content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="profile-{profile_id}.txt"'
+        return response
+
+admin.site.register(ProfilingRule, ProfilingRuleAdmin)
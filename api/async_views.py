@@ -0,0 +1,124 @@
+"""
+Async ``login`` and ``register`` for the ASGI deployment.
+
+Same request/response format as the DRF views in ``api/views.py``. Database
+access uses Django's async ORM, while PBKDF2 runs on the bounded pool from
+``api/hashing.py``, so the event loop keeps serving the feed during a login
+storm. ``myproject/urls_async.py`` routes the auth endpoints here and is
+selected by ``myproject/asgi.py``.
+"""
+
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.hashers import check_password, identify_hasher, make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from .authentication import issue_token
+from .hashing import HashingPoolFull, get_pool
+from .models import StudentProfile
+
+
+def _request_data(request):
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    return request.POST
+
+
+def _json(data, status=200):
+    # Як JSONRenderer у DRF: кирилиця без \u-екранування
+    return JsonResponse(data, status=status, json_dumps_params={'ensure_ascii': False})
+
+
+def _overloaded():
+    response = _json({'detail': 'Сервер перевантажений, спробуйте пізніше.'}, status=503)
+    response['Retry-After'] = '1'
+    return response
+
+
+def _needs_rehash(encoded):
+    try:
+        return identify_hasher(encoded).must_update(encoded)
+    except ValueError:
+        return False
+
+
+# --- ВХІД (async) ---
+@csrf_exempt
+@require_POST
+async def login(request):
+    data = _request_data(request)
+    if data is None:
+        return _json({'detail': 'Невірні дані'}, status=400)
+    username = data.get('username')
+    password = data.get('password')
+    if not username or not password:
+        return _json({'detail': 'Невірні дані'}, status=400)
+
+    pool = get_pool()
+    try:
+        user = await User.objects.filter(username=username).afirst()
+        if user is None:
+            # Хешуємо навіть для неіснуючого користувача, щоб час відповіді
+            # не видавав, які імена зайняті (як ModelBackend)
+            await pool.arun(make_password, password)
+            return _json({'detail': 'Невірні дані'}, status=400)
+
+        valid = await pool.arun(check_password, password, user.password)
+        if not valid or not user.is_active:
+            return _json({'detail': 'Невірні дані'}, status=400)
+
+        if _needs_rehash(user.password):
+            user.password = await pool.arun(make_password, password)
+            await user.asave(update_fields=['password'])
+    except HashingPoolFull:
+        return _overloaded()
+
+    profile = await StudentProfile.objects.filter(user=user).afirst()
+    # Покоління токенів може знадобитися прочитати з БД
+    return _json({'token': await sync_to_async(issue_token)(user, profile)})
+
+
+@sync_to_async
+def _create_account(username, encoded_password, dorm_number):
+    with transaction.atomic():
+        user = User(username=username, password=encoded_password, is_active=True)
+        user.save()
+        StudentProfile.objects.create(user=user, dorm_number=dorm_number, student_id_photo=None)
+    return user
+
+
+# --- РЕЄСТРАЦІЯ (async) ---
+@csrf_exempt
+@require_POST
+async def register(request):
+    data = _request_data(request)
+    if data is None:
+        return _json({'detail': 'Невірні дані'}, status=400)
+    username = data.get('username')
+    password = data.get('password')
+
+    if not username or not password:
+        return _json({'detail': 'Введіть ім\'я та пароль'}, status=400)
+
+    if await User.objects.filter(username=username).aexists():
+        return _json({'detail': 'Це ім\'я зайняте'}, status=400)
+
+    try:
+        encoded_password = await get_pool().arun(make_password, password)
+    except HashingPoolFull:
+        return _overloaded()
+
+    try:
+        await _create_account(username, encoded_password, data.get('dorm_number', 0))
+    except Exception as e:
+        return _json({'detail': str(e)}, status=400)
+    return _json({'message': 'Успіх! Акаунт створено та активовано.'})
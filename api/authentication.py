@@ -0,0 +1,192 @@
+"""
+Stateless signed authentication tokens.
+
+``login`` issues tokens signed with ``SECRET_KEY`` (``django.core.signing``,
+HMAC-SHA256) that embed the user id, username, dorm number, role and issue
+time. ``SignedTokenAuthentication`` verifies them without touching the
+database and builds ``request.user`` (with ``request.user.profile``) from
+the payload, so authenticated reads need no auth queries at all.
+
+Revocations are stored in the database, in the user's ``TokenState`` row:
+a generation embedded in every token (dorm change, deactivation, password
+change and role change bump it, revoking all of the user's tokens) and the
+ids of single tokens revoked by logout. The cache configured by
+``AUTH_TOKEN_CACHE_ALIAS`` only holds copies of these rows for
+``AUTH_TOKEN_STATE_TIMEOUT`` seconds; an evicted copy is read again from the
+database, so eviction never brings a revoked token back. A worker applies
+its own revocations at once. With local-memory caches, other workers may
+accept a revoked token until their copy expires; a shared cache backend
+makes revocation immediate everywhere.
+
+Writes that bypass ``Model.save`` (``QuerySet.update`` of users or profiles)
+do not revoke anything; call ``revoke_user_tokens`` after them.
+
+The user built from a token is a detached snapshot: call
+``refresh_from_db()`` before saving it or its profile.
+"""
+
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+
+from .models import StudentProfile, TokenState, get_user_role
+
+
+TOKEN_SALT = 'api.authentication.SignedToken'
+DEFAULT_TOKEN_TTL = 60 * 60 * 24 * 7
+DEFAULT_STATE_TIMEOUT = 30
+
+
+def _token_ttl():
+    return getattr(settings, 'AUTH_TOKEN_TTL', DEFAULT_TOKEN_TTL)
+
+
+def _cache():
+    return caches[getattr(settings, 'AUTH_TOKEN_CACHE_ALIAS', 'default')]
+
+
+def _state_key(user_id):
+    return f'auth:state:{user_id}'
+
+
+def get_token_state(user_id):
+    """
+    Return ``(generation, revoked)`` of ``user_id``: cached, else from the database.
+    """
+    cache = _cache()
+    state = cache.get(_state_key(user_id))
+    if state is None:
+        row = TokenState.objects.filter(pk=user_id).values_list('generation', 'revoked').first()
+        state = row or (0, {})
+        cache.set(_state_key(user_id), state, timeout=getattr(settings, 'AUTH_TOKEN_STATE_TIMEOUT', DEFAULT_STATE_TIMEOUT))
+    return state
+
+
+def _update_token_state(user_id, change):
+    with transaction.atomic():
+        state, _ = TokenState.objects.select_for_update().get_or_create(user_id=user_id)
+        change(state)
+        # Токени, що вже закінчилися, відкликати не треба
+        now = time.time()
+        state.revoked = {jti: expires for jti, expires in state.revoked.items() if expires > now}
+        state.save()
+        # Копію в кеші прибираємо одразу й ще раз після коміту: інший воркер
+        # міг тим часом перечитати старий рядок
+        _cache().delete(_state_key(user_id))
+        transaction.on_commit(lambda: _cache().delete(_state_key(user_id)))
+
+
+def issue_token(user, profile=None):
+    """
+    Return a signed token for ``user``.
+    """
+    payload = {
+        'u': user.pk,
+        'n': user.get_username(),
+        'r': get_user_role(user),
+        'g': get_token_state(user.pk)[0],
+        'j': uuid.uuid4().hex,
+        'i': round(time.time(), 3),
+    }
+    if profile is not None:
+        payload['p'] = profile.pk
+        payload['d'] = profile.dorm_number
+    return signing.dumps(payload, salt=TOKEN_SALT)
+
+
+def decode_token(token):
+    """
+    Verify ``token`` and return its payload, or raise ``AuthenticationFailed``.
+    """
+    try:
+        payload = signing.loads(token, salt=TOKEN_SALT, max_age=_token_ttl())
+    except signing.SignatureExpired:
+        raise exceptions.AuthenticationFailed('Термін дії токена минув.')
+    except signing.BadSignature:
+        raise exceptions.AuthenticationFailed('Невірний токен.')
+
+    generation, revoked = get_token_state(payload['u'])
+    if payload.get('g', 0) != generation or payload['j'] in revoked:
+        raise exceptions.AuthenticationFailed('Токен відкликано.')
+    return payload
+
+
+def revoke_token(payload):
+    """
+    Revoke a single token (logout) until it would have expired anyway.
+    """
+    expires = payload['i'] + _token_ttl()
+    if expires > time.time():
+        _update_token_state(payload['u'], lambda state: state.revoked.__setitem__(payload['j'], expires))
+
+
+def revoke_user_tokens(user_id):
+    """
+    Revoke every token issued to ``user_id`` so far (dorm, password or role
+    change, deactivation).
+    """
+    def bump(state):
+        state.generation += 1
+        # Старе покоління відкликає й ці токени
+        state.revoked = {}
+
+    _update_token_state(user_id, bump)
+
+
+def user_from_payload(payload):
+    """
+    Build an unsaved ``User`` (and cached ``profile``) from a token payload.
+    """
+    role = payload['r']
+    user = User(
+        pk=payload['u'],
+        username=payload['n'],
+        is_active=True,
+        is_staff=role in ('privileged', 'administrator'),
+        is_superuser=role == 'administrator',
+    )
+    user._state.adding = False
+    user._state.db = 'default'
+    if 'p' in payload:
+        # Пряме присвоєння OneToOne кешує і зворотний доступ user.profile
+        profile = StudentProfile(pk=payload['p'], user=user, dorm_number=payload['d'])
+        profile._loaded_dorm_number = payload['d']
+        profile._state.adding = False
+        profile._state.db = 'default'
+    return user
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """
+    Authenticate ``Authorization: Token <signed token>`` without queries.
+
+    Plain database tokens (40 hex characters, no ``:``) are left to
+    ``TokenAuthentication``, so tokens issued before the switch keep working.
+    """
+    keyword = 'Token'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            return None
+        try:
+            token = auth[1].decode()
+        except UnicodeError:
+            return None
+        if ':' not in token:
+            return None
+
+        payload = decode_token(token)
+        return user_from_payload(payload), payload
+
+    def authenticate_header(self, request):
+        return self.keyword
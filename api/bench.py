@@ -0,0 +1,89 @@
+"""
+Shared helpers for the benchmark management commands.
+
+Benchmarks run against a throw-away database created the same way the test
+runner does it, so they never touch ``db.sqlite3``.
+"""
+
+import math
+import os
+import shutil
+import statistics
+import tempfile
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from api import snapshots
+
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile of ``values`` (``pct`` in 0..100).
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(latencies):
+    """
+    Summary of a list of latencies in seconds, reported in milliseconds.
+    """
+    if not latencies:
+        return {'count': 0}
+    return {
+        'count': len(latencies),
+        'mean_ms': statistics.fmean(latencies) * 1000,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'max_ms': max(latencies) * 1000,
+    }
+
+
+def format_summary(summary):
+    if not summary.get('count'):
+        return 'no samples'
+    return (
+        f"n={summary['count']} p50={summary['p50_ms']:.1f}ms "
+        f"p95={summary['p95_ms']:.1f}ms p99={summary['p99_ms']:.1f}ms "
+        f"max={summary['max_ms']:.1f}ms"
+    )
+
+
+@contextmanager
+def benchmark_database(verbosity=0, snapshot=None):
+    """
+    Create a migrated throw-away database and drop it afterwards.
+
+    SQLite gets a temporary file rather than the default in-memory test
+    database, so concurrent workers see realistic locking. ``snapshot`` is
+    a path from ``api.snapshots.snapshot_path`` to start from instead of an
+    empty database.
+    """
+    settings_dict = connection.settings_dict
+    old_name = settings_dict['NAME']
+    old_test_name = settings_dict.setdefault('TEST', {}).get('NAME')
+    tmpdir = None
+    if connection.vendor == 'sqlite' and not old_test_name:
+        tmpdir = tempfile.mkdtemp(prefix='gurtaki-bench-')
+        settings_dict['TEST']['NAME'] = os.path.join(tmpdir, 'bench.sqlite3')
+
+    setup_test_environment()
+    try:
+        connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+        try:
+            if snapshot is not None:
+                snapshots.restore(snapshot)
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity)
+    finally:
+        teardown_test_environment()
+        settings_dict['TEST']['NAME'] = old_test_name
+        if tmpdir is not None:
+            shutil.rmtree(tmpdir, ignore_errors=True)
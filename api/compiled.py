@@ -0,0 +1,169 @@
+"""
+Compiled read path for DRF serializers.
+
+``Serializer.to_representation`` walks ``_readable_fields`` for every
+object, calling the generic ``get_attribute``/``to_representation`` pair and
+its ``SkipField``/``PKOnlyObject`` handling for each field. For lists that
+machinery dominates. ``compile_representation`` inspects a serializer once
+and returns a flat function with one getter per field, specialised where
+the result is provably the same:
+
+* model fields read as plain attributes, with ``str``/``int``/``bool`` for
+  the matching DRF fields and the field's own ``to_representation`` for the
+  rest (dates, files);
+* ``PrimaryKeyRelatedField`` reads the foreign key's ``attname``;
+* nested serializers are compiled recursively;
+* ``SerializerMethodField`` calls the bound method directly;
+* ISO 8601 ``DateTimeField`` resolves its time zone once per compile
+  (that is, per request) instead of once per value.
+
+Any other field goes through DRF's generic per-field logic unchanged.
+"""
+
+import datetime
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import ISO_8601, serializers
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
+from rest_framework.settings import api_settings
+
+
+_SKIP = object()
+
+_CONVERTERS = {
+    serializers.CharField: str,
+    serializers.SlugField: str,
+    serializers.EmailField: str,
+    serializers.IntegerField: int,
+    serializers.BooleanField: bool,
+}
+
+
+def _model_field(serializer, field):
+    meta = getattr(serializer, 'Meta', None)
+    model = getattr(meta, 'model', None)
+    if model is None or len(field.source_attrs) != 1:
+        return None
+    try:
+        model_field = model._meta.get_field(field.source_attrs[0])
+    except FieldDoesNotExist:
+        return None
+    return model_field if model_field.concrete else None
+
+
+def _generic(field):
+    # Те саме, що робить Serializer.to_representation для одного поля
+    def get(instance):
+        try:
+            attribute = field.get_attribute(instance)
+        except SkipField:
+            return _SKIP
+        check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+        return None if check_for_none is None else field.to_representation(attribute)
+    return get
+
+
+def _datetime(field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601:
+        return field.to_representation
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if field_timezone is None:
+        return field.to_representation
+
+    def represent(value):
+        # Лише aware datetime; решту (рядки, naive) - як у DRF
+        if value.__class__ is not datetime.datetime or value.tzinfo is None:
+            return field.to_representation(value)
+        value = value.astimezone(field_timezone).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return represent
+
+
+def _compile_field(serializer, field):
+    """
+    Return ``(getter, may_skip)`` for one readable field.
+    """
+    if isinstance(field, serializers.SerializerMethodField):
+        return getattr(serializer, field.method_name), False
+
+    model_field = _model_field(serializer, field)
+    if model_field is None:
+        return _generic(field), True
+    attname = model_field.attname
+
+    if isinstance(field, serializers.Serializer):
+        nested = compile_representation(field)
+
+        def get_nested(instance):
+            value = getattr(instance, field.source_attrs[0])
+            return None if value is None else nested(value)
+        return get_nested, False
+
+    if type(field) is serializers.PrimaryKeyRelatedField and field.pk_field is None:
+        return (lambda instance: getattr(instance, attname)), False
+
+    if type(field) is serializers.DateTimeField:
+        convert = _datetime(field)
+    else:
+        convert = _CONVERTERS.get(type(field), field.to_representation)
+
+    def get(instance):
+        value = getattr(instance, attname)
+        return None if value is None else convert(value)
+    return get, False
+
+
+def compile_representation(serializer):
+    """
+    Build ``instance -> dict`` equivalent to ``serializer.to_representation``.
+    """
+    steps = []
+    may_skip = False
+    for field in serializer._readable_fields:
+        getter, skips = _compile_field(serializer, field)
+        steps.append((field.field_name, getter))
+        may_skip = may_skip or skips
+
+    if not may_skip:
+        def represent(instance):
+            return {name: getter(instance) for name, getter in steps}
+        return represent
+
+    def represent_skipping(instance):
+        ret = {}
+        for name, getter in steps:
+            value = getter(instance)
+            if value is not _SKIP:
+                ret[name] = value
+        return ret
+    return represent_skipping
+
+
+class CompiledReadMixin:
+    """
+    Serializer mixin: compiled ``to_representation``, no writes.
+
+    The function is compiled on first use and reused for every item of a
+    ``many=True`` list, since DRF shares one child serializer. Every field
+    is read-only, so input data is ignored, and ``save()`` fails like any
+    DRF misuse does.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        for field in fields.values():
+            field.read_only = True
+        return fields
+
+    def to_representation(self, instance):
+        represent = self.__dict__.get('_compiled_representation')
+        if represent is None:
+            represent = self._compiled_representation = compile_representation(self)
+        return represent(instance)
+
+    def save(self, **kwargs):
+        raise AssertionError(f'{type(self).__name__} is read-only; save through the writable serializer instead.')
@@ -0,0 +1,158 @@
+"""
+Per-dorm cache for feed pages.
+
+Every dorm has a version number stored in the cache. Feed pages are cached
+under ``(dorm_number, version, cursor, page_size, fields)`` and any write that
+touches a dorm's posts bumps its version, so readers never see a page that
+was built before the write. Old entries are never deleted explicitly; they
+simply stop being addressed and expire on their own.
+
+Works with any Django cache backend. Local-memory is per process, so
+deployments with several workers should point ``FEED_CACHE_ALIAS`` at a
+shared backend such as ``FileBasedCache``.
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+
+from . import metrics
+
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def _cache():
+    return caches[getattr(settings, 'FEED_CACHE_ALIAS', 'default')]
+
+
+def _timeout():
+    return getattr(settings, 'FEED_CACHE_TIMEOUT', 300)
+
+
+def _version_key(dorm_number):
+    return f'feed:version:{dorm_number}'
+
+
+def _modified_key(dorm_number):
+    return f'feed:modified:{dorm_number}'
+
+
+def _fresh_version():
+    # Якщо ключ версії витіснено з кешу, нова версія не повинна збігтися
+    # зі старою, інакше можна повернути застарілі сторінки.
+    return time.time_ns()
+
+
+def get_version(dorm_number):
+    """
+    Return the current feed version for ``dorm_number``.
+    """
+    cache = _cache()
+    key = _version_key(dorm_number)
+    version = cache.get(key)
+    if version is None:
+        version = _fresh_version()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_version(dorm_number):
+    """
+    Invalidate every cached page of ``dorm_number``.
+    """
+    cache = _cache()
+    key = _version_key(dorm_number)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _fresh_version(), timeout=None)
+    cache.set(_modified_key(dorm_number), time.time(), timeout=None)
+
+
+def get_validators(dorm_number):
+    """
+    Return ``(version, last_modified)`` for ``dorm_number``.
+
+    ``last_modified`` is the Unix time of the last bump. If it was evicted
+    it restarts from now, which only costs clients one full response.
+    """
+    cache = _cache()
+    values = cache.get_many([_version_key(dorm_number), _modified_key(dorm_number)])
+    version = values.get(_version_key(dorm_number))
+    if version is None:
+        version = get_version(dorm_number)
+    last_modified = values.get(_modified_key(dorm_number))
+    if last_modified is None:
+        last_modified = time.time()
+        if not cache.add(_modified_key(dorm_number), last_modified, timeout=None):
+            last_modified = cache.get(_modified_key(dorm_number), last_modified)
+    return version, last_modified
+
+
+def invalidate_dorm(dorm_number):
+    """
+    Bump the dorm's version now and again once the transaction commits.
+
+    The second bump closes the window in which a reader could cache rows
+    read before the writer's transaction became visible.
+    """
+    bump_version(dorm_number)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: bump_version(dorm_number))
+
+
+def page_key(dorm_number, cursor, page_size, version, fields=None):
+    # fields - кортеж полів з ?fields= (None - усі поля)
+    fields = ','.join(fields) if fields else ''
+    return f'feed:page:{dorm_number}:{version}:{page_size}:{fields}:{cursor or ""}'
+
+
+def get_page(dorm_number, cursor, page_size, version, fields=None):
+    """
+    Return the cached page or ``None``, updating the hit/miss counters.
+
+    ``version`` must be read (``get_version``/``get_validators``) before the
+    page's rows, and the same value passed to ``set_page``.
+    """
+    page = _cache().get(page_key(dorm_number, cursor, page_size, version, fields))
+    with _stats_lock:
+        _stats['hits' if page is not None else 'misses'] += 1
+    metrics.inc('feed_cache_requests_total', result='hit' if page is not None else 'miss')
+    return page
+
+
+def set_page(dorm_number, cursor, page_size, page, version, fields=None):
+    """
+    Cache ``page`` under the ``version`` that was current before its rows
+    were read.
+
+    Reading the version again here would file a page built before a write
+    under the version that write bumped to, and serve it as fresh.
+    """
+    _cache().set(page_key(dorm_number, cursor, page_size, version, fields), page, timeout=_timeout())
+
+
+def stats():
+    """
+    Return hit/miss counters of this process.
+    """
+    with _stats_lock:
+        hits, misses = _stats['hits'], _stats['misses']
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / total if total else 0.0,
+    }
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats['hits'] = 0
+        _stats['misses'] = 0
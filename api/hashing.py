@@ -0,0 +1,86 @@
+"""
+Bounded executor for password hashing.
+
+PBKDF2 dominates ``login`` and ``register``. Running it on a small, fixed
+pool keeps a registration spike from occupying every worker thread (or the
+event loop under ASGI), and the queue-depth limit turns overload into a
+fast 503 instead of an ever-growing backlog. ``hashlib`` releases the GIL
+while hashing, so the pool threads run in parallel with request threads.
+
+Only pure CPU work goes to the pool; database access stays on the request
+thread.
+
+Settings:
+    AUTH_HASH_WORKERS    threads doing hashing (default: half the CPUs)
+    AUTH_HASH_MAX_QUEUE  running + waiting jobs before rejecting (default: 64)
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+
+class HashingPoolFull(Exception):
+    """
+    Raised when the pool already holds ``max_queue`` jobs.
+    """
+
+
+class HashingPool:
+    def __init__(self, workers, max_queue):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='auth-hash')
+        self._slots = threading.BoundedSemaphore(max_queue)
+        self._depth_lock = threading.Lock()
+        self.depth = 0
+
+    def _release(self, future):
+        with self._depth_lock:
+            self.depth -= 1
+        self._slots.release()
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Schedule ``fn`` or raise ``HashingPoolFull`` if the queue is full.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise HashingPoolFull()
+        with self._depth_lock:
+            self.depth += 1
+        future = self._executor.submit(fn, *args, **kwargs)
+        future.add_done_callback(self._release)
+        return future
+
+    def run(self, fn, *args, **kwargs):
+        """
+        Run ``fn`` on the pool and wait for the result (sync callers).
+        """
+        return self.submit(fn, *args, **kwargs).result()
+
+    async def arun(self, fn, *args, **kwargs):
+        """
+        Run ``fn`` on the pool without blocking the event loop.
+        """
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                workers = getattr(settings, 'AUTH_HASH_WORKERS', None) or max(1, (os.cpu_count() or 2) // 2)
+                max_queue = getattr(settings, 'AUTH_HASH_MAX_QUEUE', 64)
+                _pool = HashingPool(workers, max_queue)
+    return _pool
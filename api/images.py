@@ -0,0 +1,308 @@
+"""
+Responsive derivatives of post images.
+
+Every uploaded ``Post.image`` gets ``small``, ``medium`` and ``original``
+renditions, each encoded as WebP and JPEG. They are stored next to the
+original under deterministic names that keep the original's full name
+(``posts/photo.jpg.small.webp``), so ``photo.jpg`` and ``photo.png`` never
+share derivatives, and are listed in ``Post.image_variants``, so the feed
+can return a srcset-style map without touching the filesystem.
+
+``render_derivatives`` only needs the storage and the original's name, so
+the backfill command can run it in worker processes (``map_in_pool``).
+Uploads are rendered after their transaction commits, in a small thread
+pool (``render_later``), so the request that saved the post does not wait
+for the encoders.
+"""
+
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from PIL import Image, ImageOps
+
+from .workers import worker_pool
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_VARIANTS = {'small': 320, 'medium': 1080}
+DEFAULT_POST_IMAGE_MAX_PIXELS = 50_000_000
+DEFAULT_POST_IMAGE_RENDER_THREADS = 2
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+
+
+def variant_widths():
+    """
+    ``{variant: max_side}`` from ``POST_IMAGE_VARIANTS``, largest first.
+    """
+    variants = getattr(settings, 'POST_IMAGE_VARIANTS', DEFAULT_VARIANTS)
+    return dict(sorted(variants.items(), key=lambda item: item[1], reverse=True))
+
+
+def derivative_name(original_name, variant, fmt):
+    # Ім'я оригіналу унікальне в сховищі, тож і похідні не перетинаються
+    return f'{original_name}.{variant}.{EXTENSIONS[fmt]}'
+
+
+def _flatten(image):
+    # JPEG не має прозорості - накладаємо на білий фон
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def _encode(image, fmt):
+    pil_format, options = FORMATS[fmt]
+    buffer = io.BytesIO()
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def _store(storage, name, data):
+    # Детерміновані імена: перезаписуємо, а не отримуємо "photo_aB3x.webp"
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, ContentFile(data))
+
+
+def render_derivatives(original_name, storage=None):
+    """
+    Decode ``original_name`` once and write every variant in every format.
+
+    Returns the ``Post.image_variants`` value for it. Raises
+    ``ImageRejected`` for non-images and images over ``POST_IMAGE_MAX_PIXELS``.
+    """
+    storage = storage or default_storage
+    widths = variant_widths()
+    max_pixels = getattr(settings, 'POST_IMAGE_MAX_PIXELS', DEFAULT_POST_IMAGE_MAX_PIXELS)
+
+    with storage.open(original_name, 'rb') as fh:
+        image = open_guarded(fh, max_pixels)
+        image = ImageOps.exif_transpose(image)
+        image = _flatten(image)
+
+    variants = {'source': original_name}
+    renditions = [('original', image)]
+    current = image
+    for variant, max_side in widths.items():
+        # Кожен наступний розмір рахуємо з попереднього, а не з оригіналу
+        if max(current.size) > max_side:
+            current = current.copy()
+            current.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+        renditions.append((variant, current))
+
+    for variant, rendition in renditions:
+        entry = {'width': rendition.width, 'height': rendition.height}
+        for fmt in FORMATS:
+            entry[fmt] = _store(storage, derivative_name(original_name, variant, fmt), _encode(rendition, fmt))
+        variants[variant] = entry
+    return variants
+
+
+def derivative_files(variants):
+    """
+    Storage names of every derivative listed in ``variants``.
+    """
+    return {
+        entry[fmt]
+        for variant, entry in (variants or {}).items() if variant != 'source'
+        for fmt in FORMATS if entry.get(fmt)
+    }
+
+
+def delete_derivatives(variants, storage=None, keep=()):
+    """
+    Delete the derivatives in ``variants``, except the names in ``keep``.
+    """
+    storage = storage or default_storage
+    for name in derivative_files(variants) - set(keep):
+        if storage.exists(name):
+            storage.delete(name)
+
+
+def needs_derivatives(post):
+    return bool(post.image) and (post.image_variants or {}).get('source') != post.image.name
+
+
+_render_pool = {'pid': None, 'pool': None}
+_render_pool_lock = threading.Lock()
+
+
+def _run_and_close(fn):
+    try:
+        fn()
+    except Exception:
+        logger.exception('Background image rendering failed')
+    finally:
+        # Потік пулу має власні зʼєднання з БД - не лишаємо їх відкритими
+        connections.close_all()
+
+
+def render_later(fn):
+    """
+    Run ``fn`` off the request thread, in a pool of
+    ``POST_IMAGE_RENDER_THREADS`` threads (Pillow releases the GIL while
+    encoding). With ``0`` threads ``fn`` runs right away.
+    """
+    threads = getattr(settings, 'POST_IMAGE_RENDER_THREADS', DEFAULT_POST_IMAGE_RENDER_THREADS)
+    if not threads:
+        fn()
+        return
+    with _render_pool_lock:
+        # Потоки не переживають fork (gunicorn --preload) - у кожного процесу свій пул
+        if _render_pool['pid'] != os.getpid():
+            _render_pool['pool'] = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='image-render')
+            _render_pool['pid'] = os.getpid()
+        pool = _render_pool['pool']
+    pool.submit(_run_and_close, fn)
+
+
+# --- Фото студентського: зменшення та перекодування при завантаженні ---
+
+DEFAULT_ID_PHOTO_MAX_SIDE = 1600
+DEFAULT_ID_PHOTO_THUMB_SIDE = 256
+DEFAULT_ID_PHOTO_MAX_PIXELS = 50_000_000
+ID_PHOTO_FORMAT = ('WEBP', {'quality': 80, 'method': 4})
+
+
+class ImageRejected(ValueError):
+    """
+    Raised for files that are not images or exceed the pixel limit.
+    """
+
+
+def open_guarded(fh, max_pixels=None):
+    """
+    Open an image, refusing decompression bombs before decoding pixels.
+
+    Only the header is read here; ``Image.open`` is lazy.
+    """
+    max_pixels = max_pixels or getattr(settings, 'ID_PHOTO_MAX_PIXELS', DEFAULT_ID_PHOTO_MAX_PIXELS)
+    try:
+        image = Image.open(fh)
+    except Image.DecompressionBombError:
+        raise ImageRejected('Зображення завелике.')
+    except (OSError, SyntaxError, ValueError):
+        raise ImageRejected('Файл не є зображенням.')
+    width, height = image.size
+    if width * height > max_pixels:
+        raise ImageRejected('Зображення завелике.')
+    return image
+
+
+def id_photo_thumbnail_name(name):
+    root, _ = os.path.splitext(name)
+    return f'{root}.thumb.webp'
+
+
+def _encode_id_photo(image):
+    pil_format, options = ID_PHOTO_FORMAT
+    buffer = io.BytesIO()
+    # Без exif/icc: метадані (геолокація, модель телефону) не зберігаються
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def process_id_photo(fh):
+    """
+    Decode an uploaded ID photo once and return ``(photo_bytes, thumb_bytes)``.
+
+    The photo is rotated by its EXIF orientation, stripped of metadata,
+    fitted into ``ID_PHOTO_MAX_SIDE`` and encoded as WebP; the thumbnail for
+    the admin is fitted into ``ID_PHOTO_THUMB_SIDE``.
+    """
+    max_side = getattr(settings, 'ID_PHOTO_MAX_SIDE', DEFAULT_ID_PHOTO_MAX_SIDE)
+    thumb_side = getattr(settings, 'ID_PHOTO_THUMB_SIDE', DEFAULT_ID_PHOTO_THUMB_SIDE)
+
+    image = open_guarded(fh)
+    # Для JPEG декодуємо одразу зі зменшенням у 2/4/8 разів
+    image.draft('RGB', (max_side, max_side))
+    try:
+        image = ImageOps.exif_transpose(image)
+        image = _flatten(image)
+    except (OSError, SyntaxError, ValueError):
+        raise ImageRejected('Файл не є зображенням.')
+
+    image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+    photo = _encode_id_photo(image)
+    image.thumbnail((thumb_side, thumb_side), Image.Resampling.LANCZOS)
+    return photo, _encode_id_photo(image)
+
+
+def store_id_photo_thumbnail(name, data, storage=None):
+    storage = storage or default_storage
+    return _store(storage, id_photo_thumbnail_name(name), data)
+
+
+def _validate_image(value, max_pixels=None):
+    fh = getattr(value, 'file', value)
+    position = fh.tell() if hasattr(fh, 'tell') else None
+    try:
+        open_guarded(fh, max_pixels)
+    except ImageRejected as e:
+        raise ValidationError(str(e), code='invalid_image')
+    finally:
+        if position is not None:
+            fh.seek(position)
+
+
+def validate_id_photo(value):
+    """
+    Field validator: reject bombs and non-images from the header alone.
+    """
+    _validate_image(value)
+
+
+def validate_post_image(value):
+    """
+    ``Post.image`` validator: the same check with ``POST_IMAGE_MAX_PIXELS``.
+    """
+    _validate_image(value, getattr(settings, 'POST_IMAGE_MAX_PIXELS', DEFAULT_POST_IMAGE_MAX_PIXELS))
+
+
+# --- Пакетна обробка файлів у процесах-воркерах ---
+
+def _completed(futures):
+    for future in as_completed(futures):
+        try:
+            yield futures[future], future.result(), None
+        except Exception as e:
+            yield futures[future], None, e
+
+
+def map_in_pool(queryset, fn, argument, workers, batch_size, select=None):
+    """
+    Run ``fn(argument(obj))`` in worker processes for the objects of
+    ``queryset`` that ``select`` accepts (all by default).
+
+    Objects are loaded ``batch_size`` at a time in primary-key order. Yields
+    ``(last_pk, results)`` per batch, where ``results`` yields ``(obj,
+    result, error)`` as workers finish; consume it before the next batch.
+    ``fn`` gets only file names and must not touch the database: results
+    are saved by the caller, in this process.
+    """
+    with worker_pool(workers) as pool:
+        last_pk = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:batch_size])
+            if not batch:
+                return
+            last_pk = batch[-1].pk
+            futures = {pool.submit(fn, argument(obj)): obj for obj in batch if select is None or select(obj)}
+            yield last_pk, _completed(futures)
@@ -0,0 +1,214 @@
+"""
+Django management command to benchmark login throughput and feed latency
+during a concurrent login storm, for the WSGI and the ASGI deployment.
+
+Usage:
+    python manage.py bench_auth
+    python manage.py bench_auth --mode asgi --logins 400 --concurrency 32
+    python manage.py bench_auth --workers 4 --json auth-bench.json
+
+WSGI is modelled as ``--workers`` sync workers taking requests from a shared
+queue (as gunicorn sync workers do), so a feed request waits while every
+worker is busy hashing. ASGI runs every request on one event loop through
+``myproject.urls_async``, with hashing on the bounded pool from
+``api/hashing.py``. Everything runs in-process against a throw-away
+database; ``db.sqlite3`` is not touched.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import ThreadSensitiveContext
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client, override_settings
+
+from api.authentication import issue_token
+from api.bench import benchmark_database, format_summary, summarize
+from api.models import Post, StudentProfile
+
+
+PASSWORD = 'benchpass123'
+DORM = 1
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks login throughput and feed latency under a login storm (WSGI vs ASGI)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=['wsgi', 'asgi', 'both'], default='both')
+        parser.add_argument('--users', type=int, default=50, help='Accounts to log in with (default: 50)')
+        parser.add_argument('--posts', type=int, default=200, help='Posts in the feed dorm (default: 200)')
+        parser.add_argument('--logins', type=int, default=200, help='Logins in the storm (default: 200)')
+        parser.add_argument('--concurrency', type=int, default=16, help='Concurrent login clients (default: 16)')
+        parser.add_argument('--workers', type=int, default=4, help='Emulated WSGI sync workers (default: 4)')
+        parser.add_argument('--feed-interval', type=float, default=0.01, help='Pause between feed polls, s (default: 0.01)')
+        parser.add_argument('--baseline-requests', type=int, default=50, help='Feed requests without a storm (default: 50)')
+        parser.add_argument('--json', dest='json_path', help='Write results to this JSON file')
+
+    def handle(self, *args, **options):
+        self.options = options
+        results = {}
+        with benchmark_database():
+            self.feed_token = self.seed()
+            if options['mode'] in ('wsgi', 'both'):
+                results['wsgi'] = self.run_wsgi()
+                self.report('WSGI', results['wsgi'])
+            if options['mode'] in ('asgi', 'both'):
+                with override_settings(ROOT_URLCONF='myproject.urls_async'):
+                    results['asgi'] = asyncio.run(self.run_asgi())
+                self.report('ASGI', results['asgi'])
+
+        if options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as fh:
+                json.dump({'options': {k: v for k, v in options.items() if k != 'json_path'}, 'results': results},
+                          fh, indent=2, default=str)
+            self.stdout.write(self.style.SUCCESS(f"✓ Results written to {options['json_path']}"))
+
+    def seed(self):
+        encoded = make_password(PASSWORD)
+        users = User.objects.bulk_create([
+            User(username=f'bench_{i}', password=encoded, is_active=True)
+            for i in range(self.options['users'])
+        ])
+        StudentProfile.objects.bulk_create([StudentProfile(user=user, dorm_number=DORM) for user in users])
+        Post.objects.bulk_create([
+            Post(title=f'Оголошення {i}', content='Текст оголошення. ' * 20, dorm_number=DORM)
+            for i in range(self.options['posts'])
+        ])
+        reader = users[0]
+        return issue_token(reader, StudentProfile.objects.get(user=reader))
+
+    def login_payload(self, i):
+        return {'username': f'bench_{i % self.options["users"]}', 'password': PASSWORD}
+
+    def report(self, label, result):
+        self.stdout.write(self.style.SUCCESS(f'\n{label}'))
+        self.stdout.write(f"  login throughput: {result['logins_per_sec']:.1f}/s "
+                          f"({result['logins_ok']} ok, {result['logins_rejected']} rejected, "
+                          f"{result['wall_s']:.2f}s)")
+        self.stdout.write(f"  login latency:    {format_summary(result['login_latency'])}")
+        self.stdout.write(f"  feed baseline:    {format_summary(result['feed_baseline'])}")
+        self.stdout.write(f"  feed under storm: {format_summary(result['feed_under_storm'])} "
+                          f"({result['feed_errors']} errors)")
+
+    def build_result(self, wall, login_latencies, statuses, feed_baseline, feed_storm, feed_statuses):
+        ok = sum(1 for status in statuses if status == 200)
+        return {
+            'wall_s': wall,
+            'logins_ok': ok,
+            'logins_rejected': sum(1 for status in statuses if status == 503),
+            'logins_per_sec': ok / wall if wall else 0.0,
+            'login_latency': summarize(login_latencies),
+            'feed_baseline': summarize(feed_baseline),
+            'feed_under_storm': summarize(feed_storm),
+            'feed_errors': sum(1 for status in feed_statuses if status != 200),
+        }
+
+    # --- WSGI: N синхронних воркерів зі спільною чергою ---
+    def run_wsgi(self):
+        opts = self.options
+        workers = ThreadPoolExecutor(max_workers=opts['workers'])
+        feed_headers = {'Authorization': f'Token {self.feed_token}'}
+
+        def handle(fn):
+            started = time.perf_counter()
+            response = workers.submit(fn).result()
+            return response, time.perf_counter() - started
+
+        def feed():
+            return Client().get('/api/posts/', headers=feed_headers)
+
+        feed_baseline = [handle(feed)[1] for _ in range(opts['baseline_requests'])]
+
+        counter = iter(range(opts['logins']))
+        counter_lock = threading.Lock()
+        login_latencies, statuses = [], []
+        storm_done = threading.Event()
+
+        def login_client():
+            while True:
+                with counter_lock:
+                    i = next(counter, None)
+                if i is None:
+                    return
+                payload = self.login_payload(i)
+                response, elapsed = handle(lambda: Client().post('/api/auth/login/', payload, content_type='application/json'))
+                login_latencies.append(elapsed)
+                statuses.append(response.status_code)
+
+        feed_storm, feed_statuses = [], []
+
+        def feed_poller():
+            while not storm_done.is_set():
+                response, elapsed = handle(feed)
+                feed_storm.append(elapsed)
+                feed_statuses.append(response.status_code)
+                time.sleep(opts['feed_interval'])
+
+        poller = threading.Thread(target=feed_poller)
+        clients = [threading.Thread(target=login_client) for _ in range(opts['concurrency'])]
+        started = time.perf_counter()
+        poller.start()
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        wall = time.perf_counter() - started
+        storm_done.set()
+        poller.join()
+        workers.shutdown()
+        return self.build_result(wall, login_latencies, statuses, feed_baseline, feed_storm, feed_statuses)
+
+    # --- ASGI: один цикл подій, хешування в обмеженому пулі ---
+    async def run_asgi(self):
+        opts = self.options
+        feed_headers = {'Authorization': f'Token {self.feed_token}'}
+
+        async def request(fn):
+            # Як ASGIHandler: кожен запит має свій потік для синхронного коду
+            started = time.perf_counter()
+            async with ThreadSensitiveContext():
+                response = await fn()
+            return response, time.perf_counter() - started
+
+        def feed():
+            return AsyncClient().get('/api/posts/', headers=feed_headers)
+
+        feed_baseline = []
+        for _ in range(opts['baseline_requests']):
+            feed_baseline.append((await request(feed))[1])
+
+        counter = iter(range(opts['logins']))
+        login_latencies, statuses = [], []
+        storm_done = asyncio.Event()
+
+        async def login_client():
+            for i in counter:
+                payload = self.login_payload(i)
+                response, elapsed = await request(
+                    lambda: AsyncClient().post('/api/auth/login/', payload, content_type='application/json')
+                )
+                login_latencies.append(elapsed)
+                statuses.append(response.status_code)
+
+        feed_storm, feed_statuses = [], []
+
+        async def feed_poller():
+            while not storm_done.is_set():
+                response, elapsed = await request(feed)
+                feed_storm.append(elapsed)
+                feed_statuses.append(response.status_code)
+                await asyncio.sleep(opts['feed_interval'])
+
+        poller = asyncio.create_task(feed_poller())
+        started = time.perf_counter()
+        await asyncio.gather(*(login_client() for _ in range(opts['concurrency'])))
+        wall = time.perf_counter() - started
+        storm_done.set()
+        await poller
+        return self.build_result(wall, login_latencies, statuses, feed_baseline, feed_storm, feed_statuses)
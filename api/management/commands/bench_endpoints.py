@@ -0,0 +1,237 @@
+"""
+Django management command to benchmark the API endpoints in-process.
+
+Usage:
+    python manage.py bench_endpoints
+    python manage.py bench_endpoints --posts 100000 --requests 500 --concurrency 4
+    python manage.py bench_endpoints --json bench.json
+    python manage.py bench_endpoints --baseline bench.json --threshold 0.15
+
+Each endpoint is driven through Django's test client from ``--concurrency``
+threads against a throw-away database (``db.sqlite3`` is not touched). The
+dataset comes from ``seed_data`` scale mode and is cached as a snapshot
+(see ``api/snapshots.py``), so only the first run with given parameters
+pays for seeding. On PostgreSQL (``USE_POSTGRESQL=1``) every run seeds, and
+results are directly comparable with a SQLite ``--json`` run.
+
+For every endpoint the report has p50/p95/p99 latency, throughput, SQL
+queries per request and the process's peak RSS. With ``--baseline`` the
+results are compared to a stored ``--json`` run; the command fails if any
+latency percentile grew by more than ``--threshold`` (and ``--min-delta-ms``)
+or an endpoint started issuing more queries.
+"""
+
+import itertools
+import json
+import os
+import resource
+import sys
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from api import snapshots
+from api.authentication import issue_token
+from api.bench import benchmark_database, format_summary, summarize
+from api.models import Post, StudentProfile
+from api.seeding import ITEMS
+
+
+ENDPOINTS = ('feed', 'feed_next', 'detail', 'batch', 'changes', 'search', 'login', 'register')
+# Скільки постів просить batch (як попереднє завантаження екрана)
+BATCH_SIZE = 20
+# Вхід і реєстрація впираються в PBKDF2 - для них окрема, менша кількість запитів
+AUTH_ENDPOINTS = ('login', 'register')
+PASSWORD = 'password123'
+COMPARED_METRICS = ('p50_ms', 'p95_ms', 'p99_ms')
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux рахує в КБ, macOS - у байтах
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks API endpoints in-process: latency percentiles, throughput, queries and RSS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Seeded students (default: 1000)')
+        parser.add_argument('--posts', type=int, default=20000, help='Seeded posts (default: 20000)')
+        parser.add_argument('--dorms', type=int, default=10, help='Seeded dorms (default: 10)')
+        parser.add_argument('--seed', type=int, default=0, help='Dataset seed (default: 0)')
+        parser.add_argument('--endpoints', nargs='+', choices=ENDPOINTS, default=list(ENDPOINTS))
+        parser.add_argument('--requests', type=int, default=200, help='Measured requests per endpoint (default: 200)')
+        parser.add_argument('--auth-requests', type=int, default=20,
+                            help='Measured requests for login/register (default: 20)')
+        parser.add_argument('--warmup', type=int, default=10, help='Unmeasured requests per endpoint (default: 10)')
+        parser.add_argument('--concurrency', type=int, default=1, help='Client threads (default: 1)')
+        parser.add_argument('--no-feed-cache', action='store_true', help='Measure the feed without its page cache')
+        parser.add_argument('--json', dest='json_path', help='Write results to this JSON file')
+        parser.add_argument('--baseline', help='Compare against results saved with --json')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Allowed relative latency growth over the baseline (default: 0.2)')
+        parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                            help='Ignore latency growth smaller than this, ms (default: 1.0)')
+
+    def handle(self, *args, **options):
+        self.options = options
+        dataset = {key: options[key] for key in snapshots.DEFAULT_PARAMS}
+        snapshot = snapshots.snapshot_path('bench', **dataset)
+
+        results = {}
+        cached = snapshots.supported() and os.path.exists(snapshot)
+        with benchmark_database(snapshot=snapshot if cached else None):
+            if Post.objects.count() != options['posts']:
+                saved = f' (saved as {snapshot})' if snapshots.supported() else ''
+                self.stdout.write(f'Seeding {options["posts"]} posts{saved}...')
+                snapshots.build(snapshot, **dataset)
+            self.prepare()
+            # Потоки відкривають власні з'єднання, головне не тримає блокувань
+            connections.close_all()
+
+            feed_settings = {'FEED_CACHE_TIMEOUT': 0} if options['no_feed_cache'] else {}
+            with override_settings(**feed_settings):
+                for name in options['endpoints']:
+                    results[name] = self.run_endpoint(name)
+                    self.report(name, results[name])
+
+        peak = peak_rss_mb()
+        self.stdout.write(f'\nPeak RSS: {peak:.1f} MB')
+        payload = {
+            'vendor': connection.vendor,
+            'options': {key: options[key] for key in ('requests', 'auth_requests', 'warmup', 'concurrency', 'no_feed_cache')},
+            'dataset': dataset,
+            'results': results,
+            'peak_rss_mb': peak,
+        }
+        if options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as fh:
+                json.dump(payload, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"✓ Results written to {options['json_path']}"))
+        if options['baseline']:
+            self.compare(results, options['baseline'], options['threshold'], options['min_delta_ms'])
+
+    # --- Підготовка: читач, пости його гуртожитку, користувачі для входу ---
+    def prepare(self):
+        profile = StudentProfile.objects.select_related('user').order_by('id').first()
+        if profile is None:
+            raise CommandError('The benchmark needs at least one seeded user (--users > 0)')
+        self.headers = {'Authorization': f'Token {issue_token(profile.user, profile)}'}
+        self.post_ids = list(
+            Post.objects.filter(dorm_number=profile.dorm_number).order_by('-id').values_list('id', flat=True)[:500]
+        )
+        self.usernames = list(User.objects.order_by('id').values_list('username', flat=True)[:200])
+        first_page = Client().get('/api/posts/', headers=self.headers).json()
+        self.next_cursor = first_page['next'] or '/api/posts/'
+        self.run_id = time.time_ns()
+
+    def make_request(self, name, client, i):
+        if name == 'feed':
+            return client.get('/api/posts/', headers=self.headers)
+        if name == 'feed_next':
+            return client.get(self.next_cursor, headers=self.headers)
+        if name == 'detail':
+            return client.get(f'/api/posts/{self.post_ids[i % len(self.post_ids)]}/', headers=self.headers)
+        if name == 'batch':
+            start = i * BATCH_SIZE % len(self.post_ids)
+            ids = ','.join(str(post_id) for post_id in (self.post_ids * 2)[start:start + BATCH_SIZE])
+            return client.get(f'/api/posts/batch/?ids={ids}', headers=self.headers)
+        if name == 'changes':
+            return client.get('/api/posts/changes/', headers=self.headers)
+        if name == 'search':
+            word = ITEMS[i % len(ITEMS)].split()[0]
+            return client.get('/api/posts/search/', {'q': word}, headers=self.headers)
+        if name == 'login':
+            payload = {'username': self.usernames[i % len(self.usernames)], 'password': PASSWORD}
+            return client.post('/api/auth/login/', payload, content_type='application/json')
+        if name == 'register':
+            payload = {'username': f'bench_{self.run_id}_{i}', 'password': PASSWORD}
+            return client.post('/api/auth/register/', payload, content_type='application/json')
+        raise CommandError(f'Unknown endpoint {name}')
+
+    def run_endpoint(self, name):
+        opts = self.options
+        total = opts['auth_requests'] if name in AUTH_ENDPOINTS else opts['requests']
+        warmup = min(opts['warmup'], total)
+        # Окремий діапазон індексів для прогріву, щоб register не повторював імена
+        counter = itertools.count(-warmup)
+        lock = threading.Lock()
+        latencies, queries, errors = [], [], []
+
+        def worker():
+            client = Client()
+            try:
+                while True:
+                    with lock:
+                        i = next(counter)
+                    if i >= total:
+                        return
+                    with CaptureQueriesContext(connection) as captured:
+                        started = time.perf_counter()
+                        response = self.make_request(name, client, i)
+                        elapsed = time.perf_counter() - started
+                    if i < 0:
+                        continue
+                    with lock:
+                        latencies.append(elapsed)
+                        queries.append(len(captured))
+                        if response.status_code >= 400:
+                            errors.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(max(1, opts['concurrency']))]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+
+        result = summarize(latencies)
+        result.update({
+            'throughput_rps': len(latencies) / wall if wall else 0.0,
+            'queries_mean': sum(queries) / len(queries) if queries else 0.0,
+            'queries_max': max(queries, default=0),
+            'errors': len(errors),
+            'peak_rss_mb': peak_rss_mb(),
+        })
+        return result
+
+    def report(self, name, result):
+        self.stdout.write(
+            f"  {name:<10} {format_summary(result)}  {result['throughput_rps']:.0f} req/s  "
+            f"queries={result['queries_mean']:.1f} (max {result['queries_max']})  "
+            f"errors={result['errors']}  rss={result['peak_rss_mb']:.0f}MB"
+        )
+
+    def compare(self, results, baseline_path, threshold, min_delta_ms=1.0):
+        with open(baseline_path, encoding='utf-8') as fh:
+            baseline = json.load(fh)['results']
+
+        self.stdout.write(f'\nCompared with {baseline_path} (threshold +{threshold:.0%}):')
+        regressions = []
+        for name, result in results.items():
+            before = baseline.get(name)
+            if not before or not before.get('count') or not result.get('count'):
+                continue
+            changes = []
+            for metric in COMPARED_METRICS:
+                ratio = result[metric] / before[metric] - 1 if before[metric] else 0.0
+                changes.append(f'{metric} {ratio:+.0%}')
+                # Субмілісекундні коливання - шум, а не регресія
+                if ratio > threshold and result[metric] - before[metric] > min_delta_ms:
+                    regressions.append(f'{name} {metric}: {before[metric]:.1f}ms -> {result[metric]:.1f}ms')
+            if result['queries_mean'] > before['queries_mean']:
+                regressions.append(f"{name} queries: {before['queries_mean']:.1f} -> {result['queries_mean']:.1f}")
+            self.stdout.write(f"  {name:<10} {', '.join(changes)}, queries {before['queries_mean']:.1f} -> {result['queries_mean']:.1f}")
+
+        if regressions:
+            raise CommandError('Performance regressions:\n  ' + '\n  '.join(regressions))
+        self.stdout.write(self.style.SUCCESS('✓ No regressions'))
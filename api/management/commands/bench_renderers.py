@@ -0,0 +1,124 @@
+"""
+Django management command to compare response renderers on a seeded feed.
+
+Usage:
+    python manage.py bench_renderers
+    python manage.py bench_renderers --pages 50 --page-size 100 --repeat 20
+    python manage.py bench_renderers --json renderers.json
+
+Loads feed pages of one seeded reader through ``GET /api/posts/`` (the same
+``seed_data`` snapshot as ``bench_endpoints``) and times encoding every page
+with DRF's ``JSONRenderer``, ``FastJSONRenderer`` and, when ``msgpack`` is
+installed, ``MessagePackRenderer``. For each renderer the report has the
+median encode time per page and the payload size, raw and gzipped. The
+command fails if ``FastJSONRenderer`` output differs from ``JSONRenderer``
+by a single byte.
+"""
+
+import gzip
+import json
+import os
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from rest_framework.renderers import JSONRenderer
+
+from api import renderers, snapshots
+from api.authentication import issue_token
+from api.bench import benchmark_database
+from api.models import Post, StudentProfile
+
+
+class Command(BaseCommand):
+    help = 'Compares encode time and payload size of the JSON and MessagePack renderers on feed pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Seeded students (default: 1000)')
+        parser.add_argument('--posts', type=int, default=20000, help='Seeded posts (default: 20000)')
+        parser.add_argument('--dorms', type=int, default=10, help='Seeded dorms (default: 10)')
+        parser.add_argument('--seed', type=int, default=0, help='Dataset seed (default: 0)')
+        parser.add_argument('--pages', type=int, default=20, help='Feed pages to encode (default: 20)')
+        parser.add_argument('--page-size', type=int, default=100, help='Posts per page (default: 100)')
+        parser.add_argument('--repeat', type=int, default=10, help='Timed runs per renderer (default: 10)')
+        parser.add_argument('--json', dest='json_path', help='Write results to this JSON file')
+
+    def handle(self, *args, **options):
+        dataset = {key: options[key] for key in snapshots.DEFAULT_PARAMS}
+        snapshot = snapshots.snapshot_path('bench', **dataset)
+        cached = snapshots.supported() and os.path.exists(snapshot)
+        with benchmark_database(snapshot=snapshot if cached else None):
+            if Post.objects.count() != options['posts']:
+                self.stdout.write(f'Seeding {options["posts"]} posts...')
+                snapshots.build(snapshot, **dataset)
+            pages = self.load_pages(options['pages'], options['page_size'])
+
+        candidates = [('JSONRenderer', JSONRenderer()), ('FastJSONRenderer', renderers.FastJSONRenderer())]
+        if renderers.msgpack is not None:
+            candidates.append(('MessagePackRenderer', renderers.MessagePackRenderer()))
+        else:
+            self.stdout.write('msgpack is not installed - MessagePackRenderer skipped')
+        self.stdout.write(
+            f"Encoding {len(pages)} pages of {options['page_size']} posts "
+            f"(orjson: {'yes' if renderers.orjson is not None else 'no, stdlib fallback'})"
+        )
+
+        reference = [JSONRenderer().render(page) for page in pages]
+        if [renderers.FastJSONRenderer().render(page) for page in pages] != reference:
+            raise CommandError('FastJSONRenderer output differs from JSONRenderer')
+
+        results = {}
+        for label, renderer in candidates:
+            results[label] = self.measure(renderer, pages, options['repeat'])
+            result = results[label]
+            self.stdout.write(
+                f"  {label:<20} {result['encode_us_per_page']:>9,.0f} µs/page  "
+                f"{result['bytes_per_page']:>9,.0f} B/page  {result['gzip_bytes_per_page']:>8,.0f} B gzipped"
+            )
+
+        base = results['JSONRenderer']
+        for label, result in results.items():
+            result['speedup'] = base['encode_us_per_page'] / result['encode_us_per_page']
+            result['size_ratio'] = result['bytes_per_page'] / base['bytes_per_page']
+        fast = results['FastJSONRenderer']
+        self.stdout.write(self.style.SUCCESS(f"✓ Identical JSON, {fast['speedup']:.1f}x faster encoding"))
+        if 'MessagePackRenderer' in results:
+            packed = results['MessagePackRenderer']
+            self.stdout.write(f"  MessagePack: {packed['size_ratio']:.0%} of the JSON size, {packed['speedup']:.1f}x encode speed")
+
+        if options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as fh:
+                json.dump({'options': {k: v for k, v in options.items() if k != 'json_path'}, 'results': results},
+                          fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"✓ Results written to {options['json_path']}"))
+
+    def load_pages(self, count, page_size):
+        # Справжні відповіді стрічки (до рендерингу) - дані такі ж, як у продакшені
+        profile = StudentProfile.objects.select_related('user').order_by('id').first()
+        if profile is None:
+            raise CommandError('The benchmark needs at least one seeded user (--users > 0)')
+        client = Client(headers={'Authorization': f'Token {issue_token(profile.user, profile)}'})
+        pages = []
+        url = f'/api/posts/?page_size={page_size}'
+        while url and len(pages) < count:
+            response = client.get(url)
+            if response.status_code != 200:
+                raise CommandError(f'GET {url} returned {response.status_code}')
+            pages.append(response.data)
+            url = response.data['next']
+        return pages
+
+    def measure(self, renderer, pages, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for page in pages:
+                renderer.render(page)
+            timings.append((time.perf_counter() - started) / len(pages))
+        encoded = [renderer.render(page) for page in pages]
+        return {
+            'encode_us_per_page': statistics.median(timings) * 1e6,
+            'bytes_per_page': statistics.fmean(len(body) for body in encoded),
+            'gzip_bytes_per_page': statistics.fmean(len(gzip.compress(body)) for body in encoded),
+        }
@@ -0,0 +1,84 @@
+"""
+Django management command to micro-benchmark post serialization.
+
+Usage:
+    python manage.py bench_serializers
+    python manage.py bench_serializers --posts 5000 --repeat 20
+    python manage.py bench_serializers --no-request  # Without absolute URLs
+
+Measures posts/sec through ``PostSerializer(many=True)`` and the compiled
+``FastPostSerializer`` on in-memory posts (no database), and checks that
+both produce the same output.
+"""
+
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.utils import timezone
+
+from api.models import Category, Post
+from api.serializers import FastPostSerializer, PostSerializer
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks PostSerializer(many=True) against the compiled FastPostSerializer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000, help='Posts per list (default: 1000)')
+        parser.add_argument('--repeat', type=int, default=10, help='Timed runs per serializer (default: 10)')
+        parser.add_argument('--no-request', action='store_true', help='Serialize without a request in the context')
+
+    def handle(self, *args, **options):
+        posts = self.build_posts(options['posts'])
+        context = {} if options['no_request'] else {'request': RequestFactory().get('/api/posts/')}
+
+        reference = PostSerializer(posts, many=True, context=context).data
+        if FastPostSerializer(posts, many=True, context=context).data != reference:
+            raise CommandError('FastPostSerializer output differs from PostSerializer')
+
+        rates = {}
+        for label, serializer_class in (('PostSerializer', PostSerializer), ('FastPostSerializer', FastPostSerializer)):
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                serializer_class(posts, many=True, context=context).data
+                timings.append(time.perf_counter() - started)
+            rates[label] = len(posts) / statistics.median(timings)
+            self.stdout.write(
+                f'  {label:<20} {rates[label]:>10,.0f} posts/s  '
+                f'(median {statistics.median(timings) * 1000:.1f} ms per {len(posts)} posts)'
+            )
+
+        speedup = rates['FastPostSerializer'] / rates['PostSerializer']
+        self.stdout.write(self.style.SUCCESS(f'✓ Identical output, {speedup:.1f}x faster'))
+
+    def build_posts(self, count):
+        # Пости в пам'яті: вимірюємо лише серіалізацію, без БД
+        now = timezone.now()
+        authors = [
+            User(id=i + 1, username=f'student_{i}', email=f's{i}@example.com', is_staff=(i % 5 == 0))
+            for i in range(20)
+        ]
+        categories = [Category(id=i + 1, name=f'Категорія {i}') for i in range(5)]
+        posts = []
+        for i in range(count):
+            post = Post(
+                id=i + 1,
+                title=f'Оголошення {i}',
+                slug=f'ogoloshennia-{i}',
+                content='Текст оголошення. ' * 10,
+                dorm_number=i % 10 + 1,
+                author=authors[i % len(authors)] if i % 7 else None,
+                category=categories[i % len(categories)] if i % 3 else None,
+                attachment=f'attachments/file_{i}.pdf' if i % 4 == 0 else None,
+                pinned=i % 50 == 0,
+                created_at=now - timedelta(minutes=i),
+                updated_at=now - timedelta(minutes=i),
+                published_at=now - timedelta(minutes=i) if i % 2 else None,
+            )
+            posts.append(post)
+        return posts
@@ -0,0 +1,171 @@
+"""
+Django management command to check that SQLite readers never wait for writers.
+
+Usage:
+    python manage.py bench_sqlite_concurrency
+    python manage.py bench_sqlite_concurrency --writers 8 --readers 8 --duration 10
+    python manage.py bench_sqlite_concurrency --hold-ms 500 --json sqlite-bench.json
+
+For ``--duration`` seconds, ``--writers`` threads create posts through
+``POST /api/posts/``, ``--readers`` threads read the feed (without the page
+cache, so every read hits SQLite) and one more thread keeps a write
+transaction open for ``--hold-ms`` at a time. With the settings' WAL
+profile, readers keep reading from the last committed snapshot while that
+transaction is open and writers queue on ``busy_timeout`` instead of
+failing. The command fails if any request errored ("database is locked"
+shows up as a 500) or if the slowest read took longer than ``--hold-ms``,
+which would mean a reader waited for the held lock.
+
+Runs against a throw-away database file; ``db.sqlite3`` is not touched.
+"""
+
+import json
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.test import Client, override_settings
+
+from api.authentication import issue_token
+from api.bench import benchmark_database, format_summary, summarize
+from api.models import Post, StudentProfile
+
+
+DORM = 1
+
+
+class Command(BaseCommand):
+    help = 'Checks that SQLite readers are not blocked by concurrent writers (WAL profile)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4, help='Threads creating posts (default: 4)')
+        parser.add_argument('--readers', type=int, default=4, help='Threads reading the feed (default: 4)')
+        parser.add_argument('--duration', type=float, default=5.0, help='Seconds to run (default: 5)')
+        parser.add_argument('--hold-ms', type=float, default=250.0,
+                            help='How long the extra writer keeps its transaction open (default: 250)')
+        parser.add_argument('--posts', type=int, default=2000, help='Posts seeded before the run (default: 2000)')
+        parser.add_argument('--json', dest='json_path', help='Write results to this JSON file')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('This benchmark is for the SQLite backend')
+        self.options = options
+        with benchmark_database():
+            journal_mode = self.pragma('journal_mode')
+            self.stdout.write(
+                f'journal_mode={journal_mode} synchronous={self.pragma("synchronous")} '
+                f'busy_timeout={self.pragma("busy_timeout")}ms'
+            )
+            self.headers = self.seed()
+            connections.close_all()
+            with override_settings(FEED_CACHE_TIMEOUT=0):
+                result = self.run()
+        result['journal_mode'] = journal_mode
+
+        self.stdout.write(f"  reads:  {format_summary(result['reads'])}")
+        self.stdout.write(f"  writes: {format_summary(result['writes'])}  {result['writes_per_sec']:.0f}/s")
+        self.stdout.write(f"  held write transactions: {result['holds']}  errors: {result['errors']}")
+        if options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as fh:
+                json.dump({'options': {k: v for k, v in options.items() if k != 'json_path'}, 'results': result},
+                          fh, indent=2, default=str)
+            self.stdout.write(self.style.SUCCESS(f"✓ Results written to {options['json_path']}"))
+
+        problems = []
+        if result['errors']:
+            problems.append(f"{len(result['errors'])} failed requests: {sorted(set(result['errors']))[:5]}")
+        if result['reads'].get('max_ms', 0) >= options['hold_ms']:
+            problems.append(f"slowest read {result['reads']['max_ms']:.0f}ms >= --hold-ms {options['hold_ms']:.0f}ms")
+        if problems:
+            raise CommandError('Readers were blocked or writes failed:\n  ' + '\n  '.join(problems))
+        self.stdout.write(self.style.SUCCESS('✓ Readers never waited for writers'))
+
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def seed(self):
+        user = User.objects.create_user(username='bench_writer', password='benchpass123')
+        profile = StudentProfile.objects.create(user=user, dorm_number=DORM)
+        Post.objects.bulk_create([
+            Post(title=f'Оголошення {i}', content='Текст оголошення. ' * 20, dorm_number=DORM)
+            for i in range(self.options['posts'])
+        ])
+        return {'Authorization': f'Token {issue_token(user, profile)}'}
+
+    def run(self):
+        opts = self.options
+        deadline = time.perf_counter() + opts['duration']
+        lock = threading.Lock()
+        reads, writes, errors = [], [], []
+        holds = [0]
+
+        def timed(samples, request):
+            started = time.perf_counter()
+            try:
+                response = request()
+            except Exception as e:
+                with lock:
+                    errors.append(f'{type(e).__name__}: {e}')
+                return
+            elapsed = time.perf_counter() - started
+            with lock:
+                if response.status_code >= 400:
+                    errors.append(f'HTTP {response.status_code}')
+                else:
+                    samples.append(elapsed)
+
+        def reader():
+            client = Client()
+            while time.perf_counter() < deadline:
+                timed(reads, lambda: client.get('/api/posts/', headers=self.headers))
+
+        def writer(n):
+            client = Client()
+            i = 0
+            while time.perf_counter() < deadline:
+                payload = {'title': f'Запис {n}-{i}', 'content': 'Текст'}
+                timed(writes, lambda: client.post('/api/posts/', payload, headers=self.headers))
+                i += 1
+
+        def holder():
+            # Тримає блокування запису, поки читачі працюють
+            while time.perf_counter() < deadline:
+                try:
+                    with transaction.atomic():
+                        Post.objects.create(title='Довга транзакція', content='Текст', dorm_number=DORM)
+                        time.sleep(opts['hold_ms'] / 1000)
+                except Exception as e:
+                    with lock:
+                        errors.append(f'{type(e).__name__}: {e}')
+                else:
+                    holds[0] += 1
+                # Пауза, щоб і звичайні записувачі встигали
+                time.sleep(opts['hold_ms'] / 1000)
+
+        targets = [reader] * opts['readers'] + [lambda n=n: writer(n) for n in range(opts['writers'])] + [holder]
+
+        def run_target(target):
+            try:
+                target()
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run_target, args=(target,)) for target in targets]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+
+        return {
+            'reads': summarize(reads),
+            'writes': summarize(writes),
+            'writes_per_sec': len(writes) / wall if wall else 0.0,
+            'holds': holds[0],
+            'errors': errors,
+        }
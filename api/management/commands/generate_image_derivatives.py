@@ -0,0 +1,69 @@
+"""
+Django management command to backfill responsive derivatives of post images.
+
+Usage:
+    python manage.py generate_image_derivatives
+    python manage.py generate_image_derivatives --workers 8
+    python manage.py generate_image_derivatives --force  # Re-render everything
+"""
+
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from api import images
+from api.models import Post
+
+
+def _render(original_name):
+    return original_name, images.render_derivatives(original_name)
+
+
+class Command(BaseCommand):
+    help = 'Generates small/medium/original WebP and JPEG derivatives for post images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Worker processes (default: number of CPUs)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Posts loaded and submitted per batch (default: 200)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Re-render derivatives that already exist',
+        )
+
+    def handle(self, *args, **options):
+        queryset = Post.objects.exclude(image='').exclude(image__isnull=True)
+        started = time.perf_counter()
+        done = failed = 0
+
+        batches = images.map_in_pool(
+            queryset.only('id', 'image', 'image_variants'), _render, lambda post: post.image.name,
+            options['workers'], options['batch_size'],
+            select=lambda post: options['force'] or images.needs_derivatives(post),
+        )
+        for last_id, results in batches:
+            for post, result, error in results:
+                if error is not None:
+                    failed += 1
+                    self.stdout.write(self.style.WARNING(f'  Post {post.id}: {error}'))
+                    continue
+                original_name, variants = result
+                Post.objects.filter(pk=post.pk, image=original_name).update(image_variants=variants)
+                done += 1
+            self.stdout.write(f'  Processed posts up to id {last_id} ({done} rendered)')
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Rendered derivatives for {done} posts in {elapsed:.1f}s ({failed} failed)'
+        ))
@@ -0,0 +1,43 @@
+"""
+Django management command to prune the post change log used by delta sync.
+
+Usage:
+    python manage.py prune_post_changes
+    python manage.py prune_post_changes --days 7
+
+Deletes ``PostChange`` rows older than ``--days`` (default
+``POST_CHANGE_RETENTION_DAYS``). Clients whose watermark falls into the
+pruned range get 410 Gone from ``/api/posts/changes/`` and sync from scratch.
+Run it daily, e.g. from cron.
+"""
+
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.sync import PRUNE_BATCH_SIZE, prune_changes
+
+
+class Command(BaseCommand):
+    help = 'Deletes post change log entries older than the retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=getattr(settings, 'POST_CHANGE_RETENTION_DAYS', 30),
+            help='Keep changes from the last N days (default: POST_CHANGE_RETENTION_DAYS)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=PRUNE_BATCH_SIZE,
+            help=f'Rows deleted per statement (default: {PRUNE_BATCH_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 0 or options['batch_size'] < 1:
+            raise CommandError('--days must be >= 0 and --batch-size >= 1')
+        deleted = prune_changes(datetime.timedelta(days=options['days']), batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'✓ Deleted {deleted} changes older than {options["days"]} days'))
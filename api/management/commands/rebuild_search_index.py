@@ -0,0 +1,23 @@
+"""
+Django management command to rebuild the full-text search index of posts.
+
+Usage:
+    python manage.py rebuild_search_index
+"""
+
+from django.core.management.base import BaseCommand
+
+from api.search import fts_available, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the FTS5 search index of posts in one transaction'
+
+    def handle(self, *args, **options):
+        if not fts_available():
+            self.stdout.write(self.style.WARNING('Full-text index is only used with SQLite, nothing to do.'))
+            return
+
+        self.stdout.write(self.style.SUCCESS('Rebuilding search index...'))
+        total = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'✓ Indexed {total} posts'))
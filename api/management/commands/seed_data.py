@@ -4,12 +4,32 @@ Django management command to seed the database with test data.
 Usage:
     python manage.py seed_data
     python manage.py seed_data --clear  # Clear existing data first
+
+Scale mode (capacity testing):
+    python manage.py seed_data --users 50000 --posts 1000000 --dorms 20 --seed 42
+    python manage.py seed_data --posts 1000000 --workers 4 --batch-size 10000
+
+Scale mode generates deterministic Ukrainian-language dorm data with
+``api/seeding.py`` and inserts it with batched ``bulk_create``, one
+transaction per batch. Every synthetic user shares one precomputed password
+hash (``password123``).
 """
 
-from django.core.management.base import BaseCommand
+import time
+from collections import deque
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 from django.utils import timezone
+from django.utils.text import slugify
 from datetime import timedelta
-from api.models import User, Category, Post
+from api import seeding
+from api.workers import worker_pool
+from api.models import User, Category, Post, StudentProfile, explicit_timestamps
+
+
+SCALE_PASSWORD = 'password123'
 
 
 class Command(BaseCommand):
@@ -21,6 +41,28 @@ class Command(BaseCommand):
             action='store_true',
             help='Clear existing data before seeding',
         )
+        parser.add_argument('--users', type=int, help='Scale mode: synthetic students to create')
+        parser.add_argument('--posts', type=int, help='Scale mode: synthetic posts to create')
+        parser.add_argument('--dorms', type=int, default=10, help='Scale mode: number of dorms (default: 10)')
+        parser.add_argument('--seed', type=int, default=0, help='Scale mode: random seed (default: 0)')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Scale mode: rows per bulk_create and transaction (default: 5000)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Scale mode: processes generating content (default: 1, no multiprocessing)',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='Scale mode: spread post dates over this many past days (default: 365)',
+        )
 
     def handle(self, *args, **options):
         if options['clear']:
@@ -31,6 +73,10 @@ class Command(BaseCommand):
             User.objects.filter(is_superuser=False).delete()
             self.stdout.write(self.style.SUCCESS('Existing data cleared.'))
 
+        if options['users'] is not None or options['posts'] is not None:
+            self.seed_scale(options)
+            return
+
         self.stdout.write(self.style.SUCCESS('Starting to seed data...'))
 
         # Create Users
@@ -50,6 +96,132 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS('  Username: admin'))
         self.stdout.write(self.style.SUCCESS('  Password: admin123'))
 
+    # --- Масштабний режим ---
+
+    def seed_scale(self, options):
+        users, posts = options['users'] or 0, options['posts'] or 0
+        dorms, seed = options['dorms'], options['seed']
+        if users < 0 or posts < 0 or dorms < 1 or options['batch_size'] < 1 or options['days'] < 1:
+            raise CommandError('--users/--posts must be >= 0; --dorms, --batch-size and --days must be >= 1')
+        self.batch_size = options['batch_size']
+        self.workers = options['workers']
+
+        started = time.perf_counter()
+        pool = None
+        if options['workers'] > 1:
+            pool = worker_pool(options['workers'])
+        try:
+            categories = self.seed_categories()
+            user_ids = self.seed_users(pool, seed, users, dorms)
+            self.seed_posts(pool, seed, user_ids, dorms, categories, posts, options['days'])
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        elapsed = time.perf_counter() - started
+        total = users * 2 + posts
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Seeded {users} users and {posts} posts across {dorms} dorms in {elapsed:.1f}s '
+            f'({total / elapsed if elapsed else 0:,.0f} rows/s)'
+        ))
+
+    def generate(self, pool, fn, args, chunks):
+        """
+        Yield ``fn(*args, chunk)`` for every chunk, in order.
+
+        With a pool only a few chunks are in flight, so memory stays flat
+        however many rows are generated.
+        """
+        if pool is None:
+            for chunk in chunks:
+                yield fn(*args, chunk)
+            return
+        window = deque()
+        for chunk in chunks:
+            window.append(pool.submit(fn, *args, chunk))
+            if len(window) >= self.workers * 2:
+                yield window.popleft().result()
+        while window:
+            yield window.popleft().result()
+
+    def batches(self, rows_per_chunk):
+        batch = []
+        for rows in rows_per_chunk:
+            batch.extend(rows)
+            while len(batch) >= self.batch_size:
+                yield batch[:self.batch_size]
+                batch = batch[self.batch_size:]
+        if batch:
+            yield batch
+
+    def report(self, label, done, total, started):
+        elapsed = time.perf_counter() - started
+        rate = done / elapsed if elapsed else 0
+        self.stdout.write(f'  {label}: {done}/{total} ({rate:,.0f} rows/s)')
+
+    def seed_categories(self):
+        ids = []
+        for name, description in seeding.CATEGORIES:
+            category, _ = Category.objects.get_or_create(name=name, defaults={'description': description})
+            ids.append(category.pk)
+        return ids
+
+    def seed_users(self, pool, seed, total, dorms):
+        if not total:
+            return []
+        first = seeding.generate_users(seed, dorms, (0, 0, 1))[0][0]
+        if User.objects.filter(username=first).exists():
+            raise CommandError(f'User {first} already exists; run with --clear or another --seed')
+
+        # PBKDF2 - сотні мілісекунд; рахуємо один раз на всіх
+        password = make_password(SCALE_PASSWORD)
+        user_ids = []
+        started = time.perf_counter()
+        for batch in self.batches(self.generate(pool, seeding.generate_users, (seed, dorms), seeding.chunks(total))):
+            with transaction.atomic():
+                created = User.objects.bulk_create([
+                    User(username=username, first_name=first_name, last_name=last_name,
+                         password=password, is_active=True)
+                    for username, first_name, last_name, _ in batch
+                ], batch_size=self.batch_size)
+                StudentProfile.objects.bulk_create([
+                    StudentProfile(user_id=user.pk, dorm_number=row[3], is_approved=True)
+                    for user, row in zip(created, batch)
+                ], batch_size=self.batch_size)
+            user_ids.extend(user.pk for user in created)
+            self.report('users', len(user_ids), total, started)
+        return user_ids
+
+    def seed_posts(self, pool, seed, user_ids, dorms, categories, total, days):
+        if not total:
+            return
+        now = timezone.now()
+        args = (seed, len(user_ids), dorms, len(categories), days * 24 * 3600)
+        done = 0
+        started = time.perf_counter()
+        with explicit_timestamps():
+            for batch in self.batches(self.generate(pool, seeding.generate_posts, args, seeding.chunks(total))):
+                objs = []
+                for title, content, dorm, author, category, pinned, age in batch:
+                    created_at = now - timedelta(seconds=age)
+                    objs.append(Post(
+                        title=title,
+                        slug=slugify(title, allow_unicode=True)[:220],
+                        content=content,
+                        dorm_number=dorm,
+                        author_id=user_ids[author] if author is not None else None,
+                        category_id=categories[category] if category is not None else None,
+                        pinned=pinned,
+                        created_at=created_at,
+                        updated_at=created_at,
+                        published_at=created_at,
+                    ))
+                # PostQuerySet.bulk_create також пише журнал змін і скидає кеш стрічки
+                with transaction.atomic():
+                    Post.objects.bulk_create(objs, batch_size=self.batch_size)
+                done += len(objs)
+                self.report('posts', done, total, started)
+
     def create_users(self):
         """Create test users"""
         users = []
@@ -61,10 +233,8 @@ class Command(BaseCommand):
                 'email': 'admin@example.com',
                 'first_name': 'Admin',
                 'last_name': 'User',
-                'bio': 'System administrator with full access to the platform.',
                 'is_staff': True,
                 'is_superuser': True,
-                'role': User.Role.ADMINISTRATOR,
             }
         )
         if created:
@@ -80,32 +250,28 @@ class Command(BaseCommand):
                 'email': 'john@example.com',
                 'first_name': 'John',
                 'last_name': 'Doe',
-                'bio': 'Tech enthusiast and blogger. Love writing about web development and programming.',
-                'role': User.Role.STUDENT,
+                'is_staff': False,
             },
             {
                 'username': 'jane_smith',
                 'email': 'jane@example.com',
                 'first_name': 'Jane',
                 'last_name': 'Smith',
-                'bio': 'Content creator and digital marketer. Passionate about sharing knowledge.',
-                'role': User.Role.PRIVILEGED,
+                'is_staff': True,
             },
             {
                 'username': 'alex_writer',
                 'email': 'alex@example.com',
                 'first_name': 'Alex',
                 'last_name': 'Writer',
-                'bio': 'Professional writer and editor. Specializing in technology and lifestyle content.',
-                'role': User.Role.STUDENT,
+                'is_staff': False,
             },
             {
                 'username': 'sarah_tech',
                 'email': 'sarah@example.com',
                 'first_name': 'Sarah',
                 'last_name': 'Tech',
-                'bio': 'Software engineer and tech blogger. Focused on Python and Django development.',
-                'role': User.Role.PRIVILEGED,
+                'is_staff': True,
             },
         ]
 
@@ -114,7 +280,6 @@ class Command(BaseCommand):
                 username=data['username'],
                 defaults={
                     **data,
-                    'is_staff': False,
                     'is_superuser': False,
                 }
             )
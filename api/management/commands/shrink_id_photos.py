@@ -0,0 +1,99 @@
+"""
+Django management command to downscale and recompress student ID photos
+uploaded before they were processed on ingest.
+
+Usage:
+    python manage.py shrink_id_photos
+    python manage.py shrink_id_photos --workers 8
+    python manage.py shrink_id_photos --force  # Re-encode already shrunk photos
+"""
+
+import os
+import time
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from api import images
+from api.models import StudentProfile
+
+
+def _shrink(name):
+    with default_storage.open(name, 'rb') as fh:
+        before = default_storage.size(name)
+        data, thumbnail = images.process_id_photo(fh)
+    stem, _ = os.path.splitext(name)
+    new_name = default_storage.save(f'{stem}.webp', ContentFile(data))
+    images.store_id_photo_thumbnail(new_name, thumbnail)
+    return name, new_name, before, len(data)
+
+
+def _discard(name, keep):
+    # "photo.jpg" і "photo.webp" мають спільну мініатюру "photo.thumb.webp"
+    for stale, kept in ((name, keep), (images.id_photo_thumbnail_name(name), images.id_photo_thumbnail_name(keep))):
+        if stale != kept:
+            default_storage.delete(stale)
+
+
+def _is_shrunk(name):
+    return name.endswith('.webp') and default_storage.exists(images.id_photo_thumbnail_name(name))
+
+
+class Command(BaseCommand):
+    help = 'Downscales student ID photos to WebP and generates their admin thumbnails'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Worker processes (default: number of CPUs)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Profiles loaded and submitted per batch (default: 200)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Re-encode photos that are already WebP',
+        )
+
+    def handle(self, *args, **options):
+        queryset = StudentProfile.objects.exclude(student_id_photo='').exclude(student_id_photo__isnull=True)
+        started = time.perf_counter()
+        done = failed = 0
+        bytes_before = bytes_after = 0
+
+        batches = images.map_in_pool(
+            queryset.only('id', 'student_id_photo'), _shrink, lambda profile: profile.student_id_photo.name,
+            options['workers'], options['batch_size'],
+            select=lambda profile: options['force'] or not _is_shrunk(profile.student_id_photo.name),
+        )
+        for last_id, results in batches:
+            for profile, result, error in results:
+                if error is not None:
+                    failed += 1
+                    self.stdout.write(self.style.WARNING(f'  Profile {profile.id}: {error}'))
+                    continue
+                old_name, new_name, before, after = result
+                # update() без сигналів: зміна фото не має відкликати токени
+                updated = StudentProfile.objects.filter(pk=profile.pk, student_id_photo=old_name).update(student_id_photo=new_name)
+                if not updated:
+                    # Фото замінили, поки ми його обробляли - результат уже не потрібен
+                    _discard(new_name, keep=old_name)
+                    continue
+                _discard(old_name, keep=new_name)
+                done += 1
+                bytes_before += before
+                bytes_after += after
+            self.stdout.write(f'  Processed profiles up to id {last_id} ({done} shrunk)')
+
+        elapsed = time.perf_counter() - started
+        saved_mb = (bytes_before - bytes_after) / (1024 * 1024)
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Shrunk {done} ID photos in {elapsed:.1f}s, saved {saved_mb:.1f} MB ({failed} failed)'
+        ))
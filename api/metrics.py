@@ -0,0 +1,401 @@
+"""
+Prometheus metrics that aggregate across worker processes.
+
+Every process keeps its values in its own memory-mapped file under
+``METRICS_DIR``: an append-only list of ``(key, float64)`` entries, updated
+in place. Writing a sample costs two dictionary lookups (the encoded key
+of each series is cached) and an 8-byte store, with no locks shared
+between processes. ``/metrics`` reads every file in
+the directory and sums them, so any worker can answer a scrape for the
+whole server (gunicorn, uvicorn workers) without an external collector.
+
+Counters and histograms of exited workers are kept (Prometheus expects
+counters never to go down); gauges are summed over live processes only.
+Clear ``METRICS_DIR`` when the server restarts. Without ``METRICS_DIR`` a
+per-process temporary directory is used, which is fine for one worker; the
+process removes it when it exits.
+
+``/metrics`` answers staff users (admin session) and, if ``METRICS_TOKEN``
+is set, requests with ``Authorization: Bearer <token>`` (Prometheus).
+Anonymous scrapes need ``METRICS_PUBLIC = True``.
+
+Settings:
+    METRICS_DIR     directory shared by all workers (default: per-process temp dir)
+    METRICS_TOKEN   bearer token accepted by ``/metrics``
+    METRICS_PUBLIC  serve ``/metrics`` to anyone (default: False)
+"""
+
+import atexit
+import bisect
+import functools
+import glob
+import json
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+
+from . import timing
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UPLOAD_BUCKETS = (16 * 1024, 64 * 1024, 256 * 1024, 1024 ** 2, 4 * 1024 ** 2, 16 * 1024 ** 2, 64 * 1024 ** 2)
+
+# name -> (type, help, buckets)
+METRICS = {
+    'http_request_duration_seconds': ('histogram', 'Request latency by view.', LATENCY_BUCKETS),
+    'http_responses_total': ('counter', 'Responses by view and status code.', None),
+    'http_request_db_queries_total': ('counter', 'SQL queries issued by view.', None),
+    'http_request_db_seconds_total': ('counter', 'Time spent in SQL by view.', None),
+    'http_upload_size_bytes': ('histogram', 'Size of multipart upload request bodies by view.', UPLOAD_BUCKETS),
+    'http_requests_in_flight': ('gauge', 'Requests being processed.', None),
+    'feed_cache_requests_total': ('counter', 'Feed page cache lookups by result.', None),
+}
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+# --- Файл значень одного процесу ---
+
+class ValueFile:
+    """
+    Append-only ``key -> float64`` map in a memory-mapped file.
+
+    Layout: a 4-byte "used" offset (padded to 8), then entries of a 4-byte
+    key length, the UTF-8 key padded to 8-byte alignment and the value.
+    """
+
+    INITIAL_SIZE = 64 * 1024
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'a+b')
+        if os.fstat(self._file.fileno()).st_size == 0:
+            self._file.truncate(self.INITIAL_SIZE)
+        self._capacity = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), self._capacity)
+        self._positions = {}
+        used = struct.unpack_from('i', self._map, 0)[0]
+        if used == 0:
+            struct.pack_into('i', self._map, 0, 8)
+        for key, _, position in _entries(self._map):
+            self._positions[key] = position
+
+    def _position(self, key):
+        position = self._positions.get(key)
+        if position is not None:
+            return position
+        encoded = key.encode('utf-8')
+        padded = encoded + b' ' * (8 - (len(encoded) + 4) % 8)
+        entry = struct.pack('i', len(encoded)) + padded + struct.pack('d', 0.0)
+        used = struct.unpack_from('i', self._map, 0)[0]
+        if used + len(entry) > self._capacity:
+            self._grow(used + len(entry))
+        self._map[used:used + len(entry)] = entry
+        # Спершу запис, потім лічильник - читач не побачить неповний запис
+        struct.pack_into('i', self._map, 0, used + len(entry))
+        position = used + 4 + len(padded)
+        self._positions[key] = position
+        return position
+
+    def _grow(self, needed):
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        self._map.close()
+        self._file.truncate(capacity)
+        self._capacity = capacity
+        self._map = mmap.mmap(self._file.fileno(), capacity)
+
+    def add(self, key, amount):
+        with self._lock:
+            position = self._position(key)
+            value = struct.unpack_from('d', self._map, position)[0]
+            struct.pack_into('d', self._map, position, value + amount)
+
+    def set(self, key, value):
+        with self._lock:
+            struct.pack_into('d', self._map, self._position(key), value)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+def _entries(data):
+    used = struct.unpack_from('i', data, 0)[0]
+    position = 8
+    while position < used:
+        length = struct.unpack_from('i', data, position)[0]
+        key = bytes(data[position + 4:position + 4 + length]).decode('utf-8')
+        position += 4 + length + (8 - (length + 4) % 8)
+        yield key, struct.unpack_from('d', data, position)[0], position
+        position += 8
+
+
+def read_file(path):
+    with open(path, 'rb') as fh:
+        data = fh.read()
+    if len(data) < 8:
+        return []
+    return [(key, value) for key, value, _ in _entries(data)]
+
+
+# --- Сховище процесу ---
+
+_store = None
+_store_lock = threading.Lock()
+_default_dir = None
+
+
+def _remove_default_dir(directory, owner_pid):
+    # Дочірні процеси після fork успадковують теку, але не володіють нею
+    if os.getpid() == owner_pid:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def metrics_dir():
+    global _default_dir
+    configured = getattr(settings, 'METRICS_DIR', None)
+    if configured:
+        return configured
+    if _default_dir is None:
+        with _store_lock:
+            if _default_dir is None:
+                directory = tempfile.mkdtemp(prefix='gurtaki-metrics-')
+                atexit.register(_remove_default_dir, directory, os.getpid())
+                _default_dir = directory
+    return _default_dir
+
+
+class Store:
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.pid = os.getpid()
+        # Лічильники та гістограми - окремо від gauge, які рахуються лише для живих процесів
+        self.counters = ValueFile(os.path.join(directory, f'counter_{self.pid}.db'))
+        self.gauges = ValueFile(os.path.join(directory, f'gauge_{self.pid}.db'))
+
+    def close(self):
+        self.counters.close()
+        self.gauges.close()
+
+
+def get_store():
+    global _store
+    directory = metrics_dir()
+    store = _store
+    # Після fork (gunicorn --preload) у процесу має бути власний файл
+    if store is None or store.pid != os.getpid() or store.directory != directory:
+        with _store_lock:
+            store = _store
+            if store is None or store.pid != os.getpid() or store.directory != directory:
+                store = _store = Store(directory)
+    return store
+
+
+@functools.lru_cache(maxsize=4096)
+def _encoded_key(name, labels):
+    return json.dumps([name, sorted(labels)], ensure_ascii=False)
+
+
+def _key(name, labels, suffix=''):
+    # JSON будуємо раз на серію; далі - лише пошук у кеші за кортежем
+    return _encoded_key(name + suffix, tuple(labels.items()))
+
+
+def inc(name, amount=1.0, **labels):
+    get_store().counters.add(_key(name, labels), amount)
+
+
+def gauge_add(name, amount, **labels):
+    get_store().gauges.add(_key(name, labels), amount)
+
+
+def observe(name, value, **labels):
+    buckets = METRICS[name][2]
+    counters = get_store().counters
+    # Зберігаємо некумулятивні кошики; накопичуємо при експорті
+    index = bisect.bisect_left(buckets, value)
+    le = repr(float(buckets[index])) if index < len(buckets) else '+Inf'
+    counters.add(_key(name, {**labels, 'le': le}, '_bucket'), 1.0)
+    counters.add(_key(name, labels, '_sum'), value)
+    counters.add(_key(name, labels, '_count'), 1.0)
+
+
+# --- Збирання з усіх процесів ---
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def collect(directory=None):
+    """
+    Sum the values of every process: ``{(name, labels_tuple): value}``.
+    """
+    directory = directory or metrics_dir()
+    totals = {}
+    for path in glob.glob(os.path.join(directory, '*.db')):
+        kind, _, pid = os.path.basename(path)[:-3].partition('_')
+        if kind == 'gauge' and not (pid.isdigit() and _alive(int(pid))):
+            continue
+        for key, value in read_file(path):
+            name, labels = json.loads(key)
+            series = (name, tuple(tuple(pair) for pair in labels))
+            totals[series] = totals.get(series, 0.0) + value
+    return totals
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"'))
+        for name, value in labels
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else f'{int(value)}.0' if abs(value) < 1e15 else repr(value)
+
+
+def render(totals):
+    """
+    Prometheus text exposition format for ``collect()`` output.
+    """
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind != 'histogram':
+            for (series, labels), value in sorted(totals.items()):
+                if series == name:
+                    lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+            continue
+
+        groups = {}
+        for (series, labels), value in totals.items():
+            if series == f'{name}_bucket':
+                base = tuple(pair for pair in labels if pair[0] != 'le')
+                le = dict(labels)['le']
+                groups.setdefault(base, {})[le] = value
+            elif series in (f'{name}_sum', f'{name}_count'):
+                groups.setdefault(labels, {})
+        for labels in sorted(groups):
+            counts = groups[labels]
+            cumulative = 0.0
+            for le in [repr(float(bucket)) for bucket in buckets] + ['+Inf']:
+                cumulative += counts.get(le, 0.0)
+                lines.append(f'{name}_bucket{_format_labels(labels + (("le", le),))} {_format_value(cumulative)}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(totals.get((f"{name}_sum", labels), 0.0))}')
+            lines.append(f'{name}_count{_format_labels(labels)} {_format_value(totals.get((f"{name}_count", labels), 0.0))}')
+
+    hits = sum(value for (series, labels), value in totals.items()
+               if series == 'feed_cache_requests_total' and ('result', 'hit') in labels)
+    lookups = sum(value for (series, _), value in totals.items() if series == 'feed_cache_requests_total')
+    lines.append('# HELP feed_cache_hit_ratio Share of feed page lookups served from the cache.')
+    lines.append('# TYPE feed_cache_hit_ratio gauge')
+    lines.append(f'feed_cache_hit_ratio {_format_value(hits / lookups if lookups else 0.0)}')
+    return '\n'.join(lines) + '\n'
+
+
+# --- Middleware та view ---
+
+def view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    if match.url_name:
+        return match.url_name
+    # @api_view загортає функцію в клас з її іменем
+    view_class = getattr(match.func, 'view_class', None)
+    return getattr(view_class or match.func, '__name__', None) or match.view_name
+
+
+class MetricsMiddleware:
+    """
+    Record per-view latency, status, SQL and upload size of every request.
+
+    Must come after ``RequestTimingMiddleware``, whose collector supplies the
+    SQL numbers.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        gauge_add('http_requests_in_flight', 1)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            gauge_add('http_requests_in_flight', -1)
+        self.record(request, response, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        gauge_add('http_requests_in_flight', 1)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            gauge_add('http_requests_in_flight', -1)
+        self.record(request, response, time.perf_counter() - started)
+        return response
+
+    def record(self, request, response, duration):
+        view = view_label(request)
+        observe('http_request_duration_seconds', duration, view=view)
+        inc('http_responses_total', view=view, status=str(response.status_code))
+        collector = timing.current()
+        if collector is not None:
+            inc('http_request_db_queries_total', len(collector.queries), view=view)
+            inc('http_request_db_seconds_total', collector.db_time, view=view)
+        if request.content_type == 'multipart/form-data':
+            try:
+                size = int(request.META.get('CONTENT_LENGTH') or 0)
+            except ValueError:
+                size = 0
+            if size:
+                observe('http_upload_size_bytes', size, view=view)
+
+
+def _scrape_allowed(request):
+    if getattr(settings, 'METRICS_PUBLIC', False):
+        return True
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_active and user.is_staff:
+        return True
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+    return bool(token) and constant_time_compare(supplied, token)
+
+
+def metrics_view(request):
+    if not _scrape_allowed(request):
+        return HttpResponse(status=401 if getattr(settings, 'METRICS_TOKEN', None) else 403)
+    return HttpResponse(render(collect()), content_type=CONTENT_TYPE)
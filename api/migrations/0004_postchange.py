@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:36
+
+from django.db import migrations, models
+
+
+def log_existing_posts(apps, schema_editor):
+    # Існуючі пости потрапляють у журнал, щоб синхронізація з нуля їх бачила
+    Post = apps.get_model('api', 'Post')
+    PostChange = apps.get_model('api', 'PostChange')
+    PostChange.objects.bulk_create(
+        (
+            PostChange(post_id=post_id, dorm_number=dorm_number, action='upsert')
+            for post_id, dorm_number in Post.objects.order_by('id').values_list('id', 'dorm_number').iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_post_feed_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post_id', models.BigIntegerField()),
+                ('dorm_number', models.IntegerField()),
+                ('action', models.CharField(choices=[('upsert', 'Upsert'), ('delete', 'Delete')], max_length=6)),
+                ('changed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['dorm_number', 'id'], name='api_postchange_dorm_seq_idx')],
+            },
+        ),
+        migrations.RunPython(log_existing_posts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:52
+
+from django.db import migrations
+
+
+# Повнотекстовий індекс постів (SQLite FTS5, external content на api_post).
+# Тригери синхронізують його при будь-якому записі, включно з bulk_create
+# та update. На інших СУБД пошук працює без індексу (див. api/search.py).
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS api_post_fts USING fts5(
+        title, content,
+        content='api_post', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_post_fts_ai AFTER INSERT ON api_post BEGIN
+        INSERT INTO api_post_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_post_fts_ad AFTER DELETE ON api_post BEGIN
+        INSERT INTO api_post_fts(api_post_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_post_fts_au AFTER UPDATE OF title, content ON api_post BEGIN
+        INSERT INTO api_post_fts(api_post_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO api_post_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    """,
+    "INSERT INTO api_post_fts(api_post_fts) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS api_post_fts_au",
+    "DROP TRIGGER IF EXISTS api_post_fts_ad",
+    "DROP TRIGGER IF EXISTS api_post_fts_ai",
+    "DROP TABLE IF EXISTS api_post_fts",
+]
+
+
+def create_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in CREATE_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_postchange'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
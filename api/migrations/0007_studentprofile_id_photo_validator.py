@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:49
+
+import api.images
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_post_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='studentprofile',
+            name='student_id_photo',
+            field=models.ImageField(blank=True, null=True, upload_to='student_ids/', validators=[api.images.validate_id_photo], verbose_name='Фото студентського/перепустки'),
+        ),
+    ]
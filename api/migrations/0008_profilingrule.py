@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:09
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_studentprofile_id_photo_validator'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfilingRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('view', models.CharField(max_length=100, verbose_name="View (ім'я функції або URL)")),
+                ('mode', models.CharField(choices=[('sample', 'Sampling'), ('cprofile', 'cProfile')], default='sample', max_length=8)),
+                ('sample_rate', models.FloatField(default=0.1, validators=[django.core.validators.MinValueValidator(0.0), django.core.validators.MaxValueValidator(1.0)], verbose_name='Частка запитів')),
+                ('enabled', models.BooleanField(default=True)),
+                ('expires_at', models.DateTimeField(blank=True, null=True, verbose_name='Діє до')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
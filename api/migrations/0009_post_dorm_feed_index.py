@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_profilingrule'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['dorm_number', '-pinned', '-created_at', '-id'], name='api_post_dorm_feed_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:36
+
+from django.db import migrations, models
+
+
+BATCH_SIZE = 2000
+
+
+# Уривки для вже наявних постів; нові отримують їх при записі (див. Post.save)
+def fill_excerpts(apps, schema_editor):
+    from api.models import make_excerpt
+
+    Post = apps.get_model('api', 'Post')
+    batch = []
+    for post in Post.objects.only('id', 'content').order_by('id').iterator(chunk_size=BATCH_SIZE):
+        post.excerpt = make_excerpt(post.content)
+        batch.append(post)
+        if len(batch) == BATCH_SIZE:
+            Post.objects.bulk_update(batch, ['excerpt'])
+            batch = []
+    if batch:
+        Post.objects.bulk_update(batch, ['excerpt'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_post_dorm_feed_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=200),
+        ),
+        migrations.RunPython(fill_excerpts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+from django.db import migrations
+
+
+# Номер гуртожитку стає індексованим стовпцем FTS: фільтр іде в MATCH,
+# і bm25 ранжує лише пости гуртожитку (див. api/search.py).
+# SQL записано тут, а не взято з api/search.py: міграція має робити те саме,
+# хоч би як змінився модуль пізніше.
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS api_post_fts_au",
+    "DROP TRIGGER IF EXISTS api_post_fts_ad",
+    "DROP TRIGGER IF EXISTS api_post_fts_ai",
+    "DROP TABLE IF EXISTS api_post_fts",
+]
+
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS api_post_fts USING fts5(
+        title, content, dorm_number,
+        content='api_post', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_post_fts_ai AFTER INSERT ON api_post BEGIN
+        INSERT INTO api_post_fts(rowid, title, content, dorm_number)
+        VALUES (new.id, new.title, new.content, new.dorm_number);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_post_fts_ad AFTER DELETE ON api_post BEGIN
+        INSERT INTO api_post_fts(api_post_fts, rowid, title, content, dorm_number)
+        VALUES ('delete', old.id, old.title, old.content, old.dorm_number);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_post_fts_au AFTER UPDATE OF title, content, dorm_number ON api_post BEGIN
+        INSERT INTO api_post_fts(api_post_fts, rowid, title, content, dorm_number)
+        VALUES ('delete', old.id, old.title, old.content, old.dorm_number);
+        INSERT INTO api_post_fts(rowid, title, content, dorm_number)
+        VALUES (new.id, new.title, new.content, new.dorm_number);
+    END
+    """,
+    "INSERT INTO api_post_fts(api_post_fts) VALUES ('rebuild')",
+]
+
+
+def recreate_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_SQL + CREATE_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_post_excerpt'),
+    ]
+
+    operations = [
+        migrations.RunPython(recreate_fts, migrations.RunPython.noop),
+    ]
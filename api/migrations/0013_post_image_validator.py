@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:05
+
+import api.images
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_tokenstate'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, null=True, upload_to='posts/', validators=[api.images.validate_post_image]),
+        ),
+    ]
@@ -1,22 +1,296 @@
-from django.db import models
+import re
+from contextlib import contextmanager
+
+from django.db import connections, models, router, transaction
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.contrib.auth.models import User
+from django.utils import timezone
+from django.utils.text import Truncator, slugify
+
+from .images import validate_id_photo, validate_post_image
+
+# Роль користувача виводимо з вбудованих прапорців auth
+def get_user_role(user):
+    if user.is_superuser:
+        return 'administrator'
+    if user.is_staff:
+        return 'privileged'
+    return 'student'
+
 
 # Модель Профілю Студента
 class StudentProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     dorm_number = models.IntegerField(default=0, verbose_name="Номер гуртожитку")
-    student_id_photo = models.ImageField(upload_to='student_ids/', null=True, blank=True, verbose_name="Фото студентського/перепустки")
+    student_id_photo = models.ImageField(upload_to='student_ids/', null=True, blank=True, validators=[validate_id_photo], verbose_name="Фото студентського/перепустки")
     is_approved = models.BooleanField(default=False, verbose_name="Підтверджено адміном")
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Номер гуртожитку вшитий у токени - зміну треба помітити
+        instance._loaded_dorm_number = instance.__dict__.get('dorm_number')
+        return instance
+
     def __str__(self):
         return f"Студент {self.user.username} (Гуртожиток {self.dorm_number})"
 
+# Уривок поста для списків: зберігається при записі, щоб стрічка не читала content
+EXCERPT_LENGTH = 200
+_MARKDOWN = re.compile(r'!\[[^\]]*\]\([^)]*\)|\[([^\]]*)\]\([^)]*\)|^[ \t]*(?:#{1,6}|>|[-*+]|\d+\.)[ \t]+|\*\*|~~|`+', re.M)
+
+
+def make_excerpt(content, length=EXCERPT_LENGTH):
+    """
+    Plain-text beginning of ``content``, at most ``length`` characters.
+    """
+    # Посилання лишають текст, картинки та розмітка зникають
+    text = _MARKDOWN.sub(lambda match: match.group(1) or '', content or '')
+    return Truncator(' '.join(text.split())).chars(length)
+
+
+# Модель Категорії
+class Category(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    slug = models.SlugField(max_length=120, unique=True, blank=True, allow_unicode=True)
+    description = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = 'Category'
+        verbose_name_plural = 'Categories'
+
+    def save(self, *args, **kwargs):
+        if not self.slug:
+            self.slug = slugify(self.name, allow_unicode=True)
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return self.name
+
+# Запити, що оминають сигнали (update/bulk_create), теж скидають кеш стрічки
+# і записуються в журнал змін
+class PostQuerySet(models.QuerySet):
+    # Скільки постів оновлюється за раз: update() тримає в пам'яті лише
+    # (id, dorm_number) однієї порції, а не всіх зачеплених постів
+    UPDATE_BATCH_SIZE = 1000
+
+    def update(self, **kwargs):
+        kwargs.setdefault('updated_at', timezone.now())
+        if isinstance(kwargs.get('content'), str):
+            kwargs.setdefault('excerpt', make_excerpt(kwargs['content']))
+        rows = 0
+        with transaction.atomic(using=self.db, savepoint=False):
+            last_id = 0
+            while True:
+                # Уже оновлені пости мають id <= last_id, тож фільтр не повторить їх
+                before = dict(
+                    self.filter(pk__gt=last_id).order_by('pk')
+                    .values_list('id', 'dorm_number')[:self.UPDATE_BATCH_SIZE]
+                )
+                if not before:
+                    break
+                last_id = max(before)
+                rows += self._update_batch(before, kwargs)
+        return rows
+
+    def _update_batch(self, before, kwargs):
+        from .feed_cache import invalidate_dorm
+
+        rows = models.QuerySet.update(Post.objects.using(self.db).filter(pk__in=before), **kwargs)
+        after = before
+        if 'dorm_number' in kwargs:
+            after = dict(Post.objects.using(self.db).filter(pk__in=before).values_list('id', 'dorm_number'))
+
+        changes = []
+        for post_id, dorm_number in before.items():
+            new_dorm_number = after.get(post_id, dorm_number)
+            if new_dorm_number != dorm_number:
+                changes.append(PostChange(post_id=post_id, dorm_number=dorm_number, action=PostChange.Action.DELETE))
+            changes.append(PostChange(post_id=post_id, dorm_number=new_dorm_number, action=PostChange.Action.UPSERT))
+        PostChange.objects.using(self.db).bulk_create(changes)
+
+        for dorm_number in set(before.values()) | set(after.values()):
+            invalidate_dorm(dorm_number)
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        from .feed_cache import invalidate_dorm
+
+        objs = list(objs)
+        for obj in objs:
+            obj.excerpt = make_excerpt(obj.content)
+        objs = super().bulk_create(objs, *args, **kwargs)
+        PostChange.objects.bulk_create([
+            PostChange(post_id=obj.pk, dorm_number=obj.dorm_number, action=PostChange.Action.UPSERT)
+            for obj in objs if obj.pk is not None
+        ])
+        for dorm_number in {obj.dorm_number for obj in objs}:
+            invalidate_dorm(dorm_number)
+        return objs
+
+
 # Модель Поста
 class Post(models.Model):
     title = models.CharField(max_length=200)
+    slug = models.SlugField(max_length=220, blank=True, allow_unicode=True)
     content = models.TextField()
-    dorm_number = models.IntegerField(default=0) 
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, blank=True, editable=False)
+    dorm_number = models.IntegerField(default=0)
+    author = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='posts')
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name='posts')
+    image = models.ImageField(upload_to='posts/', null=True, blank=True, validators=[validate_post_image])
+    # Похідні зображення (див. api/images.py): {'source': ..., 'small': {...}, ...}
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    attachment = models.FileField(upload_to='attachments/', null=True, blank=True)
+    is_published = models.BooleanField(default=True)
+    pinned = models.BooleanField(default=False, help_text='Pin post to the top')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    published_at = models.DateTimeField(null=True, blank=True)
+
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-pinned', '-created_at']
+        verbose_name = 'Post'
+        verbose_name_plural = 'Posts'
+        indexes = [
+            models.Index(fields=['-pinned', '-created_at'], name='api_post_pinned_created_idx'),
+            # Стрічка гуртожитку: WHERE dorm_number ORDER BY FEED_ORDERING (і курсор) без сортування
+            models.Index(fields=['dorm_number', '-pinned', '-created_at', '-id'], name='api_post_dorm_feed_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Запам'ятовуємо гуртожиток, щоб при переносі поста скинути кеш обох
+        instance._loaded_dorm_number = instance.__dict__.get('dorm_number')
+        return instance
+
+    def save(self, *args, **kwargs):
+        if not self.slug:
+            self.slug = slugify(self.title, allow_unicode=True)[:220]
+        self.excerpt = make_excerpt(self.content)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'content' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'excerpt'}
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.title} (Гуртожиток {self.dorm_number})"
+
+
+@contextmanager
+def explicit_timestamps():
+    """
+    Let ``Post.created_at``/``updated_at`` be set explicitly (seeding, import).
+    """
+    # bulk_create інакше поставить усім постам created_at = now
+    fields = [Post._meta.get_field('created_at'), Post._meta.get_field('updated_at')]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+# Ключ advisory-блокування журналу на PostgreSQL (довільна стала)
+CHANGE_LOG_LOCK_ID = 0x67757274
+
+
+def _lock_change_log(using):
+    """
+    Hold the change-log lock until the current transaction ends.
+
+    PostgreSQL hands out ids when rows are inserted but transactions commit
+    in any order: a client syncing between two commits would move its
+    watermark past a lower id that becomes visible later, and never see it.
+    Appends therefore take turns, so ids become visible in commit order.
+    SQLite already works this way: its write lock lasts until commit.
+    """
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [CHANGE_LOG_LOCK_ID])
+
+
+class PostChangeQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic(using=self.db, savepoint=False):
+            _lock_change_log(self.db)
+            return super().bulk_create(objs, *args, **kwargs)
+
+
+# Журнал змін постів для дельта-синхронізації (/api/posts/changes/).
+# Порядковий номер запису - це водяний знак клієнта; видалення та перенесення
+# в інший гуртожиток лишають запис DELETE, тож їх теж видно.
+class PostChange(models.Model):
+    class Action(models.TextChoices):
+        UPSERT = 'upsert', 'Upsert'
+        DELETE = 'delete', 'Delete'
+
+    post_id = models.BigIntegerField()
+    dorm_number = models.IntegerField()
+    action = models.CharField(max_length=6, choices=Action.choices)
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    objects = PostChangeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['dorm_number', 'id'], name='api_postchange_dorm_seq_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        # Блокування без транзакції звільнилося б ще до вставки
+        with transaction.atomic(using=using, savepoint=False):
+            _lock_change_log(using)
+            super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"#{self.pk} {self.action} post {self.post_id} (Гуртожиток {self.dorm_number})"
+
+
+# Стан підписаних токенів користувача (див. api/authentication.py): токен
+# дійсний, лише поки його покоління збігається з generation і його jti немає
+# в revoked. Зберігається в БД, а кеш - лише прискорення, тож відкликання
+# не зникає, коли кеш витісняє запис.
+class TokenState(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='token_state')
+    generation = models.PositiveIntegerField(default=0)
+    # {jti: unix-час, коли токен і так закінчиться} - окремі відкликання (вихід)
+    revoked = models.JSONField(default=dict, blank=True)
+
+    def __str__(self):
+        return f"Токени {self.user_id}: покоління {self.generation}, відкликано {len(self.revoked)}"
+
+
+# Правило профілювання з адмінки: частка запитів до view профілюється до expires_at.
+# Middleware читає правила з кешу (див. api/profiling.py), а не з БД.
+class ProfilingRule(models.Model):
+    class Mode(models.TextChoices):
+        SAMPLE = 'sample', 'Sampling'
+        CPROFILE = 'cprofile', 'cProfile'
+
+    view = models.CharField(max_length=100, verbose_name="View (ім'я функції або URL)")
+    mode = models.CharField(max_length=8, choices=Mode.choices, default=Mode.SAMPLE)
+    sample_rate = models.FloatField(default=0.1, validators=[MinValueValidator(0.0), MaxValueValidator(1.0)],
+                                    verbose_name="Частка запитів")
+    enabled = models.BooleanField(default=True)
+    expires_at = models.DateTimeField(null=True, blank=True, verbose_name="Діє до")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        ordering = ['-created_at']
+
+    @property
+    def is_expired(self):
+        return self.expires_at is not None and self.expires_at <= timezone.now()
+
     def __str__(self):
-        return f"{self.title} (Гуртожиток {self.dorm_number})"
\ No newline at end of file
+        return f"{self.view}: {self.get_mode_display()} {self.sample_rate:.0%}"
@@ -0,0 +1,112 @@
+"""
+Keyset (cursor) pagination for the dorm feed.
+
+The feed is ordered by ``(-pinned, -created_at, -id)`` within a dorm, which
+matches the ``api_post_dorm_feed_idx`` index ``(dorm_number, -pinned,
+-created_at, -id)``; ``id`` is the unique tie-breaker. Instead of ``OFFSET`` every page filters on the last
+row of the previous page, so page N costs the same as page 1.
+"""
+
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+FEED_ORDERING = ('-pinned', '-created_at', '-id')
+
+
+def encode_cursor(post):
+    """
+    Build an opaque cursor pointing at ``post``.
+    """
+    raw = f"{int(post.pinned)}|{post.created_at.isoformat()}|{post.id}"
+    return base64.urlsafe_b64encode(raw.encode('ascii')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Parse a cursor produced by ``encode_cursor``.
+
+    Returns a ``(pinned, created_at, id)`` tuple or raises ``NotFound``.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode('ascii')).decode('ascii')
+        pinned, created_at, post_id = raw.split('|')
+        return bool(int(pinned)), datetime.fromisoformat(created_at), int(post_id)
+    except (TypeError, ValueError, UnicodeError, binascii.Error):
+        raise NotFound('Невірний курсор.')
+
+
+def keyset_filter(pinned, created_at, post_id):
+    """
+    Rows strictly after ``(pinned, created_at, id)`` in ``FEED_ORDERING``.
+    """
+    return (
+        Q(pinned__lt=pinned)
+        | Q(pinned=pinned, created_at__lt=created_at)
+        | Q(pinned=pinned, created_at=created_at, id__lt=post_id)
+    )
+
+
+class FeedCursorPagination(BasePagination):
+    """
+    Forward-only keyset pagination with an opaque ``cursor`` query parameter.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def get_page_size(self, request):
+        page_size = api_settings.PAGE_SIZE or 20
+        if self.page_size_query_param in request.query_params:
+            try:
+                page_size = int(request.query_params[self.page_size_query_param])
+            except ValueError:
+                pass
+        return max(1, min(page_size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        queryset = queryset.order_by(*FEED_ORDERING)
+        if cursor:
+            queryset = queryset.filter(keyset_filter(*decode_cursor(cursor)))
+
+        # Беремо на один рядок більше, щоб знати, чи є наступна сторінка
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        page = rows[:self.page_size]
+        self.next_cursor = encode_cursor(page[-1]) if self.has_next else None
+        return page
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
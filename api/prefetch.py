@@ -0,0 +1,189 @@
+"""
+Queryset planning for (nested) serializers.
+
+``PrefetchMixin.setup_queryset(queryset, context)`` walks a serializer's
+readable fields once and applies to the queryset what they will read:
+
+* a nested serializer or dotted ``source`` over a foreign key or one-to-one
+  relation becomes ``select_related``, planned recursively;
+* a ``many=True`` nested serializer or related field, or a reverse foreign
+  key, becomes ``prefetch_related`` with a ``Prefetch`` whose queryset is
+  planned the same way;
+* model columns go to ``only()``; a ``PrimaryKeyRelatedField`` needs just
+  the foreign key column.
+
+What a ``SerializerMethodField`` or a property reads cannot be inferred, so
+serializers list it in ``Meta.field_sources`` (``{'role': ('is_staff',
+'is_superuser')}``). A readable field without such a hint loads every column
+of its model: a missing hint costs bandwidth, never a query per row.
+
+``ConstantQueriesTestMixin.assertConstantQueries`` checks the result in
+tests: the query count of a list must not grow with its length.
+"""
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections
+from django.db.models import ForeignObjectRel, Prefetch
+from django.test.utils import CaptureQueriesContext
+from rest_framework import serializers
+
+
+class QueryPlan:
+    """
+    ``select_related``/``prefetch_related``/``only`` arguments for one queryset.
+    """
+
+    def __init__(self):
+        self.select = set()
+        self.prefetch = {}
+        self.only = set()
+
+    def apply(self, queryset):
+        if self.select:
+            queryset = queryset.select_related(*sorted(self.select))
+        if self.prefetch:
+            queryset = queryset.prefetch_related(*self.prefetch.values())
+        return queryset.only(*sorted(self.only))
+
+
+def _get_field(model, name):
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        # Зворотний зв'язок без related_name: source - 'post_set', а не 'post'
+        for rel in model._meta.related_objects:
+            if rel.get_accessor_name() == name:
+                return rel
+    return None
+
+
+def _all_columns(model, plan, prefix):
+    plan.only.update(prefix + field.name for field in model._meta.concrete_fields)
+
+
+def _prefetch(model, field, plan, prefix, child):
+    # Колонки пов'язаної моделі плануємо окремо, у queryset для Prefetch
+    related = field.related_model
+    sub_plan = QueryPlan()
+    sub_plan.only.add(related._meta.pk.name)
+    if field.one_to_many:
+        # Зворотний FK: без нього Django дочитуватиме батька для кожного рядка
+        sub_plan.only.add(field.field.name)
+    if child is None:
+        _all_columns(related, sub_plan, '')
+    elif isinstance(child, serializers.BaseSerializer):
+        plan_serializer(child, related, sub_plan)
+    # Інакше - PrimaryKeyRelatedField(many=True): достатньо первинного ключа
+    lookup = prefix + (field.get_accessor_name() if isinstance(field, ForeignObjectRel) else field.name)
+    plan.prefetch[lookup] = Prefetch(lookup, queryset=sub_plan.apply(related._default_manager.all()))
+
+
+def _plan_path(model, attrs, plan, prefix, leaf=None):
+    """
+    Follow ``attrs`` from ``model`` and record what reading them needs.
+
+    ``leaf`` is the serializer field at the end of the path: a nested
+    serializer, a related field or ``None`` for a plain value.
+    """
+    for index, attr in enumerate(attrs):
+        field = _get_field(model, attr)
+        if field is None:
+            # Властивість або метод - невідомо, що читає
+            _all_columns(model, plan, prefix)
+            return
+        last = index == len(attrs) - 1
+
+        if not field.is_relation:
+            plan.only.add(prefix + attr)
+            return
+        if field.many_to_many or field.one_to_many:
+            many_leaf = leaf.child if isinstance(leaf, serializers.ListSerializer) else None
+            if isinstance(leaf, serializers.ManyRelatedField):
+                many_leaf = leaf.child_relation
+            _prefetch(model, field, plan, prefix, many_leaf if last else None)
+            return
+
+        if field.concrete:
+            plan.only.add(prefix + attr)
+        if last and isinstance(leaf, serializers.PrimaryKeyRelatedField) and leaf.pk_field is None and field.concrete:
+            return
+        plan.select.add(prefix + attr)
+        model, prefix = field.related_model, f'{prefix}{attr}__'
+        plan.only.add(prefix + model._meta.pk.name)
+
+    # Шлях закінчився на зв'язаному об'єкті
+    if isinstance(leaf, serializers.BaseSerializer):
+        plan_serializer(leaf, model, plan, prefix)
+    elif isinstance(leaf, serializers.SlugRelatedField):
+        plan.only.add(prefix + leaf.slug_field)
+    else:
+        _all_columns(model, plan, prefix)
+
+
+def plan_serializer(serializer, model, plan, prefix=''):
+    """
+    Add to ``plan`` what ``serializer`` reads from instances of ``model``.
+    """
+    plan.only.add(prefix + model._meta.pk.name)
+    hints = getattr(getattr(serializer, 'Meta', None), 'field_sources', {})
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if name in hints:
+            for source in hints[name]:
+                _plan_path(model, source.split('.'), plan, prefix)
+        elif field.source == '*':
+            if isinstance(field, serializers.BaseSerializer):
+                plan_serializer(field, model, plan, prefix)
+            else:
+                _all_columns(model, plan, prefix)
+        else:
+            _plan_path(model, field.source.split('.'), plan, prefix, field)
+    return plan
+
+
+class PrefetchMixin:
+    """
+    Serializer mixin: ``setup_queryset`` loads what the serializer reads.
+    """
+
+    @classmethod
+    def setup_queryset(cls, queryset, context=None):
+        """
+        ``queryset`` with the joins, prefetches and columns this serializer
+        needs, for the fields selected by ``context`` (e.g. ``?fields=``).
+        """
+        serializer = cls(context=context or {})
+        return plan_serializer(serializer, queryset.model, QueryPlan()).apply(queryset)
+
+
+class ConstantQueriesTestMixin:
+    """
+    ``TestCase`` mixin: assert that a list costs the same queries at any size.
+    """
+
+    def assertConstantQueries(self, make_rows, run, sizes=(10, 1000), using='default'):
+        """
+        Call ``make_rows(n)`` then ``run()`` for every ``n`` in ``sizes`` and
+        fail if the number of queries ``run()`` issues changes.
+
+        ``make_rows(n)`` must leave exactly ``n`` rows for ``run()`` to list
+        (for example by deleting the previous ones first).
+        """
+        counts = {}
+        captured = {}
+        for size in sizes:
+            make_rows(size)
+            with CaptureQueriesContext(connections[using]) as queries:
+                result = run()
+                if result is not None and hasattr(result, '__len__'):
+                    self.assertEqual(len(result), size, f'run() listed {len(result)} rows instead of {size}')
+            counts[size] = len(queries)
+            captured[size] = [query['sql'] for query in queries.captured_queries]
+        if len(set(counts.values())) > 1:
+            largest = max(sizes)
+            self.fail(
+                f'Query count grows with the list size: {counts}. Queries at {largest}:\n'
+                + '\n'.join(captured[largest][:20])
+            )
+        return counts[sizes[0]]
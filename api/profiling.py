@@ -0,0 +1,399 @@
+"""
+On-demand profiling of single requests.
+
+A request is profiled when it carries a valid ``X-Profile`` header (a signed
+token from ``make_token``, shown to staff in the admin) or when an enabled
+``ProfilingRule`` matches its view; a rule profiles a ``sample_rate`` share
+of that view's requests until it expires. Two modes are supported:
+
+* ``sample`` - a thread records the request thread's stack every
+  ``PROFILING_SAMPLE_INTERVAL`` seconds; cheap enough for production;
+* ``cprofile`` - deterministic ``cProfile``; exact call counts, but slows
+  the request down noticeably.
+
+Profiles are written as JSON files to ``PROFILING_DIR``, which is kept to
+the newest ``PROFILING_MAX_PROFILES`` files (a ring buffer on disk), and
+viewed in the admin as collapsed stacks (``a;b;c 42`` lines) that
+flamegraph.pl, speedscope or inferno render directly.
+
+When nothing is profiled the middleware costs one header lookup and one
+clock read. Rules are not read from the database on the request path:
+saving a rule publishes the active rules to the cache, and every process
+re-reads that cache entry at most every ``PROFILING_RULES_REFRESH`` seconds.
+
+Settings:
+    PROFILING_ENABLED          install the middleware (default: True)
+    PROFILING_DIR              where profiles are kept (default: ``BASE_DIR/.profiles``)
+    PROFILING_MAX_PROFILES     ring buffer size (default: 100)
+    PROFILING_SAMPLE_INTERVAL  seconds between stack samples (default: 0.002)
+    PROFILING_TOKEN_MAX_AGE    lifetime of ``X-Profile`` tokens, seconds (default: 3600)
+    PROFILING_RULES_REFRESH    how often processes re-read the rules, seconds (default: 5)
+    PROFILING_CACHE_ALIAS      cache holding the published rules (default: ``default``)
+"""
+
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils import timezone
+
+from .metrics import view_label
+
+
+logger = logging.getLogger(__name__)
+
+MODES = ('sample', 'cprofile')
+HEADER = 'X-Profile'
+TOKEN_SALT = 'api.profiling'
+RULES_CACHE_KEY = 'profiling:rules'
+PROFILE_ID = re.compile(r'^\d+-\d+$')
+# Глибина та поріг, нижче яких стеки з cProfile не розгортаються
+MAX_STACK_DEPTH = 64
+MIN_STACK_MICROSECONDS = 1
+
+_rules = {'checked': None, 'rules': []}
+
+
+def _setting(name, default):
+    return getattr(settings, f'PROFILING_{name}', default)
+
+
+def profile_dir():
+    return _setting('DIR', None) or os.path.join(settings.BASE_DIR, '.profiles')
+
+
+# --- Токени для заголовка X-Profile ---
+
+def make_token(mode='sample'):
+    """
+    Signed ``X-Profile`` header value that profiles one request in ``mode``.
+    """
+    if mode not in MODES:
+        raise ValueError(f'Unknown profiling mode {mode!r}')
+    return signing.dumps({'mode': mode}, salt=TOKEN_SALT, compress=True)
+
+
+def read_token(value):
+    try:
+        payload = signing.loads(value, salt=TOKEN_SALT, max_age=_setting('TOKEN_MAX_AGE', 3600))
+    except signing.BadSignature:
+        return None
+    mode = payload.get('mode') if isinstance(payload, dict) else None
+    return mode if mode in MODES else None
+
+
+# --- Правила з адмінки ---
+
+def publish_rules():
+    """
+    Put the active ``ProfilingRule`` rows into the cache for all processes.
+    """
+    from .models import ProfilingRule
+
+    rules = [
+        {
+            'view': rule.view,
+            'mode': rule.mode,
+            'sample_rate': rule.sample_rate,
+            'expires_at': rule.expires_at.timestamp() if rule.expires_at else None,
+        }
+        for rule in ProfilingRule.objects.filter(enabled=True)
+        if not rule.is_expired
+    ]
+    caches[_setting('CACHE_ALIAS', 'default')].set(RULES_CACHE_KEY, rules, timeout=None)
+    _rules['checked'] = None
+
+
+def _rules_stale():
+    checked = _rules['checked']
+    return checked is None or time.monotonic() - checked >= _setting('RULES_REFRESH', 5)
+
+
+def active_rules():
+    if _rules_stale():
+        _rules['rules'] = caches[_setting('CACHE_ALIAS', 'default')].get(RULES_CACHE_KEY) or []
+        _rules['checked'] = time.monotonic()
+    return _rules['rules']
+
+
+async def aactive_rules():
+    if _rules_stale():
+        _rules['rules'] = await caches[_setting('CACHE_ALIAS', 'default')].aget(RULES_CACHE_KEY) or []
+        _rules['checked'] = time.monotonic()
+    return _rules['rules']
+
+
+def _matching_mode(request, rules):
+    view = view_label(request)
+    now = time.time()
+    for rule in rules:
+        if rule['view'] != view or (rule['expires_at'] is not None and rule['expires_at'] <= now):
+            continue
+        if random.random() < rule['sample_rate']:
+            return rule['mode']
+    return None
+
+
+# --- Збирання стеків ---
+
+def _frame_label(filename, lineno, name):
+    if filename == '~':
+        # Вбудовані функції cProfile: '<built-in method time.sleep>'
+        return name.replace(';', ':')
+    base = str(settings.BASE_DIR)
+    if filename.startswith(base):
+        filename = os.path.relpath(filename, base)
+    else:
+        filename = os.path.join(*filename.split(os.sep)[-2:]) if os.sep in filename else filename
+    return f'{name} ({filename}:{lineno})'.replace(';', ':')
+
+
+def _stack(frame):
+    labels = []
+    while frame is not None:
+        code = frame.f_code
+        labels.append(_frame_label(code.co_filename, code.co_firstlineno, code.co_name))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class Sampler:
+    """
+    Sample the stack of one thread from a background thread.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.samples = Counter()
+        self._target = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiling-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is not None:
+                self.samples[_stack(frame)] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self):
+        return '\n'.join(f'{stack} {count}' for stack, count in self.samples.most_common())
+
+
+def collapse_stats(stats):
+    """
+    Collapsed stacks (in microseconds) from ``pstats.Stats``.
+
+    cProfile keeps caller/callee edges, not whole stacks, so the stacks are
+    rebuilt from the roots down and each edge's share of the callee's time
+    is spread over the paths that lead to the caller.
+    """
+    entries = stats.stats
+    callees = {}
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+    roots = [func for func, entry in entries.items() if not any(caller in entries for caller in entry[4])]
+
+    lines = Counter()
+
+    def walk(func, inclusive, path):
+        _, _, own, cumulative, _ = entries[func]
+        path = path + (_frame_label(*func),)
+        if cumulative > 0:
+            lines[';'.join(path)] += inclusive * own / cumulative
+        if len(path) >= MAX_STACK_DEPTH:
+            return
+        for callee, edge_time in callees.get(func, ()):
+            if callee == func or not cumulative:
+                continue
+            share = inclusive * edge_time / cumulative
+            if share * 1e6 >= MIN_STACK_MICROSECONDS:
+                walk(callee, share, path)
+
+    for root in roots:
+        walk(root, entries[root][3], ())
+    counts = ((stack, round(seconds * 1e6)) for stack, seconds in lines.items())
+    return '\n'.join(f'{stack} {count}' for stack, count in sorted(counts, key=lambda item: -item[1]) if count > 0)
+
+
+# --- Кільцевий буфер на диску ---
+
+def save_profile(record):
+    """
+    Write ``record`` to ``PROFILING_DIR`` and drop the oldest profiles.
+    """
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    record['id'] = f'{time.time_ns()}-{os.getpid()}'
+    path = os.path.join(directory, f"{record['id']}.json")
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as fh:
+        json.dump(record, fh, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+    names = sorted(name for name in os.listdir(directory) if name.endswith('.json'))
+    for name in names[:max(0, len(names) - _setting('MAX_PROFILES', 100))]:
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            # Інший процес уже прибрав
+            pass
+    return record['id']
+
+
+def list_profiles():
+    """
+    Metadata of the stored profiles, newest first.
+    """
+    directory = profile_dir()
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if not name.endswith('.json'):
+            continue
+        record = load_profile(name[:-5])
+        if record is not None:
+            record.pop('collapsed', None)
+            record.pop('stats', None)
+            profiles.append(record)
+    return profiles
+
+
+def load_profile(profile_id):
+    if not PROFILE_ID.match(profile_id):
+        return None
+    try:
+        with open(os.path.join(profile_dir(), f'{profile_id}.json'), encoding='utf-8') as fh:
+            return json.load(fh)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+# --- Middleware ---
+
+class ProfilingMiddleware:
+    """
+    Profile the view of requests chosen by ``X-Profile`` or a rule.
+
+    Goes last in ``MIDDLEWARE``: it calls the view itself from
+    ``process_view``, so every other ``process_view`` must have run.
+
+    Under ASGI neither the middleware nor its ``process_view`` is wrapped in
+    ``sync_to_async``: only a request that is actually profiled runs its
+    (sync) view in a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not _setting('ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Django адаптує process_view за його типом - під ASGI даємо async-версію
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        return await self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        token = request.META.get('HTTP_X_PROFILE')
+        mode = trigger = None
+        if token:
+            mode, trigger = read_token(token), 'header'
+        if mode is None:
+            rules = active_rules()
+            if rules:
+                mode, trigger = _matching_mode(request, rules), 'rule'
+        if mode is None or iscoroutinefunction(view_func):
+            return None
+        return self.profile(mode, trigger, request, view_func, view_args, view_kwargs)
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        token = request.META.get('HTTP_X_PROFILE')
+        mode = trigger = None
+        if token:
+            mode, trigger = read_token(token), 'header'
+        if mode is None:
+            rules = await aactive_rules()
+            if rules:
+                mode, trigger = _matching_mode(request, rules), 'rule'
+        if mode is None or iscoroutinefunction(view_func):
+            return None
+        # Sampler і cProfile стежать за потоком, у якому працює синхронний view
+        return await sync_to_async(self.profile)(mode, trigger, request, view_func, view_args, view_kwargs)
+
+    def profile(self, mode, trigger, request, view_func, view_args, view_kwargs):
+        started = time.perf_counter()
+        if mode == 'cprofile':
+            profiler = cProfile.Profile()
+            response = profiler.runcall(self._call_view, request, view_func, view_args, view_kwargs)
+        else:
+            with Sampler(_setting('SAMPLE_INTERVAL', 0.002)) as sampler:
+                response = self._call_view(request, view_func, view_args, view_kwargs)
+        duration = time.perf_counter() - started
+
+        record = {
+            'created': timezone.now().isoformat(),
+            'method': request.method,
+            'path': request.get_full_path(),
+            'view': view_label(request),
+            'user': getattr(getattr(request, 'user', None), 'username', '') or '',
+            'status': response.status_code,
+            'mode': mode,
+            'trigger': trigger,
+            'duration_ms': round(duration * 1000, 1),
+        }
+        if mode == 'cprofile':
+            stats = pstats.Stats(profiler)
+            record['unit'] = 'microseconds'
+            record['collapsed'] = collapse_stats(stats)
+            report = io.StringIO()
+            stats.stream = report
+            stats.sort_stats('cumulative').print_stats(50)
+            record['stats'] = report.getvalue()
+        else:
+            record['unit'] = 'samples'
+            record['collapsed'] = sampler.collapsed()
+        try:
+            response['X-Profile-Id'] = save_profile(record)
+        except OSError:
+            logger.exception('Could not store the profile of %s', request.path)
+        return response
+
+    def _call_view(self, request, view_func, view_args, view_kwargs):
+        response = view_func(request, *view_args, **view_kwargs)
+        # DRF рендерить відповідь уже після view - рендер теж профілюємо
+        if hasattr(response, 'render') and callable(response.render):
+            response = response.render()
+        return response
@@ -0,0 +1,85 @@
+"""
+SQLite query plan checks.
+
+``capture_statements`` records the SQL (with parameters) that a block of
+code sends to the database; ``plan_problems`` runs ``EXPLAIN QUERY PLAN``
+on every read and reports steps that do not scale with the table size:
+
+* ``SCAN`` of a table in ``LARGE_TABLES`` (a full table or full index scan);
+* ``USE TEMP B-TREE`` (sorting rows that an index should already order).
+
+Sorting is accepted in plans driven by a full-text ``VIRTUAL TABLE``:
+ranking by relevance has to sort the matches and no index can do it.
+"""
+
+import re
+from contextlib import contextmanager
+
+from django.db import connections
+
+
+LARGE_TABLES = frozenset({'api_post', 'api_postchange', 'api_studentprofile', 'auth_user'})
+EXPLAINED = ('SELECT', 'WITH', 'UPDATE', 'DELETE')
+
+_TABLE_ALIAS = re.compile(r'\b(?:FROM|JOIN)\s+"?(\w+)"?(?:\s+(?:AS\s+)?(?!ON\b|WHERE\b|JOIN\b|INNER\b|LEFT\b|ORDER\b|GROUP\b|LIMIT\b|SET\b)"?(\w+)"?)?', re.I)
+_SCAN = re.compile(r'^SCAN (\w+)')
+
+
+@contextmanager
+def capture_statements(using='default'):
+    """
+    Collect ``(sql, params)`` of every statement run inside the block.
+    """
+    statements = []
+
+    def record(execute, sql, params, many, context):
+        statements.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with connections[using].execute_wrapper(record):
+        yield statements
+
+
+def explain(sql, params, using='default'):
+    """
+    The ``detail`` column of ``EXPLAIN QUERY PLAN`` for one statement.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def _tables(sql):
+    tables = {}
+    for table, alias in _TABLE_ALIAS.findall(sql):
+        tables[table] = table
+        if alias:
+            tables[alias] = table
+    return tables
+
+
+def plan_problems(statements, large_tables=LARGE_TABLES, using='default'):
+    """
+    Return ``(sql, plan)`` for every distinct read whose plan scans a large
+    table or sorts through a temporary B-tree.
+    """
+    if connections[using].vendor != 'sqlite':
+        raise ValueError('Query plan checks need SQLite')
+    problems = []
+    seen = set()
+    for sql, params in statements:
+        if sql in seen or not sql.lstrip().upper().startswith(EXPLAINED):
+            continue
+        seen.add(sql)
+        plan = explain(sql, params, using)
+        tables = _tables(sql)
+        virtual = any('VIRTUAL TABLE' in step for step in plan)
+        for step in plan:
+            scan = _SCAN.match(step)
+            if scan and 'VIRTUAL TABLE' not in step and tables.get(scan.group(1), scan.group(1)) in large_tables:
+                problems.append((sql, plan))
+                break
+            if step.startswith('USE TEMP B-TREE') and not virtual:
+                problems.append((sql, plan))
+                break
+    return problems
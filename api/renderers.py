@@ -0,0 +1,99 @@
+"""
+Response renderers.
+
+``FastJSONRenderer`` replaces DRF's ``JSONRenderer``. With ``orjson``
+installed it encodes in C, datetimes included, and returns the same bytes
+as ``JSONRenderer`` (compact separators, UTF-8, ``\\u2028``/``\\u2029``
+escaped, ``...Z`` for UTC). Without ``orjson``, and for the cases where the
+two encoders would differ, it falls back to ``JSONRenderer`` itself:
+
+* pretty-printing (``Accept: application/json; indent=4``) and non-default
+  ``UNICODE_JSON``/``COMPACT_JSON``/``STRICT_JSON`` settings;
+* anything orjson refuses (non-string keys, integers over 64 bits, ...);
+* floats that the standard library writes in exponent form (``1e+16``,
+  ``1e-05``), detected in orjson's output.
+
+One difference is left: NaN and infinity come out as ``null`` instead of
+raising, as ``STRICT_JSON`` would.
+
+``MessagePackRenderer`` answers ``Accept: application/msgpack`` with the
+same data as MessagePack (datetimes as the same ISO 8601 strings). It needs
+the optional ``msgpack`` package; the settings only register it when the
+package is installed.
+"""
+
+import re
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # необов'язкова залежність
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # необов'язкова залежність
+    msgpack = None
+
+
+# Числа, які json.dumps записує інакше, ніж orjson: 1e16 проти 1e+16,
+# 0.00001 проти 1e-05. У компактному виводі число йде після : , або [
+_UNSAFE_FLOAT = re.compile(rb'[:,\[]-?(?:\d+(?:\.\d+)?e|0\.0000)')
+# Точний вираз повільний (як саме кодування), тож спершу - дешевий пошук
+# підрядків, який майже ніколи нічого не знаходить
+_EXPONENT_HINT = re.compile(rb'e[-\d]')
+_NUMBER_START = frozenset(b'-0123456789')
+
+# Типи, яких orjson не знає (Decimal, lazy-рядки, QuerySet...), - як у DRF
+_encoder = JSONEncoder()
+
+
+def _orjson_dumps(data):
+    options = orjson.OPT_UTC_Z | orjson.OPT_PASSTHROUGH_DATACLASS
+    try:
+        ret = orjson.dumps(data, default=_encoder.default, option=options)
+    except orjson.JSONEncodeError:
+        return None
+    if ret[0] in _NUMBER_START:
+        return None
+    if (b'0.0000' in ret or _EXPONENT_HINT.search(ret)) and _UNSAFE_FLOAT.search(ret):
+        return None
+    # Однобайтовий пошук (memchr) значно дешевший за replace
+    if b'\xe2' in ret:
+        ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+    return ret
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    ``JSONRenderer`` with the same output, encoded by orjson when possible.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (orjson is not None and self.compact and self.strict and not self.ensure_ascii
+                and self.get_indent(accepted_media_type, renderer_context or {}) is None):
+            ret = _orjson_dumps(data)
+            if ret is not None:
+                return ret
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Render ``application/msgpack`` for clients that ask for it.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if msgpack is None:
+            raise RuntimeError('MessagePackRenderer needs the msgpack package')
+        return msgpack.packb(data, default=_encoder.default, use_bin_type=True, datetime=False)
@@ -0,0 +1,164 @@
+"""
+Full-text search over posts.
+
+On SQLite the ``api_post_fts`` FTS5 table (migrations 0005 and 0011) is
+queried and results are ranked with bm25, title matches weighing more than
+content. The dorm number is an indexed column of the table, so the dorm
+filter is part of the MATCH expression and bm25 only ranks the caller's
+dorm. Other backends fall back to ``icontains``, which is correct but scans.
+
+``remove_diacritics 2`` only folds Latin letters ("café" finds "cafe");
+Cyrillic "й" and "ї" stay distinct from "и" and "і". ``ensure_fts_schema``
+restores missing parts of the schema after ``migrate``; the migrations keep
+their own copy of the SQL, so editing it here does not change them.
+"""
+
+import re
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+from .models import Post
+
+
+FTS_TABLE = 'api_post_fts'
+TITLE_WEIGHT = 10.0
+CONTENT_WEIGHT = 1.0
+
+# Слова запиту: літери/цифри будь-якої мови (апостроф у "ім'я" - роздільник,
+# так само як у токенізаторі unicode61)
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def query_tokens(query):
+    return _TOKEN_RE.findall(query or '')
+
+
+def build_match_expression(query, dorm_number=None):
+    """
+    Turn free text into an FTS5 MATCH expression.
+
+    Every word becomes a quoted prefix term, so ``гурт душ`` matches posts
+    containing words starting with both. Quoting keeps FTS5 operators in
+    user input from being interpreted. Words only match title and content;
+    ``dorm_number`` adds an exact match on the dorm column.
+    """
+    terms = ['"{}"*'.format(token.replace('"', '""')) for token in query_tokens(query)]
+    expression = '{title content} : (%s)' % ' '.join(terms)
+    if dorm_number is not None:
+        expression = f'dorm_number : "{int(dorm_number)}" AND {expression}'
+    return expression
+
+
+# Стовпці індексу; dorm_number не впливає на ранжування (вага 0 у bm25)
+FTS_COLUMNS = ('title', 'content', 'dorm_number')
+_NEW = ', '.join(f'new.{column}' for column in FTS_COLUMNS)
+_OLD = ', '.join(f'old.{column}' for column in FTS_COLUMNS)
+
+TRIGGERS = {
+    'api_post_fts_ai': f"""
+        CREATE TRIGGER IF NOT EXISTS api_post_fts_ai AFTER INSERT ON api_post BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, {', '.join(FTS_COLUMNS)}) VALUES (new.id, {_NEW});
+        END
+    """,
+    'api_post_fts_ad': f"""
+        CREATE TRIGGER IF NOT EXISTS api_post_fts_ad AFTER DELETE ON api_post BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {', '.join(FTS_COLUMNS)}) VALUES ('delete', old.id, {_OLD});
+        END
+    """,
+    'api_post_fts_au': f"""
+        CREATE TRIGGER IF NOT EXISTS api_post_fts_au AFTER UPDATE OF {', '.join(FTS_COLUMNS)} ON api_post BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {', '.join(FTS_COLUMNS)}) VALUES ('delete', old.id, {_OLD});
+            INSERT INTO {FTS_TABLE}(rowid, {', '.join(FTS_COLUMNS)}) VALUES (new.id, {_NEW});
+        END
+    """,
+}
+
+CREATE_TABLE_SQL = f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        {', '.join(FTS_COLUMNS)},
+        content='api_post', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+"""
+
+REBUILD_SQL = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+
+
+def fts_available(using=None):
+    return (using or connection).vendor == 'sqlite'
+
+
+def ensure_fts_schema(using=None):
+    """
+    Create the FTS table and triggers if any of them is missing.
+
+    SQLite migrations that alter ``api_post`` rebuild the table and drop
+    its triggers, so this runs after every ``migrate`` as well. If a
+    trigger had to be recreated, writes may have been missed and the index
+    is rebuilt. Returns ``True`` when something was recreated.
+    """
+    using = using or connection
+    if not fts_available(using):
+        return False
+    with using.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name IN (%s, %s, %s, %s)",
+            [FTS_TABLE, *TRIGGERS],
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = {FTS_TABLE, *TRIGGERS} - existing
+        if not missing:
+            return False
+        cursor.execute(CREATE_TABLE_SQL)
+        for sql in TRIGGERS.values():
+            cursor.execute(sql)
+        cursor.execute(REBUILD_SQL)
+    return True
+
+
+def search_posts(dorm_number, query, limit=20):
+    """
+    Return up to ``limit`` posts of ``dorm_number`` matching ``query``, best first.
+    """
+    tokens = query_tokens(query)
+    if not tokens:
+        return []
+
+    if not fts_available():
+        condition = Q()
+        for token in tokens:
+            condition &= Q(title__icontains=token) | Q(content__icontains=token)
+        return list(Post.objects.filter(condition, dorm_number=dorm_number).order_by('-created_at')[:limit])
+
+    sql = f"""
+        SELECT p.*
+        FROM {FTS_TABLE} f
+        JOIN api_post p ON p.id = f.rowid
+        WHERE {FTS_TABLE} MATCH %s
+        ORDER BY bm25({FTS_TABLE}, %s, %s, 0.0), p.id DESC
+        LIMIT %s
+    """
+    params = [build_match_expression(query, dorm_number), TITLE_WEIGHT, CONTENT_WEIGHT, limit]
+    return list(Post.objects.raw(sql, params))
+
+
+def rebuild_index():
+    """
+    Rebuild the FTS table from ``api_post`` and return the number of posts.
+
+    FTS5 ``'rebuild'`` replaces the whole index in one statement, so the
+    triggers cannot interleave with a half-empty index: an update in the
+    middle of a delete-and-reinsert would send ``'delete'`` for a row the
+    index no longer has and corrupt it.
+    """
+    if not fts_available():
+        return 0
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(REBUILD_SQL)
+        cursor.execute("SELECT COUNT(*) FROM api_post")
+        total = cursor.fetchone()[0]
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+    return total
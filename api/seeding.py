@@ -0,0 +1,149 @@
+"""
+Deterministic synthetic dorm data for capacity testing (``seed_data --posts``).
+
+Content is generated in fixed-size chunks, each from its own
+``random.Random`` seeded by ``(seed, kind, chunk index)``, so the rows depend
+only on ``--seed`` and the row counts, not on the number of worker processes
+or the insert batch size. Generators return plain tuples and never touch
+the database, which lets the command run them in a process pool.
+"""
+
+import random
+import string
+
+
+CHUNK_SIZE = 1000
+
+FIRST_NAMES = [
+    'Олександр', 'Андрій', 'Дмитро', 'Максим', 'Богдан', 'Тарас', 'Назар', 'Ярослав', 'Остап', 'Іван',
+    'Олена', 'Оксана', 'Марія', 'Анна', 'Софія', 'Ірина', 'Юлія', 'Дарина', 'Христина', 'Соломія',
+]
+LAST_NAMES = [
+    'Коваленко', 'Шевченко', 'Бондаренко', 'Ткаченко', 'Кравченко', 'Олійник', 'Мельник', 'Поліщук',
+    'Лисенко', 'Савченко', 'Руденко', 'Мороз', 'Гребенюк', 'Дорошенко', 'Климко', 'Павлюк',
+]
+TRANSLIT = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'h', 'ґ': 'g', 'д': 'd', 'е': 'e', 'є': 'ie', 'ж': 'zh', 'з': 'z',
+    'и': 'y', 'і': 'i', 'ї': 'i', 'й': 'i', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p',
+    'р': 'r', 'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'kh', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh',
+    'щ': 'shch', 'ь': '', 'ю': 'iu', 'я': 'ia',
+}
+
+CATEGORIES = [
+    ('Оголошення', 'Офіційні повідомлення адміністрації гуртожитку.'),
+    ('Загублене та знайдене', 'Речі, які хтось загубив або знайшов.'),
+    ('Купівля-продаж', 'Продаж і обмін речей між мешканцями.'),
+    ('Побут', 'Прибирання, пральня, кухня та ремонт.'),
+    ('Події', 'Вечірки, турніри, збори та інші заходи.'),
+]
+
+ITEMS = [
+    'ключі від кімнати', 'студентський квиток', 'зарядку для ноутбука', 'чорну парасольку', 'навушники',
+    'термос', 'залікову книжку', 'синій рюкзак', 'мультиварку', 'конспект з матаналізу',
+]
+PLACES = ['на кухні', 'в пральні', 'біля вахти', 'у навчальній кімнаті', 'на сходах', 'в душовій']
+TITLES = [
+    'Загублено {item}',
+    'Знайдено {item} {place}',
+    'Продам {item}, недорого',
+    'Шукаю сусіда в кімнату {room}',
+    'Графік прибирання кухні на {floor} поверсі',
+    'Відключення гарячої води {day}',
+    'Збори старост поверхів {day} о {hour}:00',
+    'Турнір з настільного тенісу {day}',
+    'Пральня на {floor} поверсі не працює',
+    'Хто позичить {item}?',
+]
+SENTENCES = [
+    'Звертайтеся в кімнату {room}.',
+    'Пишіть у телеграм або стукайте ввечері.',
+    'Прохання до всіх мешканців {floor} поверху бути уважними.',
+    'Деталі можна уточнити у старости поверху.',
+    'Востаннє бачили {place}.',
+    'Ціна договірна, можливий обмін.',
+    'Початок о {hour}:00, приходьте вчасно.',
+    'Адміністрація гуртожитку просить поставитися з розумінням.',
+    'Дякую всім, хто відгукнеться!',
+    'Нагадуємо, що після 23:00 у гуртожитку тиша.',
+]
+DAYS = ['у понеділок', 'у вівторок', 'у середу', 'у четвер', 'у пʼятницю', 'у суботу', 'у неділю']
+
+
+def _rng(seed, kind, chunk):
+    return random.Random(f'{seed}:{kind}:{chunk}')
+
+
+def transliterate(text):
+    return ''.join(TRANSLIT.get(char, char) for char in text.lower())
+
+
+def chunks(total):
+    """
+    ``(chunk_index, start, stop)`` covering ``range(total)``.
+    """
+    return [(index, start, min(start + CHUNK_SIZE, total)) for index, start in enumerate(range(0, total, CHUNK_SIZE))]
+
+
+def generate_users(seed, dorms, chunk):
+    """
+    Rows ``(username, first_name, last_name, dorm_number)`` for one chunk.
+
+    The dorm is ``i % dorms + 1``, so posts can pick an author's dorm without
+    a lookup.
+    """
+    index, start, stop = chunk
+    rng = _rng(seed, 'users', index)
+    rows = []
+    for i in range(start, stop):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        username = f'{transliterate(first)}.{transliterate(last)}.{i}'
+        rows.append((username, first, last, i % dorms + 1))
+    return rows
+
+
+FIELDS = {
+    'item': lambda rng: rng.choice(ITEMS),
+    'place': lambda rng: rng.choice(PLACES),
+    'room': lambda rng: rng.randint(101, 999),
+    'floor': lambda rng: rng.randint(1, 9),
+    'day': lambda rng: rng.choice(DAYS),
+    'hour': lambda rng: rng.randint(9, 21),
+}
+# Для кожного шаблону - лише ті поля, що в ньому є
+_TEMPLATE_FIELDS = {
+    template: tuple(name for _, name, _, _ in string.Formatter().parse(template) if name)
+    for template in TITLES + SENTENCES
+}
+
+
+def _fill(rng, template):
+    fields = _TEMPLATE_FIELDS[template]
+    if not fields:
+        return template
+    return template.format(**{name: FIELDS[name](rng) for name in fields})
+
+
+def generate_posts(seed, users, dorms, categories, span_seconds, chunk):
+    """
+    Rows ``(title, content, dorm_number, author_index, category_index,
+    pinned, age_seconds)`` for one chunk.
+
+    ``author_index`` is ``None`` when there are no users; otherwise the post
+    belongs to its author's dorm.
+    """
+    index, start, stop = chunk
+    rng = _rng(seed, 'posts', index)
+    rows = []
+    for _ in range(start, stop):
+        if users:
+            author = rng.randrange(users)
+            dorm = author % dorms + 1
+        else:
+            author = None
+            dorm = rng.randint(1, dorms)
+        title = _fill(rng, rng.choice(TITLES))
+        content = ' '.join(_fill(rng, rng.choice(SENTENCES)) for _ in range(rng.randint(2, 6)))
+        category = rng.randrange(categories) if categories and rng.random() < 0.8 else None
+        pinned = rng.random() < 0.01
+        rows.append((title, content, dorm, author, category, pinned, rng.randrange(span_seconds)))
+    return rows
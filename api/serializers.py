@@ -1,16 +1,32 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
+from rest_framework.exceptions import ParseError
 
-from .models import Category, Post
+from .compiled import CompiledReadMixin
+from .prefetch import PrefetchMixin
+from .models import Category, Post, get_user_role
 
 
 User = get_user_model()
 
+# Dummy attachment names, indexed by post id
+ATTACHMENT_FILE_TYPES = ('document.pdf', 'image.jpg', 'spreadsheet.xlsx', 'presentation.pptx', 'archive.zip')
+
+
+class UserSerializer(PrefetchMixin, serializers.ModelSerializer):
+    role = serializers.SerializerMethodField()
 
-class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('id', 'username', 'email', 'first_name', 'last_name', 'role')
+        # Що читають методи (див. api/prefetch.py)
+        field_sources = {'role': ('is_superuser', 'is_staff')}
+
+    def get_role(self, obj):
+        """
+        Derive the role from the built-in auth flags.
+        """
+        return get_user_role(obj)
 
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -29,7 +45,44 @@ class RegisterSerializer(serializers.ModelSerializer):
         return user
 
 
-class PostSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """
+    Serializer mixin: ``?fields=title,excerpt`` limits the output to those
+    fields (``id`` is always kept).
+
+    The names come from ``context['fields']`` or the request's ``fields``
+    query parameter. Only the top-level serializer (or the item serializer
+    of a top-level list) is limited; nested serializers keep all fields.
+    """
+    fields_query_param = 'fields'
+
+    def requested_fields(self):
+        if 'fields' in self.context:
+            return self.context['fields']
+        request = self.context.get('request')
+        if request is None:
+            return None
+        raw = getattr(request, 'query_params', request.GET).get(self.fields_query_param)
+        if raw is None:
+            return None
+        return [name.strip() for name in raw.split(',') if name.strip()]
+
+    def get_fields(self):
+        fields = super().get_fields()
+        root = self.root
+        if not (root is self or (root is self.parent and getattr(root, 'many', False))):
+            return fields
+        requested = self.requested_fields()
+        if requested is None:
+            return fields
+        unknown = sorted(set(requested) - fields.keys())
+        if unknown:
+            raise ParseError(f"Невідомі поля: {', '.join(unknown)}. Доступні: {', '.join(fields)}.")
+        keep = set(requested) | {'id'}
+        return {name: field for name, field in fields.items() if name in keep}
+
+
+class PostSerializer(PrefetchMixin, SparseFieldsMixin, serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
     category = serializers.PrimaryKeyRelatedField(
         queryset=Category.objects.all(), allow_null=True, required=False
@@ -43,6 +96,7 @@ class PostSerializer(serializers.ModelSerializer):
             'title',
             'slug',
             'content',
+            'excerpt',
             'author',
             'category',
             'attachment',
@@ -53,7 +107,8 @@ class PostSerializer(serializers.ModelSerializer):
             'updated_at',
             'published_at',
         )
-        read_only_fields = ('slug', 'created_at', 'updated_at', 'published_at', 'attachment_url')
+        read_only_fields = ('slug', 'excerpt', 'created_at', 'updated_at', 'published_at', 'attachment_url')
+        field_sources = {'attachment_url': ('attachment', 'id')}
 
     def get_attachment_url(self, obj):
         """
@@ -66,16 +121,42 @@ class PostSerializer(serializers.ModelSerializer):
             if request:
                 return request.build_absolute_uri(obj.attachment.url)
             return obj.attachment.url
-        
+
         # Return deterministic dummy URL based on post ID
         post_id = obj.id if obj.id else 'new'
         # Use post ID modulo to select file type for consistency
-        file_types = ['document.pdf', 'image.jpg', 'spreadsheet.xlsx', 'presentation.pptx', 'archive.zip']
-        file_index = (post_id % len(file_types)) if isinstance(post_id, int) else 0
-        file_name = file_types[file_index] if isinstance(post_id, int) else file_types[0]
-        
+        if isinstance(post_id, int):
+            file_name = ATTACHMENT_FILE_TYPES[post_id % len(ATTACHMENT_FILE_TYPES)]
+        else:
+            file_name = ATTACHMENT_FILE_TYPES[0]
+
         return f"https://example.com/api/attachments/{post_id}/{file_name}"
 
 
+class FastPostSerializer(CompiledReadMixin, PostSerializer):
+    """
+    Read-only ``PostSerializer`` with the same output, built by a compiled
+    per-serializer function. A drop-in for read-only ``PostSerializer(many=True)``
+    lists; the feed and exports build their rows from ``.values()`` and do not
+    go through either. ``manage.py bench_serializers`` checks that the output
+    matches and measures the speedup.
+    """
+
+
+class BulkPostItemSerializer(serializers.ModelSerializer):
+    """
+    One item of a bulk post creation request.
 
+    The dorm and author come from the request user. Category ids are checked
+    against ``context['category_ids']`` so a batch costs one query for them.
+    """
+    category = serializers.IntegerField(allow_null=True, required=False)
+
+    class Meta:
+        model = Post
+        fields = ('title', 'content', 'category')
 
+    def validate_category(self, value):
+        if value is not None and value not in self.context['category_ids']:
+            raise serializers.ValidationError(f'Invalid pk "{value}" - object does not exist.')
+        return value
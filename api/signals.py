@@ -0,0 +1,156 @@
+"""
+Signal receivers that keep the feed cache and the change log consistent
+with post writes, revoke signed auth tokens whose embedded data went
+stale, shrink student ID photos before they reach storage and publish
+profiling rules to every process.
+
+They cover every path that goes through ``Model.save``/``Model.delete``:
+the API views, the Django admin, management commands and the shell.
+Queryset ``update``/``bulk_create`` are handled in ``PostQuerySet``.
+"""
+
+import logging
+import os
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db import connections
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
+from django.dispatch import receiver
+
+from . import images, profiling, search
+from .authentication import revoke_user_tokens
+from .feed_cache import invalidate_dorm
+from .models import Post, PostChange, ProfilingRule, StudentProfile, get_user_role
+
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=Post)
+def invalidate_feed_on_save(sender, instance, **kwargs):
+    invalidate_dorm(instance.dorm_number)
+    # Пост перенесли в інший гуртожиток - старий теж має оновитися
+    loaded_dorm_number = getattr(instance, '_loaded_dorm_number', None)
+    if loaded_dorm_number is not None and loaded_dorm_number != instance.dorm_number:
+        invalidate_dorm(loaded_dorm_number)
+        PostChange.objects.create(post_id=instance.pk, dorm_number=loaded_dorm_number, action=PostChange.Action.DELETE)
+    PostChange.objects.create(post_id=instance.pk, dorm_number=instance.dorm_number, action=PostChange.Action.UPSERT)
+    instance._loaded_dorm_number = instance.dorm_number
+
+
+@receiver(pre_save, sender=Post)
+def remember_image_upload(sender, instance, raw=False, **kwargs):
+    # Новий файл може отримати те саме ім'я, що й попередній: source
+    # у image_variants тоді не покаже, що зображення змінилося
+    if not raw and instance.image and not instance.image._committed:
+        instance._image_uploaded = True
+
+
+@receiver(post_save, sender=Post)
+def generate_image_derivatives(sender, instance, **kwargs):
+    uploaded = instance.__dict__.pop('_image_uploaded', False)
+    if not (uploaded or images.needs_derivatives(instance)):
+        return
+
+    def render():
+        # Файл уже збережено, а транзакцію зафіксовано - рендеримо один раз,
+        # у фоновому потоці: запит не чекає на кодування WebP/JPEG
+        previous = instance.image_variants
+        try:
+            variants = images.render_derivatives(instance.image.name, instance.image.storage)
+        except Exception:
+            logger.exception('Could not render derivatives of %s', instance.image.name)
+            return
+        Post.objects.filter(pk=instance.pk, image=instance.image.name).update(image_variants=variants)
+        instance.image_variants = variants
+        if previous:
+            # Нове зображення могло отримати те саме ім'я - його файли лишаємо
+            images.delete_derivatives(previous, instance.image.storage, keep=images.derivative_files(variants))
+
+    transaction.on_commit(lambda: images.render_later(render))
+
+
+@receiver(post_delete, sender=Post)
+def delete_image_derivatives(sender, instance, **kwargs):
+    if instance.image_variants:
+        transaction.on_commit(lambda: images.delete_derivatives(instance.image_variants, instance.image.storage))
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_feed_on_delete(sender, instance, **kwargs):
+    invalidate_dorm(instance.dorm_number)
+    PostChange.objects.create(post_id=instance.pk, dorm_number=instance.dorm_number, action=PostChange.Action.DELETE)
+
+
+@receiver(pre_save, sender=StudentProfile)
+def shrink_student_id_photo(sender, instance, raw=False, **kwargs):
+    photo = instance.student_id_photo
+    # Обробляємо лише щойно завантажений файл, ще не записаний у сховище
+    if raw or not photo or photo._committed:
+        return
+    upload = photo.file
+    upload.seek(0)
+    try:
+        data, thumbnail = images.process_id_photo(upload)
+    except images.ImageRejected as e:
+        raise ValidationError({'student_id_photo': str(e)})
+    stem, _ = os.path.splitext(os.path.basename(photo.name))
+    instance.student_id_photo = ContentFile(data, name=f'{stem}.webp')
+    instance._id_photo_thumbnail = thumbnail
+
+
+@receiver(post_save, sender=StudentProfile)
+def store_id_photo_thumbnail(sender, instance, **kwargs):
+    thumbnail = instance.__dict__.pop('_id_photo_thumbnail', None)
+    if thumbnail is not None:
+        # Ім'я фото остаточне лише після збереження (сховище могло додати суфікс)
+        images.store_id_photo_thumbnail(instance.student_id_photo.name, thumbnail, instance.student_id_photo.storage)
+
+
+@receiver(post_save, sender=StudentProfile)
+def revoke_tokens_on_dorm_change(sender, instance, created, **kwargs):
+    loaded_dorm_number = getattr(instance, '_loaded_dorm_number', None)
+    if not created and loaded_dorm_number is not None and loaded_dorm_number != instance.dorm_number:
+        revoke_user_tokens(instance.user_id)
+    instance._loaded_dorm_number = instance.dorm_number
+
+
+@receiver(pre_save, sender=User)
+def remember_user_role(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Роль вшита в токени - після її зміни старі токени мають перестати діяти
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and not {'is_staff', 'is_superuser'} & set(update_fields):
+        return
+    flags = User.objects.filter(pk=instance.pk).values('is_staff', 'is_superuser').first()
+    if flags is not None:
+        instance._loaded_role = get_user_role(User(**flags))
+
+
+@receiver(post_save, sender=User)
+def revoke_tokens_on_user_change(sender, instance, created, **kwargs):
+    loaded_role = instance.__dict__.pop('_loaded_role', None)
+    if created:
+        return
+    # _password задає лише set_password(), не оновлення хешу під час входу
+    password_changed = instance._password is not None
+    role_changed = loaded_role is not None and loaded_role != get_user_role(instance)
+    if not instance.is_active or password_changed or role_changed:
+        revoke_user_tokens(instance.pk)
+
+
+@receiver(post_save, sender=ProfilingRule)
+@receiver(post_delete, sender=ProfilingRule)
+def publish_profiling_rules(sender, **kwargs):
+    # Middleware бачить правила лише через кеш
+    transaction.on_commit(profiling.publish_rules)
+
+
+@receiver(post_migrate)
+def restore_search_index(sender, using, **kwargs):
+    # Міграції SQLite, що змінюють api_post, перебудовують таблицю і гублять тригери
+    if sender.name == 'api':
+        search.ensure_fts_schema(connections[using])
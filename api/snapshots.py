@@ -0,0 +1,152 @@
+"""
+Prebuilt database snapshots for tests and benchmarks.
+
+A snapshot is a SQLite file holding a migrated database seeded by
+``seed_data`` in scale mode. Its name combines the seed parameters with a
+hash of the project's migrations, so changing a migration never restores
+a stale schema. Snapshots are copied in and out with SQLite's online backup
+API, which takes milliseconds and works for the in-memory test database too.
+On other backends (PostgreSQL) the data is seeded afresh instead.
+
+Settings:
+    SNAPSHOT_DIR  where snapshot files live (default: ``BASE_DIR/.snapshots``)
+"""
+
+import hashlib
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connections
+from django.db.migrations.loader import MigrationLoader
+
+
+DEFAULT_PARAMS = {'users': 1000, 'posts': 20000, 'dorms': 10, 'seed': 0}
+
+
+def snapshot_dir():
+    return getattr(settings, 'SNAPSHOT_DIR', None) or os.path.join(settings.BASE_DIR, '.snapshots')
+
+
+def migration_state():
+    """
+    Short hash of every migration on disk (names and file contents).
+    """
+    loader = MigrationLoader(None, ignore_no_migrations=True)
+    digest = hashlib.sha1()
+    for app_label, name in sorted(loader.disk_migrations):
+        digest.update(f'{app_label}.{name}\n'.encode())
+        source = getattr(sys.modules[type(loader.disk_migrations[app_label, name]).__module__], '__file__', None)
+        if source and os.path.exists(source):
+            with open(source, 'rb') as fh:
+                digest.update(fh.read())
+    return digest.hexdigest()[:12]
+
+
+def snapshot_path(name='seed', **params):
+    params = {**DEFAULT_PARAMS, **params}
+    key = '-'.join(f'{field[0]}{params[field]}' for field in ('users', 'posts', 'dorms', 'seed'))
+    return os.path.join(snapshot_dir(), f'{name}-{key}-{migration_state()}.sqlite3')
+
+
+def supported(using='default'):
+    return connections[using].vendor == 'sqlite'
+
+
+def _raw_connection(using='default'):
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        raise ValueError(f'Snapshots need SQLite, "{using}" is {connection.vendor}')
+    connection.ensure_connection()
+    return connection.connection
+
+
+def save(path, using='default'):
+    """
+    Copy the live database ``using`` into ``path`` (written atomically).
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    os.close(fd)
+    target = sqlite3.connect(tmp_path)
+    try:
+        _raw_connection(using).backup(target)
+    finally:
+        target.close()
+    os.replace(tmp_path, path)
+    return path
+
+
+def restore(path, using='default'):
+    """
+    Replace the contents of database ``using`` with the snapshot at ``path``.
+    """
+    source = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        source.backup(_raw_connection(using))
+    finally:
+        source.close()
+    # Версії стрічок у кеші описують попередній стан БД
+    caches[getattr(settings, 'FEED_CACHE_ALIAS', 'default')].clear()
+
+
+def build(path, using='default', **params):
+    """
+    Seed the (already migrated, empty) database ``using`` and save it to ``path``.
+
+    Returns the path, or ``None`` when the backend cannot be snapshotted.
+    """
+    params = {**DEFAULT_PARAMS, **params}
+    call_command('seed_data', stdout=io.StringIO(), **params)
+    return save(path, using) if supported(using) else None
+
+
+class SnapshotTestMixin:
+    """
+    ``TestCase`` mixin that starts the class from a seeded snapshot.
+
+    The snapshot is built in the test database the first time and restored
+    from disk afterwards; the empty database is put back after the class.
+    Set ``snapshot_params`` to the ``seed_data`` options. Without SQLite the
+    class seeds inside its own transaction and ``snapshot_file`` is ``None``.
+    """
+
+    snapshot_name = 'tests'
+    snapshot_params = {'users': 50, 'posts': 500, 'dorms': 3, 'seed': 0}
+
+    @classmethod
+    def setUpClass(cls):
+        if not supported():
+            # Транзакцію класу TestCase відкотить разом із даними
+            super().setUpClass()
+            caches[getattr(settings, 'FEED_CACHE_ALIAS', 'default')].clear()
+            call_command('seed_data', stdout=io.StringIO(), **{**DEFAULT_PARAMS, **cls.snapshot_params})
+            cls.snapshot_file = None
+            return
+
+        # До того як TestCase відкриє транзакцію класу
+        raw = _raw_connection()
+        cls._empty_database = sqlite3.connect(':memory:')
+        raw.backup(cls._empty_database)
+
+        path = snapshot_path(cls.snapshot_name, **cls.snapshot_params)
+        if os.path.exists(path):
+            restore(path)
+        else:
+            build(path, **cls.snapshot_params)
+        cls.snapshot_file = path
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        if cls.snapshot_file is None:
+            return
+        cls._empty_database.backup(_raw_connection())
+        cls._empty_database.close()
+        caches[getattr(settings, 'FEED_CACHE_ALIAS', 'default')].clear()
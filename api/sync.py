@@ -0,0 +1,158 @@
+"""
+Delta sync of the dorm feed.
+
+Clients keep a local copy of their dorm's posts and a watermark. Every
+write to a post appends a ``PostChange`` row, so the work per sync is
+proportional to the number of changes since the watermark, not to the
+size of the feed.
+
+Without a watermark the client first gets a snapshot: the dorm's current
+posts, page by page, followed by the changes logged since the snapshot
+started. The log is therefore only needed for the retention period
+(``POST_CHANGE_RETENTION_DAYS``, see ``prune_post_changes``): a watermark
+older than the oldest remaining change gets 410 Gone and the client starts
+over with a snapshot.
+"""
+
+import base64
+import binascii
+import datetime
+
+from django.conf import settings
+from django.db.models import Max, Min
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound, ValidationError
+
+from .models import Post, PostChange
+from .pagination import FEED_ORDERING, decode_cursor, encode_cursor, keyset_filter
+
+
+WATERMARK_PREFIX = 'v1:'
+PRUNE_BATCH_SIZE = 5000
+
+
+class WatermarkExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = 'Журнал змін за цей період уже очищено. Синхронізуйте з нуля.'
+    default_code = 'watermark_expired'
+
+
+def encode_watermark(sequence, cursor=None):
+    # cursor - позиція в знімку гуртожитку, поки його не передано повністю
+    raw = f'{WATERMARK_PREFIX}{sequence}' + (f':{cursor}' if cursor else '')
+    return base64.urlsafe_b64encode(raw.encode('ascii')).decode('ascii').rstrip('=')
+
+
+def decode_watermark(token):
+    """
+    Return ``(sequence, cursor)`` stored in ``token``.
+
+    An empty token means ``(None, None)``: start with a snapshot. ``cursor``
+    is the snapshot position (``decode_cursor`` tuple) or ``None``.
+    """
+    if not token:
+        return None, None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode('ascii')).decode('ascii')
+        if not raw.startswith(WATERMARK_PREFIX):
+            raise ValueError(raw)
+        sequence, _, cursor = raw[len(WATERMARK_PREFIX):].partition(':')
+        sequence = int(sequence)
+        if sequence < 0:
+            raise ValueError(raw)
+        return sequence, decode_cursor(cursor) if cursor else None
+    except (TypeError, ValueError, UnicodeError, binascii.Error, NotFound):
+        raise ValidationError({'since': 'Невірний водяний знак.'})
+
+
+def sync_page(dorm_number, token, limit):
+    """
+    Answer one sync request of ``dorm_number`` from watermark ``token``.
+
+    Returns ``(posts, deleted_ids, watermark, has_more)``.
+    """
+    sequence, cursor = decode_watermark(token)
+    if sequence is not None and cursor is None:
+        posts, deleted_ids, sequence, has_more = changes_since(dorm_number, sequence, limit)
+        return posts, deleted_ids, encode_watermark(sequence), has_more
+
+    if sequence is None:
+        # Номер читаємо до постів: зміни, зафіксовані під час передачі знімка,
+        # мають більші номери й прийдуть після нього (повторно - не страшно)
+        sequence = PostChange.objects.aggregate(newest=Max('id'))['newest'] or 0
+    posts = Post.objects.filter(dorm_number=dorm_number).order_by(*FEED_ORDERING)
+    if cursor is not None:
+        posts = posts.filter(keyset_filter(*cursor))
+    posts = list(posts[:limit + 1])
+    if len(posts) > limit:
+        posts = posts[:limit]
+        return posts, [], encode_watermark(sequence, encode_cursor(posts[-1])), True
+    # Знімок передано; has_more - якщо поки що вже є зміни після нього
+    has_more = PostChange.objects.filter(dorm_number=dorm_number, id__gt=sequence).exists()
+    return posts, [], encode_watermark(sequence), has_more
+
+
+def changes_since(dorm_number, since, limit):
+    """
+    Collect changes of ``dorm_number`` after sequence ``since``.
+
+    Returns ``(posts, deleted_ids, sequence, has_more)``. Several changes of
+    one post collapse into its current state: posts that no longer exist in
+    the dorm are reported as deleted. Raises ``WatermarkExpired`` if changes
+    after ``since`` may have been pruned.
+    """
+    # MIN по первинному ключу - один крок індексом
+    oldest = PostChange.objects.aggregate(oldest=Min('id'))['oldest']
+    if oldest is not None and since < oldest - 1:
+        raise WatermarkExpired()
+
+    rows = list(
+        PostChange.objects
+        .filter(dorm_number=dorm_number, id__gt=since)
+        .order_by('id')
+        .values_list('id', 'post_id')[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if not rows:
+        return [], [], since, False
+
+    changed_ids = {post_id for _, post_id in rows}
+    # Лише за первинним ключем: з умовою на dorm_number SQLite обирає індекс
+    # стрічки й перебирає весь гуртожиток, а потім ще й сортує
+    posts = [
+        post for post in Post.objects.filter(id__in=changed_ids).order_by('id')
+        if post.dorm_number == dorm_number
+    ]
+    deleted_ids = sorted(changed_ids - {post.id for post in posts})
+    return posts, deleted_ids, rows[-1][0], has_more
+
+
+def prune_changes(older_than=None, batch_size=PRUNE_BATCH_SIZE):
+    """
+    Delete changes older than ``older_than`` (a timedelta, by default
+    ``POST_CHANGE_RETENTION_DAYS``) and return how many were deleted.
+
+    The newest change is always kept: ``changes_since`` compares watermarks
+    with the oldest remaining id to tell which ones have expired, and an
+    empty log would accept any of them.
+    """
+    if older_than is None:
+        older_than = datetime.timedelta(days=getattr(settings, 'POST_CHANGE_RETENTION_DAYS', 30))
+    cutoff = timezone.now() - older_than
+    newest = PostChange.objects.aggregate(newest=Max('id'))['newest']
+    if newest is None:
+        return 0
+    # id зростають разом із changed_at, тож видаляємо префікс журналу
+    last = PostChange.objects.filter(changed_at__lt=cutoff, id__lt=newest).aggregate(last=Max('id'))['last']
+    if last is None:
+        return 0
+    deleted = 0
+    start = PostChange.objects.aggregate(oldest=Min('id'))['oldest']
+    while start <= last:
+        end = min(start + batch_size - 1, last)
+        deleted += PostChange.objects.filter(id__gte=start, id__lte=end).delete()[0]
+        start = end + 1
+    return deleted
@@ -1,8 +1,54 @@
+import cProfile
+import datetime
+import decimal
+import gzip
+import importlib
+import json
+import logging
+import os
+import pstats
+import shutil
+import tempfile
+import threading
+import time
+from io import BytesIO
+from unittest import mock, skipUnless
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib import admin
+from django.core.handlers.asgi import ASGIHandler
+from django.utils import timezone
+from django.utils.functional import lazy
+from django.utils.http import http_date
+from django.http import HttpResponse
 from django.test import TestCase
-from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.test import AsyncClient, RequestFactory, override_settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.conf import settings
+from django.db import connection, models
+from io import StringIO
 from django.contrib.auth import get_user_model
-from api.models import Post, Category
-from api.serializers import PostSerializer
+from PIL import Image
+from rest_framework import serializers
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from api import feed_cache, images, metrics, profiling, query_plans, renderers, snapshots, transfer, workers
+from api.admin import StudentProfileInline
+from api.authentication import get_token_state, issue_token
+from api.management.commands.bench_endpoints import Command as BenchEndpointsCommand
+from api.hashing import HashingPool, HashingPoolFull
+from api.models import EXCERPT_LENGTH, Post, PostChange, Category, ProfilingRule, StudentProfile, make_excerpt
+from api.search import FTS_TABLE, fts_available
+from api.prefetch import ConstantQueriesTestMixin
+from api.serializers import FastPostSerializer, PostSerializer, UserSerializer
+from api.timing import RequestTimingMiddleware
+from api.snapshots import SnapshotTestMixin, snapshot_path
 
 User = get_user_model()
 
@@ -145,3 +191,2067 @@ class AttachmentGeneratorTest(TestCase):
         # Should end with one of the file types
         file_types = ['document.pdf', 'image.jpg', 'spreadsheet.xlsx', 'presentation.pptx', 'archive.zip']
         self.assertTrue(any(attachment_url.endswith(ft) for ft in file_types))
+
+
+class StudentTestCase(TestCase):
+    """
+    Base test case: a student of dorm 3 with an authenticated API client
+    and an empty cache.
+    """
+    username = 'student'
+    dorm_number = 3
+
+    def setUp(self):
+        self.user = User.objects.create_user(username=self.username, password='testpass123')
+        self.profile = StudentProfile.objects.create(user=self.user, dorm_number=self.dorm_number)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        cache.clear()
+
+    def make_posts(self, count, dorm_number=3, title='Post {i}', content='Text', **kwargs):
+        """Create ``count`` posts in the given dorm"""
+        return [
+            Post.objects.create(title=title.format(i=i), content=content, dorm_number=dorm_number, **kwargs)
+            for i in range(count)
+        ]
+
+    def temporary_dir(self, setting):
+        """Point ``setting`` at a fresh directory removed after the test"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        overridden = override_settings(**{setting: directory})
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+        return directory
+
+
+class FeedPaginationTest(StudentTestCase):
+    """Test cases for keyset pagination of the dorm feed"""
+
+    def collect_feed(self, url='/api/posts/?page_size=4'):
+        """Follow ``next`` links until the feed is exhausted"""
+        ids = []
+        pages = 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(post['id'] for post in response.data['results'])
+            url = response.data['next']
+            pages += 1
+        return ids, pages
+
+    def test_pages_cover_feed_in_order(self):
+        """Test that following cursors yields every post exactly once, newest first"""
+        posts = self.make_posts(10)
+        ids, pages = self.collect_feed()
+
+        self.assertEqual(ids, [post.id for post in reversed(posts)])
+        self.assertEqual(pages, 3)
+
+    def test_pinned_posts_come_first(self):
+        """Test that pinned posts lead the feed regardless of age"""
+        pinned = self.make_posts(2, pinned=True)
+        regular = self.make_posts(5)
+        ids, _ = self.collect_feed()
+
+        self.assertEqual(ids[:2], [post.id for post in reversed(pinned)])
+        self.assertEqual(ids[2:], [post.id for post in reversed(regular)])
+
+    def test_identical_timestamps_use_id_tiebreak(self):
+        """Test that posts sharing created_at are neither skipped nor repeated"""
+        posts = self.make_posts(7)
+        Post.objects.update(created_at=posts[0].created_at)
+        ids, _ = self.collect_feed('/api/posts/?page_size=3')
+
+        self.assertEqual(ids, sorted((post.id for post in posts), reverse=True))
+
+    def test_other_dorms_are_excluded(self):
+        """Test that only the caller's dorm appears in the feed"""
+        own = self.make_posts(2)
+        self.make_posts(3, dorm_number=5)
+        ids, _ = self.collect_feed()
+
+        self.assertEqual(sorted(ids), sorted(post.id for post in own))
+
+    def test_invalid_cursor(self):
+        """Test that a garbage cursor is rejected"""
+        response = self.client.get('/api/posts/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+
+class FeedCacheTest(StudentTestCase):
+    """Test cases for the versioned per-dorm feed cache"""
+
+    def setUp(self):
+        """Set up one post and empty cache statistics"""
+        super().setUp()
+        self.post = Post.objects.create(title='First', content='Text', dorm_number=3)
+        cache.clear()
+        feed_cache.reset_stats()
+
+    def feed_titles(self):
+        response = self.client.get('/api/posts/')
+        return [post['title'] for post in response.data['results']]
+
+    def test_repeated_reads_hit_cache(self):
+        """Test that the second read is served without touching posts"""
+        self.feed_titles()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.feed_titles(), ['First'])
+        self.assertEqual(feed_cache.stats()['hits'], 1)
+        self.assertEqual(feed_cache.stats()['misses'], 1)
+
+    def test_create_invalidates(self):
+        """Test that a new post shows up immediately"""
+        self.feed_titles()
+        Post.objects.create(title='Second', content='Text', dorm_number=3)
+        self.assertEqual(self.feed_titles(), ['Second', 'First'])
+
+    def test_edit_and_pin_invalidate(self):
+        """Test that edits and pinning via save() are visible"""
+        other = Post.objects.create(title='Second', content='Text', dorm_number=3)
+        self.feed_titles()
+        self.post.title = 'Edited'
+        self.post.pinned = True
+        self.post.save()
+        self.assertEqual(self.feed_titles(), ['Edited', 'Second'])
+        other.delete()
+        self.assertEqual(self.feed_titles(), ['Edited'])
+
+    def test_queryset_update_invalidates(self):
+        """Test that bulk updates bypassing signals still invalidate"""
+        self.feed_titles()
+        Post.objects.filter(pk=self.post.pk).update(title='Updated')
+        self.assertEqual(self.feed_titles(), ['Updated'])
+
+    def test_moved_post_invalidates_both_dorms(self):
+        """Test that moving a post out of a dorm removes it from that feed"""
+        self.feed_titles()
+        post = Post.objects.get(pk=self.post.pk)
+        post.dorm_number = 5
+        post.save()
+        self.assertEqual(self.feed_titles(), [])
+
+    def test_dorms_do_not_share_entries(self):
+        """Test that a cached page is never served to another dorm"""
+        self.feed_titles()
+        self.user.profile.dorm_number = 5
+        self.user.profile.save()
+        self.assertEqual(self.feed_titles(), [])
+
+    def test_page_built_before_write_is_not_cached_as_fresh(self):
+        """Test that a page is stored under the version read before its rows"""
+        version = feed_cache.get_version(3)
+        stale = {'results': [{'title': 'First'}], 'next_cursor': None}
+        # Запис між читанням рядків і збереженням сторінки
+        Post.objects.create(title='Second', content='Text', dorm_number=3)
+        feed_cache.set_page(3, None, 20, stale, version)
+
+        self.assertIsNone(feed_cache.get_page(3, None, 20, feed_cache.get_version(3)))
+        self.assertEqual(self.feed_titles(), ['Second', 'First'])
+
+
+class ConditionalRequestTest(StudentTestCase):
+    """Test cases for ETag / Last-Modified handling on feed and detail"""
+
+    def setUp(self):
+        """Set up one post"""
+        super().setUp()
+        self.post = Post.objects.create(title='First', content='Text', dorm_number=3)
+        cache.clear()
+
+    def test_feed_returns_304_for_matching_etag(self):
+        """Test that a revalidated feed costs no post queries"""
+        feed_cache.get_validators(3)
+        with mock.patch('time.time', return_value=time.time() + 1):
+            response = self.client.get('/api/posts/')
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('"'))
+        self.assertIn('Last-Modified', response)
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/posts/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_write_in_the_same_second_is_not_hidden_by_if_modified_since(self):
+        """Test that If-Modified-Since cannot mask a write made in the second of the last change"""
+        def get(at, **headers):
+            with mock.patch('time.time', return_value=at):
+                return self.client.get('/api/posts/', headers=headers)
+
+        with mock.patch('time.time', return_value=1000.2):
+            feed_cache.bump_version(3)
+        # Секунда зміни ще триває - дати немає, валідатор лише ETag
+        self.assertNotIn('Last-Modified', get(1000.4))
+        with mock.patch('time.time', return_value=1000.6):
+            Post.objects.create(title='Second', content='Text', dorm_number=3)
+
+        response = get(1000.8, **{'If-Modified-Since': http_date(1000)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 2)
+
+        response = get(1001.5)
+        self.assertEqual(response['Last-Modified'], http_date(1000))
+        self.assertEqual(get(1001.6, **{'If-Modified-Since': response['Last-Modified']}).status_code, 304)
+        with mock.patch('time.time', return_value=1001.7):
+            Post.objects.create(title='Third', content='Text', dorm_number=3)
+        self.assertEqual(get(1001.8, **{'If-Modified-Since': response['Last-Modified']}).status_code, 200)
+
+    def test_feed_etag_changes_after_write(self):
+        """Test that a new post invalidates the old validator"""
+        etag = self.client.get('/api/posts/')['ETag']
+        Post.objects.create(title='Second', content='Text', dorm_number=3)
+
+        response = self.client.get('/api/posts/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_feed_etag_depends_on_page(self):
+        """Test that different pages have different validators"""
+        first = self.client.get('/api/posts/')['ETag']
+        other = self.client.get('/api/posts/?page_size=5')['ETag']
+        self.assertNotEqual(first, other)
+
+    def test_detail_returns_304_for_matching_etag(self):
+        """Test conditional GET on a single post"""
+        url = f'/api/posts/{self.post.id}/'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_detail_etag_changes_after_edit(self):
+        """Test that editing the post invalidates its validator"""
+        url = f'/api/posts/{self.post.id}/'
+        etag = self.client.get(url)['ETag']
+        self.post.title = 'Edited'
+        self.post.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['title'], 'Edited')
+
+
+class DeltaSyncTest(StudentTestCase):
+    """Test cases for the /api/posts/changes/ delta-sync endpoint"""
+
+    def sync(self, since=None, **params):
+        if since:
+            params['since'] = since
+        response = self.client.get('/api/posts/changes/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_initial_sync_returns_dorm_posts(self):
+        """Test that syncing from scratch returns every post of the dorm"""
+        own = Post.objects.create(title='Own', content='Text', dorm_number=3)
+        Post.objects.create(title='Other', content='Text', dorm_number=5)
+        data = self.sync()
+
+        self.assertEqual([post['id'] for post in data['changed']], [own.id])
+        self.assertEqual(data['deleted'], [])
+        self.assertFalse(data['has_more'])
+
+    def test_only_changes_after_watermark(self):
+        """Test that a second sync returns only what changed since the first"""
+        first = Post.objects.create(title='First', content='Text', dorm_number=3)
+        watermark = self.sync()['watermark']
+        second = Post.objects.create(title='Second', content='Text', dorm_number=3)
+
+        data = self.sync(watermark)
+        self.assertEqual([post['id'] for post in data['changed']], [second.id])
+
+        first.title = 'Edited'
+        first.save()
+        data = self.sync(data['watermark'])
+        self.assertEqual([post['title'] for post in data['changed']], ['Edited'])
+
+        data = self.sync(data['watermark'])
+        self.assertEqual(data['changed'], [])
+        self.assertEqual(data['deleted'], [])
+
+    def test_deleted_and_moved_posts_are_tombstoned(self):
+        """Test that deletions and moves to another dorm are reported"""
+        deleted = Post.objects.create(title='Deleted', content='Text', dorm_number=3)
+        moved = Post.objects.create(title='Moved', content='Text', dorm_number=3)
+        watermark = self.sync()['watermark']
+
+        deleted_id = deleted.id
+        deleted.delete()
+        Post.objects.filter(pk=moved.pk).update(dorm_number=5)
+
+        data = self.sync(watermark)
+        self.assertEqual(data['changed'], [])
+        self.assertEqual(data['deleted'], sorted([deleted_id, moved.id]))
+
+    def sync_all(self, watermark=None, limit=2):
+        seen = []
+        while True:
+            data = self.sync(watermark, limit=limit)
+            seen.extend(post['id'] for post in data['changed'])
+            watermark = data['watermark']
+            if not data['has_more']:
+                return seen, watermark
+
+    def test_limit_pages_through_changes(self):
+        """Test that has_more drives paging through the snapshot and the log"""
+        posts = [Post.objects.create(title=f'Post {i}', content='Text', dorm_number=3) for i in range(5)]
+        seen, watermark = self.sync_all()
+        self.assertEqual(seen, [post.id for post in reversed(posts)])
+
+        for post in posts:
+            post.save()
+        seen, _ = self.sync_all(watermark)
+        self.assertEqual(seen, [post.id for post in posts])
+
+    def test_snapshot_does_not_need_the_log(self):
+        """Test that a first sync lists current posts even with a pruned log"""
+        post = Post.objects.create(title='Post', content='Text', dorm_number=3)
+        PostChange.objects.all().delete()
+        self.assertEqual([item['id'] for item in self.sync()['changed']], [post.id])
+
+    def test_write_during_snapshot_is_replayed(self):
+        """Test that changes made while paging the snapshot come after it"""
+        posts = [Post.objects.create(title=f'Post {i}', content='Text', dorm_number=3) for i in range(3)]
+        data = self.sync(limit=2)
+        self.assertTrue(data['has_more'])
+        posts[0].title = 'Edited'
+        posts[0].save()
+
+        seen, _ = self.sync_all(data['watermark'])
+        self.assertEqual(seen, [posts[0].id, posts[0].id])
+
+    def test_invalid_watermark(self):
+        """Test that a malformed watermark is rejected"""
+        response = self.client.get('/api/posts/changes/', {'since': 'garbage'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_pruned_watermark_requires_full_sync(self):
+        """Test that pruning keeps recent changes and expires older watermarks"""
+        old = Post.objects.create(title='Old', content='Text', dorm_number=3)
+        stale = self.sync()['watermark']
+        old.title = 'Edited'
+        old.save()
+        PostChange.objects.update(changed_at=timezone.now() - datetime.timedelta(days=40))
+        recent = Post.objects.create(title='Recent', content='Text', dorm_number=3)
+
+        out = StringIO()
+        call_command('prune_post_changes', '--days', '30', stdout=out)
+        self.assertIn('Deleted 2 changes', out.getvalue())
+        self.assertEqual(list(PostChange.objects.values_list('post_id', flat=True)), [recent.id])
+
+        response = self.client.get('/api/posts/changes/', {'since': stale})
+        self.assertEqual(response.status_code, 410)
+        self.assertEqual(
+            sorted(post['id'] for post in self.sync()['changed']), sorted([old.id, recent.id])
+        )
+
+    def test_prune_keeps_newest_change(self):
+        """Test that the last change survives so watermarks can be checked"""
+        Post.objects.create(title='Only', content='Text', dorm_number=3)
+        watermark = self.sync()['watermark']
+        PostChange.objects.update(changed_at=timezone.now() - datetime.timedelta(days=40))
+
+        call_command('prune_post_changes', stdout=StringIO())
+        self.assertEqual(PostChange.objects.count(), 1)
+        self.assertEqual(self.sync(watermark)['changed'], [])
+
+    def test_queryset_update_runs_in_batches(self):
+        """Test that a large update is logged batch by batch"""
+        posts = [Post.objects.create(title=f'Post {i}', content='Text', dorm_number=3) for i in range(5)]
+        watermark = self.sync()['watermark']
+
+        with mock.patch.object(Post.objects._queryset_class, 'UPDATE_BATCH_SIZE', 2):
+            rows = Post.objects.filter(pinned=False).update(pinned=True, dorm_number=5)
+
+        self.assertEqual(rows, 5)
+        self.assertEqual(Post.objects.filter(pinned=True, dorm_number=5).count(), 5)
+        self.assertEqual(self.sync(watermark)['deleted'], [post.id for post in posts])
+
+    def test_change_log_appends_take_a_lock_on_postgresql(self):
+        """Test that change rows are inserted under the advisory lock"""
+        statements = []
+
+        def record(execute, sql, params, many, context):
+            statements.append(sql)
+            if 'pg_advisory_xact_lock' in sql:
+                return None
+            return execute(sql, params, many, context)
+
+        with mock.patch.object(connection, 'vendor', 'postgresql'), connection.execute_wrapper(record):
+            Post.objects.create(title='Locked', content='Text', dorm_number=3)
+            Post.objects.filter(dorm_number=3).update(pinned=True)
+
+        locks = [index for index, sql in enumerate(statements) if 'pg_advisory_xact_lock' in sql]
+        inserts = [index for index, sql in enumerate(statements) if sql.startswith('INSERT INTO "api_postchange"')]
+        self.assertEqual(len(locks), 2)
+        self.assertEqual(len(inserts), 2)
+        self.assertTrue(all(lock < insert for lock, insert in zip(locks, inserts)))
+
+
+class PostSearchTest(StudentTestCase):
+    """Test cases for full-text search over dorm posts"""
+
+    def setUp(self):
+        """Set up a few Ukrainian posts"""
+        super().setUp()
+        self.water = Post.objects.create(
+            title='Відключення гарячої води', content='У четвер не буде води на всіх поверхах.', dorm_number=3
+        )
+        self.meeting = Post.objects.create(
+            title='Збори старост', content='Обговоримо графік чергування та гарячу воду.', dorm_number=3
+        )
+        Post.objects.create(title='Гаряча вода', content='Інший гуртожиток.', dorm_number=5)
+
+    def search(self, q):
+        response = self.client.get('/api/posts/search/', {'q': q})
+        self.assertEqual(response.status_code, 200)
+        return [post['id'] for post in response.data['results']]
+
+    def test_prefix_search_is_case_insensitive(self):
+        """Test that Cyrillic prefixes match regardless of case"""
+        self.assertEqual(self.search('ВІДКЛЮЧ'), [self.water.id])
+
+    @skipUnless(fts_available(), 'bm25 ranking needs SQLite FTS5')
+    def test_title_matches_rank_first(self):
+        """Test that bm25 ranks title hits above content-only hits"""
+        self.assertEqual(self.search('гаряч вод'), [self.water.id, self.meeting.id])
+
+    def test_results_are_scoped_to_dorm(self):
+        """Test that other dorms' posts are never returned"""
+        self.assertNotIn(Post.objects.get(dorm_number=5).id, self.search('інший'))
+
+    def test_index_follows_edits_and_deletes(self):
+        """Test that the triggers keep the index in sync"""
+        Post.objects.filter(pk=self.meeting.pk).update(title='Прибирання')
+        self.assertEqual(self.search('прибир'), [self.meeting.id])
+        self.meeting.delete()
+        self.assertEqual(self.search('прибир'), [])
+
+    def test_operators_in_query_are_literal(self):
+        """Test that FTS syntax in user input does not raise"""
+        self.assertEqual(self.search('"води" OR NOT*'), [])
+        self.assertEqual(self.client.get('/api/posts/search/', {'q': '  '}).status_code, 400)
+
+    def test_moved_post_follows_its_dorm(self):
+        """Test that changing dorm_number moves the post between dorm results"""
+        Post.objects.filter(pk=self.water.pk).update(dorm_number=5)
+        self.assertEqual(self.search('відключ'), [])
+        self.meeting.dorm_number = 5
+        self.meeting.save()
+        self.assertEqual(self.search('збори'), [])
+
+    def test_dorm_number_is_not_searchable_text(self):
+        """Test that a numeric query does not match the dorm column"""
+        self.assertEqual(self.search('3'), [])
+
+    def test_short_i_and_yi_are_not_folded(self):
+        """Test that the tokenizer keeps й/ї apart from и/і"""
+        mine = Post.objects.create(title='Мій велосипед', content='Зник біля входу.', dorm_number=3)
+        Post.objects.create(title='Мийка на поверсі', content='Не працює.', dorm_number=3)
+        Post.objects.create(title='Гаі', content='Опечатка.', dorm_number=3)
+        self.assertEqual(self.search('мій'), [mine.id])
+        self.assertEqual(self.search('гаї'), [])
+
+    @skipUnless(fts_available(), 'the index is an SQLite FTS5 table')
+    def test_dorm_filter_is_part_of_match(self):
+        """Test that the dorm is matched by the FTS query, not after the join"""
+        with CaptureQueriesContext(connection) as queries:
+            self.search('гаряч')
+        [sql] = [query['sql'] for query in queries.captured_queries if FTS_TABLE in query['sql']]
+        self.assertIn('dorm_number : "3"', sql)
+        self.assertNotIn('p.dorm_number', sql)
+
+    @skipUnless(fts_available(), 'the index is an SQLite FTS5 table')
+    def test_rebuild_command(self):
+        """Test that a rebuild restores a consistent index"""
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')")
+        self.assertEqual(self.search('збори'), [])
+
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Indexed 3 posts', out.getvalue())
+        self.assertEqual(self.search('збори'), [self.meeting.id])
+        Post.objects.filter(pk=self.meeting.pk).update(title='Прибирання')
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('integrity-check', 1)")
+
+
+class SignedTokenAuthTest(StudentTestCase):
+    """Test cases for stateless signed auth tokens"""
+
+    def setUp(self):
+        """Log in through the API"""
+        super().setUp()
+        Post.objects.create(title='First', content='Text', dorm_number=3)
+        cache.clear()
+        self.client = APIClient()
+        response = self.client.post('/api/auth/login/', {'username': 'student', 'password': 'testpass123'})
+        self.assertEqual(response.status_code, 200)
+        self.token = response.data['token']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+
+    def test_feed_needs_no_auth_queries(self):
+        """Test that a cached feed read issues no queries at all"""
+        self.client.get('/api/posts/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/posts/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([post['title'] for post in response.data['results']], ['First'])
+
+    def test_tampered_token_is_rejected(self):
+        """Test that changing the payload breaks the signature"""
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token x{self.token}')
+        self.assertEqual(self.client.get('/api/posts/').status_code, 401)
+
+    def test_logout_revokes_token(self):
+        """Test that a token stops working after logout"""
+        self.assertEqual(self.client.post('/api/auth/logout/').status_code, 200)
+        self.assertEqual(self.client.get('/api/posts/').status_code, 401)
+
+    def test_dorm_change_revokes_tokens(self):
+        """Test that moving a student invalidates tokens with the old dorm"""
+        profile = StudentProfile.objects.get(pk=self.profile.pk)
+        profile.dorm_number = 5
+        profile.save()
+        self.assertEqual(self.client.get('/api/posts/').status_code, 401)
+
+    def login(self):
+        response = APIClient().post('/api/auth/login/', {'username': 'student', 'password': 'testpass123'})
+        self.assertEqual(response.status_code, 200)
+        return response.data['token']
+
+    def get(self, url, token):
+        return APIClient().get(url, HTTP_AUTHORIZATION=f'Token {token}')
+
+    def get_feed(self, token):
+        return self.get('/api/posts/', token)
+
+    def test_revocation_survives_cache_eviction(self):
+        """Test that a logged-out or moved token stays revoked after cache churn"""
+        other = self.login()
+        self.client.post('/api/auth/logout/')
+        StudentProfile.objects.filter(pk=self.profile.pk).update(dorm_number=3)
+        profile = StudentProfile.objects.get(pk=self.profile.pk)
+        profile.dorm_number = 5
+        profile.save()
+
+        for i in range(400):
+            feed_cache.set_page(3, f'c{i}', 20, {'results': [], 'next_cursor': None}, 1)
+        cache.clear()
+        self.assertEqual(self.get_feed(self.token).status_code, 401)
+        self.assertEqual(self.get_feed(other).status_code, 401)
+
+    def test_logout_keeps_other_sessions(self):
+        """Test that logging out revokes only the token used"""
+        other = self.login()
+        self.client.post('/api/auth/logout/')
+        self.assertEqual(self.get_feed(self.token).status_code, 401)
+        self.assertEqual(self.get_feed(other).status_code, 200)
+
+    def test_password_change_revokes_tokens(self):
+        """Test that set_password() invalidates tokens issued before it"""
+        user = User.objects.get(pk=self.user.pk)
+        user.set_password('newpass456')
+        user.save()
+        self.assertEqual(self.get_feed(self.token).status_code, 401)
+
+    def test_login_rehash_keeps_tokens(self):
+        """Test that a password hash upgraded on login does not revoke tokens"""
+        with mock.patch('django.contrib.auth.hashers.PBKDF2PasswordHasher.must_update', return_value=True):
+            self.login()
+        self.assertEqual(self.get_feed(self.token).status_code, 200)
+
+    def test_demoted_staff_loses_admin_access(self):
+        """Test that removing is_staff revokes tokens carrying the old role"""
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        staff_token = self.login()
+        export = '/api/dorms/3/export/'
+        self.assertEqual(self.get(export, staff_token).status_code, 200)
+
+        user = User.objects.get(pk=self.user.pk)
+        user.is_staff = False
+        user.save()
+        self.assertEqual(self.get(export, staff_token).status_code, 401)
+        self.assertEqual(self.get(export, self.login()).status_code, 403)
+
+    def test_database_tokens_still_work(self):
+        """Test that tokens issued by TokenAuthentication are accepted"""
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.assertEqual(self.client.get('/api/posts/').status_code, 200)
+
+
+@override_settings(ROOT_URLCONF='myproject.urls_async')
+class AsyncAuthViewsTest(TestCase):
+    """Test cases for the async login/register views served under ASGI"""
+
+    async def test_register_then_login(self):
+        """Test that an account registered async can log in and read the feed"""
+        client = AsyncClient()
+        response = await client.post(
+            '/api/auth/register/',
+            {'username': 'newbie', 'password': 'testpass123', 'dorm_number': 4},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        profile = await StudentProfile.objects.select_related('user').aget(user__username='newbie')
+        self.assertEqual(profile.dorm_number, 4)
+        self.assertTrue(profile.user.check_password('testpass123'))
+
+        response = await client.post(
+            '/api/auth/login/',
+            {'username': 'newbie', 'password': 'testpass123'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        token = response.json()['token']
+
+        response = await client.get('/api/posts/', headers={'Authorization': f'Token {token}'})
+        self.assertEqual(response.status_code, 200)
+
+    async def test_login_rejects_bad_credentials(self):
+        """Test that wrong passwords and unknown users get the same error"""
+        await sync_to_async(User.objects.create_user)(username='student', password='testpass123')
+        client = AsyncClient()
+        wrong = await client.post('/api/auth/login/', {'username': 'student', 'password': 'nope'},
+                                  content_type='application/json')
+        unknown = await client.post('/api/auth/login/', {'username': 'ghost', 'password': 'nope'},
+                                    content_type='application/json')
+        self.assertEqual(wrong.status_code, 400)
+        self.assertEqual(wrong.json(), unknown.json())
+
+    async def test_register_rejects_taken_username(self):
+        """Test that duplicate usernames are refused"""
+        await sync_to_async(User.objects.create_user)(username='student', password='testpass123')
+        response = await AsyncClient().post(
+            '/api/auth/register/', {'username': 'student', 'password': 'other'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    async def test_overloaded_pool_returns_503(self):
+        """Test that a full hashing queue turns into 503 with Retry-After"""
+        with mock.patch('api.async_views.get_pool', return_value=HashingPool(workers=1, max_queue=0)):
+            response = await AsyncClient().post(
+                '/api/auth/register/', {'username': 'newbie', 'password': 'x'}, content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+
+class HashingPoolTest(TestCase):
+    """Test cases for the bounded password-hashing pool"""
+
+    def test_queue_depth_is_bounded(self):
+        """Test that submissions beyond max_queue are rejected until jobs finish"""
+        pool = HashingPool(workers=1, max_queue=2)
+        release = threading.Event()
+        first = pool.submit(release.wait)
+        second = pool.submit(release.wait)
+        with self.assertRaises(HashingPoolFull):
+            pool.submit(release.wait)
+        self.assertEqual(pool.depth, 2)
+
+        release.set()
+        first.result()
+        second.result()
+        self.assertEqual(pool.run(sum, [1, 2]), 3)
+        pool.shutdown()
+
+
+@override_settings(POST_IMAGE_VARIANTS={'small': 32, 'medium': 64})
+@override_settings(POST_IMAGE_RENDER_THREADS=0)
+class ImageDerivativeTest(StudentTestCase):
+    """Test cases for responsive derivatives of post images"""
+
+    def setUp(self):
+        """Use a temporary MEDIA_ROOT"""
+        super().setUp()
+        self.media_root = self.temporary_dir('MEDIA_ROOT')
+
+    def make_image(self, size=(200, 100), name='photo.png', mode='RGBA'):
+        buffer = BytesIO()
+        Image.new(mode, size, (200, 30, 30, 128)[:len(mode)]).save(buffer, 'PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+    def test_upload_renders_all_variants(self):
+        """Test that saving a post with an image writes every rendition"""
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(title='Photo', content='Text', dorm_number=3, image=self.make_image())
+        post.refresh_from_db()
+
+        self.assertEqual(post.image_variants['source'], post.image.name)
+        self.assertEqual(post.image_variants['small']['webp'], f'{post.image.name}.small.webp')
+        self.assertEqual(post.image_variants['small']['width'], 32)
+        self.assertEqual(post.image_variants['medium']['width'], 64)
+        self.assertEqual(post.image_variants['original']['width'], 200)
+        for variant in ('small', 'medium', 'original'):
+            for fmt in ('webp', 'jpeg'):
+                self.assertTrue(post.image.storage.exists(post.image_variants[variant][fmt]))
+
+    @override_settings(POST_IMAGE_RENDER_THREADS=2)
+    def test_upload_is_rendered_off_the_request_thread(self):
+        """Test that the commit only queues the rendering for the background pool"""
+        submitted = []
+        with mock.patch('api.images.ThreadPoolExecutor') as executor, \
+                mock.patch.object(images, '_render_pool', {'pid': None, 'pool': None}):
+            executor.return_value.submit.side_effect = lambda fn, *args: submitted.append((fn, args))
+            with self.captureOnCommitCallbacks(execute=True):
+                post = Post.objects.create(title='Photo', content='Text', dorm_number=3, image=self.make_image())
+        executor.assert_called_once_with(max_workers=2, thread_name_prefix='image-render')
+        self.assertEqual(len(submitted), 1)
+        post.refresh_from_db()
+        self.assertEqual(post.image_variants, {})
+
+        # Те, що виконав би фоновий потік (без закриття зʼєднань тесту)
+        fn, (render,) = submitted[0]
+        self.assertIs(fn, images._run_and_close)
+        render()
+        post.refresh_from_db()
+        self.assertEqual(post.image_variants['source'], post.image.name)
+
+    def test_feed_and_detail_return_srcset(self):
+        """Test that both payloads carry absolute URLs for each variant"""
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(title='Photo', content='Text', dorm_number=3, image=self.make_image())
+
+        feed_post = self.client.get('/api/posts/').data['results'][0]
+        self.assertTrue(feed_post['image_srcset']['small']['webp'].endswith('.small.webp'))
+        self.assertTrue(feed_post['image_srcset']['medium']['jpeg'].startswith('http'))
+
+        detail = self.client.get(f'/api/posts/{post.id}/').data[0]
+        self.assertEqual(detail['image_srcset'], feed_post['image_srcset'])
+
+    def test_posts_without_image_have_no_srcset(self):
+        """Test that posts without images are left alone"""
+        Post.objects.create(title='Text only', content='Text', dorm_number=3)
+        self.assertIsNone(self.client.get('/api/posts/').data['results'][0]['image_srcset'])
+
+    def test_same_stem_images_do_not_share_derivatives(self):
+        """Test that photo.jpg and photo.png keep separate files"""
+        buffer = BytesIO()
+        Image.new('RGB', (120, 80), (10, 200, 10)).save(buffer, 'JPEG')
+        with self.captureOnCommitCallbacks(execute=True):
+            jpeg = Post.objects.create(title='JPEG', content='Text', dorm_number=3,
+                                       image=SimpleUploadedFile('photo.jpg', buffer.getvalue()))
+            png = Post.objects.create(title='PNG', content='Text', dorm_number=3, image=self.make_image())
+        jpeg.refresh_from_db()
+        png.refresh_from_db()
+        self.assertFalse(images.derivative_files(jpeg.image_variants) & images.derivative_files(png.image_variants))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            jpeg.delete()
+        for name in images.derivative_files(png.image_variants):
+            self.assertTrue(png.image.storage.exists(name))
+
+    def test_replacing_image_with_same_name_keeps_new_files(self):
+        """Test that re-uploading under the same name does not delete the new renditions"""
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(title='Photo', content='Text', dorm_number=3, image=self.make_image())
+        post.refresh_from_db()
+        name = post.image.name
+        post.image.storage.delete(name)
+        post.image = self.make_image(size=(300, 150))
+        post.image.name = os.path.basename(name)
+        with self.captureOnCommitCallbacks(execute=True):
+            post.save()
+        post.refresh_from_db()
+
+        self.assertEqual(post.image.name, name)
+        self.assertEqual(post.image_variants['original']['width'], 300)
+        for stored in images.derivative_files(post.image_variants):
+            self.assertTrue(post.image.storage.exists(stored))
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=1000)
+    def test_oversized_images_are_rejected(self):
+        """Test that uploads over the pixel limit get 400 and are never decoded"""
+        response = self.client.post('/api/posts/', {'title': 'Bomb', 'content': 'Text', 'image': self.make_image()})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Post.objects.exists())
+
+        post = Post.objects.create(title='Old', content='Text', dorm_number=3, image=self.make_image())
+        with self.assertRaises(images.ImageRejected):
+            images.render_derivatives(post.image.name)
+
+    def test_backfill_command(self):
+        """Test that the backfill renders existing posts in worker processes"""
+        post = Post.objects.create(title='Photo', content='Text', dorm_number=3, image=self.make_image(mode='RGB'))
+        self.assertEqual(Post.objects.get(pk=post.pk).image_variants, {})
+
+        call_command('generate_image_derivatives', workers=1, stdout=StringIO())
+        variants = Post.objects.get(pk=post.pk).image_variants
+        self.assertEqual(variants['source'], post.image.name)
+        self.assertTrue(post.image.storage.exists(variants['small']['jpeg']))
+
+    def test_backfill_reports_failed_files(self):
+        """Test that a worker error is reported per post and the rest still render"""
+        missing = Post.objects.create(title='Lost', content='Text', dorm_number=3, image='posts/missing.png')
+        post = Post.objects.create(title='Photo', content='Text', dorm_number=3, image=self.make_image(mode='RGB'))
+
+        out = StringIO()
+        call_command('generate_image_derivatives', workers=1, batch_size=1, stdout=out)
+        self.assertIn(f'Post {missing.pk}:', out.getvalue())
+        self.assertIn('for 1 posts', out.getvalue())
+        self.assertIn('(1 failed)', out.getvalue())
+        self.assertEqual(Post.objects.get(pk=post.pk).image_variants['source'], post.image.name)
+
+    def test_worker_pool_forks_with_connections_closed(self):
+        """Test that every worker is started right after the connections are closed"""
+        started = []
+        with mock.patch('api.workers.connections') as connections_:
+            connections_.close_all.side_effect = lambda: started.append('closed')
+            pool = workers.worker_pool(2)
+        self.addCleanup(pool.shutdown)
+        # Повертається вже з усіма воркерами: подальші запити батька їм не дістануться
+        self.assertEqual(started, ['closed'])
+        self.assertEqual(len(pool._processes), 2)
+
+
+@override_settings(ID_PHOTO_MAX_SIDE=400, ID_PHOTO_THUMB_SIDE=64)
+class StudentIdPhotoTest(StudentTestCase):
+    """Test cases for shrinking student ID photos on ingest"""
+
+    def setUp(self):
+        """Use a temporary MEDIA_ROOT; the student has no photo yet"""
+        super().setUp()
+        self.media_root = self.temporary_dir('MEDIA_ROOT')
+
+    def make_jpeg(self, size=(1200, 800), name='id.jpg'):
+        image = Image.new('RGB', size, (30, 120, 200))
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: повернути на 90°
+        exif[0x010F] = 'PhoneMaker'
+        buffer = BytesIO()
+        image.save(buffer, 'JPEG', exif=exif)
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+    def test_upload_is_downscaled_to_webp_without_metadata(self):
+        """Test that the stored photo is rotated, fitted, stripped and WebP"""
+        upload = self.make_jpeg()
+        self.profile.student_id_photo = upload
+        self.profile.save()
+
+        photo = StudentProfile.objects.get(pk=self.profile.pk).student_id_photo
+        self.assertTrue(photo.name.startswith('student_ids/id'))
+        self.assertTrue(photo.name.endswith('.webp'))
+        with photo.storage.open(photo.name) as fh:
+            stored = Image.open(fh)
+            self.assertEqual(stored.format, 'WEBP')
+            self.assertEqual(stored.size, (267, 400))
+            self.assertFalse(stored.getexif())
+        self.assertLess(photo.size, upload.size)
+
+        with photo.storage.open(images.id_photo_thumbnail_name(photo.name)) as fh:
+            self.assertEqual(max(Image.open(fh).size), 64)
+
+    @override_settings(ID_PHOTO_MAX_PIXELS=10_000)
+    def test_oversized_image_is_rejected_before_decoding(self):
+        """Test that the pixel limit is enforced from the header"""
+        self.profile.student_id_photo = self.make_jpeg(size=(200, 100))
+        with self.assertRaises(ValidationError):
+            self.profile.full_clean()
+        with mock.patch.object(Image.Image, 'load') as load, self.assertRaises(ValidationError):
+            self.profile.save()
+        load.assert_not_called()
+
+    def test_non_image_is_rejected(self):
+        """Test that arbitrary bytes never reach storage"""
+        self.profile.student_id_photo = SimpleUploadedFile('id.jpg', b'not an image')
+        with self.assertRaises(ValidationError):
+            self.profile.save()
+        self.assertEqual(os.listdir(self.media_root), [])
+
+    def test_admin_inline_shows_thumbnail(self):
+        """Test that the inline links the full photo and shows the thumbnail"""
+        self.profile.student_id_photo = self.make_jpeg()
+        self.profile.save()
+        inline = StudentProfileInline(User, admin.site)
+        html = inline.photo_thumbnail(self.profile)
+        self.assertIn(images.id_photo_thumbnail_name(self.profile.student_id_photo.name), html)
+        self.assertIn(self.profile.student_id_photo.url, html)
+
+    def test_shrink_command_converts_existing_photos(self):
+        """Test that photos stored before ingest processing get shrunk"""
+        legacy = default_storage.save('student_ids/legacy.jpg', self.make_jpeg())
+        StudentProfile.objects.filter(pk=self.profile.pk).update(student_id_photo=legacy)
+
+        call_command('shrink_id_photos', workers=1, stdout=StringIO())
+        photo = StudentProfile.objects.get(pk=self.profile.pk).student_id_photo
+        self.assertEqual(photo.name, 'student_ids/legacy.webp')
+        self.assertFalse(default_storage.exists(legacy))
+        self.assertTrue(default_storage.exists('student_ids/legacy.thumb.webp'))
+
+
+class BulkPostCreateTest(StudentTestCase):
+    """Test cases for creating many posts in one request"""
+    username = 'admin3'
+
+    def setUp(self):
+        """Create a category"""
+        super().setUp()
+        self.category = Category.objects.create(name='Розклад')
+
+    def schedule(self, count=3):
+        return [
+            {'title': f'Прибирання, день {i}', 'content': 'Поверхи 1-3', 'category': self.category.pk}
+            for i in range(count)
+        ]
+
+    def test_batch_is_inserted_with_one_insert_and_one_invalidation(self):
+        """Test that a valid batch costs one INSERT and one cache bump"""
+        with mock.patch('api.feed_cache.invalidate_dorm') as invalidate, \
+                self.assertNumQueries(5):
+            # категорії, SAVEPOINT, INSERT постів, INSERT журналу змін, RELEASE
+            response = self.client.post('/api/posts/bulk/', {'posts': self.schedule()}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 3)
+        invalidate.assert_called_once_with(3)
+
+        ids = [item['id'] for item in response.data['results']]
+        posts = Post.objects.in_bulk(ids)
+        self.assertEqual([posts[pk].title for pk in ids], [item['title'] for item in self.schedule()])
+        self.assertEqual({(p.dorm_number, p.author_id, p.category_id) for p in posts.values()},
+                         {(3, self.user.pk, self.category.pk)})
+        self.assertEqual(posts[ids[0]].slug, 'прибирання-день-0')
+
+    def test_atomic_mode_rejects_whole_batch(self):
+        """Test that one invalid item keeps the whole batch out"""
+        items = self.schedule() + [{'title': '', 'content': 'Без заголовка'}]
+        response = self.client.post('/api/posts/bulk/', items, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Post.objects.count(), 0)
+        self.assertEqual([item['status'] for item in response.data['results']],
+                         ['skipped', 'skipped', 'skipped', 'error'])
+        self.assertIn('title', response.data['results'][3]['errors'])
+
+    def test_best_effort_mode_inserts_valid_items(self):
+        """Test that best-effort mode reports per-item results"""
+        items = self.schedule(2) + [{'title': 'Невідома категорія', 'content': 'Текст', 'category': 9999}]
+        response = self.client.post('/api/posts/bulk/', {'mode': 'best_effort', 'posts': items}, format='json')
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual((response.data['created'], response.data['failed']), (2, 1))
+        self.assertEqual(response.data['results'][2]['status'], 'error')
+        self.assertIn('category', response.data['results'][2]['errors'])
+        self.assertEqual(Post.objects.count(), 2)
+
+    def test_new_posts_appear_in_feed_and_change_log(self):
+        """Test that the cached feed and the delta sync see the batch"""
+        self.assertEqual(self.client.get('/api/posts/').data['results'], [])
+        self.client.post('/api/posts/bulk/', self.schedule(2), format='json')
+
+        self.assertEqual(len(self.client.get('/api/posts/').data['results']), 2)
+        self.assertEqual(len(self.client.get('/api/posts/changes/').data['changed']), 2)
+
+    def test_limits(self):
+        """Test that empty, oversized and unknown-mode batches are refused"""
+        self.assertEqual(self.client.post('/api/posts/bulk/', [], format='json').status_code, 400)
+        too_many = self.schedule(101)
+        self.assertEqual(self.client.post('/api/posts/bulk/', too_many, format='json').status_code, 400)
+        response = self.client.post('/api/posts/bulk/', {'mode': 'fast', 'posts': self.schedule(1)}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class SeedDataTest(TestCase):
+    """Test cases for the seed_data command"""
+
+    def seed(self, **options):
+        options = {'users': 30, 'posts': 120, 'dorms': 3, 'seed': 7, 'batch_size': 50, **options}
+        call_command('seed_data', stdout=StringIO(), **options)
+
+    def snapshot(self):
+        return list(Post.objects.order_by('id').values_list('title', 'content', 'dorm_number', 'pinned'))
+
+    def test_scale_mode_creates_requested_rows(self):
+        """Test that scale mode creates users, profiles and dorm-consistent posts"""
+        self.seed()
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(StudentProfile.objects.count(), 30)
+        self.assertEqual(Post.objects.count(), 120)
+        self.assertEqual(set(StudentProfile.objects.values_list('dorm_number', flat=True)), {1, 2, 3})
+
+        mismatched = Post.objects.exclude(dorm_number=models.F('author__profile__dorm_number'))
+        self.assertFalse(mismatched.exists())
+        self.assertGreater(Post.objects.values('created_at').distinct().count(), 100)
+        self.assertEqual(PostChange.objects.count(), 120)
+
+    def test_users_share_one_valid_password_hash(self):
+        """Test that synthetic users can log in with the shared password"""
+        self.seed(posts=0)
+        self.assertEqual(User.objects.values('password').distinct().count(), 1)
+        self.assertTrue(User.objects.first().check_password('password123'))
+
+    def test_output_is_deterministic(self):
+        """Test that the same seed gives the same rows regardless of batching"""
+        self.seed()
+        first = self.snapshot()
+        self.assertTrue(any('гуртожит' in content or 'кімнат' in content for _, content, _, _ in first))
+
+        call_command('seed_data', clear=True, users=30, posts=120, dorms=3, seed=7, batch_size=17,
+                     workers=2, stdout=StringIO())
+        self.assertEqual(self.snapshot(), first)
+
+        call_command('seed_data', clear=True, users=30, posts=120, dorms=3, seed=8, stdout=StringIO())
+        self.assertNotEqual(self.snapshot(), first)
+
+    def test_existing_synthetic_users_are_reported(self):
+        """Test that re-running without --clear fails instead of half-inserting"""
+        self.seed(posts=0)
+        with self.assertRaises(CommandError):
+            self.seed(posts=0)
+
+    def test_demo_mode(self):
+        """Test that running without scale options seeds the demo data"""
+        call_command('seed_data', stdout=StringIO())
+        self.assertTrue(User.objects.filter(username='admin', is_superuser=True).exists())
+        self.assertEqual(Post.objects.count(), 10)
+
+
+class SnapshotFeedTest(SnapshotTestMixin, TestCase):
+    """Test cases that start from a prebuilt seeded snapshot"""
+
+    snapshot_params = {'users': 40, 'posts': 400, 'dorms': 4, 'seed': 3}
+
+    def test_snapshot_data_is_present(self):
+        """Test that the class starts with the seeded rows"""
+        self.assertEqual(User.objects.count(), 40)
+        self.assertEqual(Post.objects.count(), 400)
+        if snapshots.supported():
+            self.assertTrue(os.path.exists(self.snapshot_file))
+
+    def test_feed_and_search_work_on_snapshot(self):
+        """Test that the FTS index and change log come with the snapshot"""
+        profile = StudentProfile.objects.select_related('user').filter(dorm_number=2).first()
+        client = APIClient()
+        client.force_authenticate(user=profile.user)
+
+        feed = client.get('/api/posts/?page_size=5').data
+        self.assertEqual(len(feed['results']), 5)
+        self.assertIsNotNone(feed['next'])
+        self.assertEqual(client.get('/api/posts/search/', {'q': 'гуртожит'}).status_code, 200)
+        self.assertTrue(client.get('/api/posts/changes/').data['changed'])
+
+    @skipUnless(snapshots.supported(), 'snapshot files are SQLite databases')
+    def test_snapshot_name_tracks_migrations(self):
+        """Test that a migration change selects a different snapshot file"""
+        path = snapshot_path('tests', **self.snapshot_params)
+        self.assertEqual(path, self.snapshot_file)
+        with mock.patch('api.snapshots.migration_state', return_value='0' * 12):
+            self.assertNotEqual(snapshot_path('tests', **self.snapshot_params), path)
+
+
+class BenchmarkBaselineTest(TestCase):
+    """Test cases for comparing endpoint benchmark runs with a baseline"""
+
+    def setUp(self):
+        """Write a baseline with one endpoint"""
+        self.result = {'count': 100, 'p50_ms': 10.0, 'p95_ms': 20.0, 'p99_ms': 30.0, 'queries_mean': 2.0}
+        fd, self.path = tempfile.mkstemp(suffix='.json')
+        self.addCleanup(os.remove, self.path)
+        with os.fdopen(fd, 'w') as fh:
+            json.dump({'results': {'feed': self.result}}, fh)
+        self.command = BenchEndpointsCommand(stdout=StringIO())
+
+    def test_within_threshold_passes(self):
+        """Test that small changes are not reported"""
+        current = {**self.result, 'p95_ms': 23.0}
+        self.command.compare({'feed': current}, self.path, threshold=0.2)
+
+    def test_slower_percentile_fails(self):
+        """Test that a percentile over the threshold is a regression"""
+        current = {**self.result, 'p99_ms': 40.0}
+        with self.assertRaisesMessage(CommandError, 'feed p99_ms'):
+            self.command.compare({'feed': current}, self.path, threshold=0.2)
+
+    def test_extra_queries_fail(self):
+        """Test that any growth in queries per request is a regression"""
+        current = {**self.result, 'queries_mean': 3.0}
+        with self.assertRaisesMessage(CommandError, 'feed queries'):
+            self.command.compare({'feed': current}, self.path, threshold=0.2)
+
+
+class FastPostSerializerTest(TestCase):
+    """Test cases for the compiled read-only PostSerializer"""
+
+    def setUp(self):
+        """Create posts covering empty and filled optional fields"""
+        self.author = User.objects.create_user(username='author', password='testpass123', email='a@example.com')
+        self.staff = User.objects.create_user(username='staff', password='testpass123', is_staff=True)
+        self.category = Category.objects.create(name='Оголошення')
+        Post.objects.create(title='Перший', content='Текст', author=self.author, category=self.category,
+                            attachment='attachments/rules.pdf', published_at=timezone.now())
+        Post.objects.create(title='Другий', content='Текст', author=self.staff, pinned=True)
+        Post.objects.create(title='Без автора', content='Текст', is_published=False)
+        self.posts = list(Post.objects.select_related('author', 'category').order_by('id'))
+        self.request = RequestFactory().get('/api/posts/')
+
+    def assertSameOutput(self, context):
+        expected = PostSerializer(self.posts, many=True, context=context).data
+        actual = FastPostSerializer(self.posts, many=True, context=context).data
+        self.assertEqual(actual, expected)
+        self.assertEqual([list(item) for item in actual], [list(item) for item in expected])
+        for got, want in zip(actual, expected):
+            self.assertEqual(list(got['author'] or {}), list(want['author'] or {}))
+
+    def test_list_output_matches_drf(self):
+        """Test identical output with and without a request"""
+        self.assertSameOutput({'request': self.request})
+        self.assertSameOutput({})
+
+    def test_output_matches_in_other_time_zone(self):
+        """Test that datetimes use the active time zone like DRF"""
+        with timezone.override('Europe/Kyiv'):
+            self.assertSameOutput({'request': self.request})
+            self.assertIn('+0', FastPostSerializer(self.posts[0]).data['created_at'])
+
+    def test_single_instance_matches_drf(self):
+        """Test the non-list path and unsaved posts"""
+        for post in self.posts + [Post(title='Новий', content='Текст')]:
+            context = {'request': self.request}
+            self.assertEqual(FastPostSerializer(post, context=context).data, PostSerializer(post, context=context).data)
+
+    def test_is_read_only(self):
+        """Test that the fast serializer refuses to save"""
+        serializer = FastPostSerializer(data={'title': 'Новий', 'content': 'Текст'})
+        self.assertTrue(serializer.is_valid())
+        self.assertEqual(serializer.validated_data, {})
+        self.assertTrue(all(field.read_only for field in serializer.fields.values()))
+        with self.assertRaises(AssertionError):
+            serializer.save()
+
+
+@override_settings(REQUEST_TIMING_SAMPLE_RATE=0)
+class RequestTimingTest(StudentTestCase):
+    """Test cases for the Server-Timing middleware"""
+
+    def setUp(self):
+        """Create a couple of posts"""
+        super().setUp()
+        self.make_posts(2)
+        cache.clear()
+
+    def timings(self, response):
+        entries = {}
+        for entry in response['Server-Timing'].split(', '):
+            name, *params = entry.split(';')
+            entries[name] = dict(param.split('=', 1) for param in params)
+        return entries
+
+    def test_feed_reports_db_serialize_render_and_total(self):
+        """Test that the header is set without DEBUG and counts queries"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/posts/')
+        entries = self.timings(response)
+
+        self.assertEqual(set(entries), {'db', 'serialize', 'render', 'total'})
+        self.assertEqual(entries['db']['desc'], f'"{len(queries)} queries"')
+        self.assertGreaterEqual(float(entries['total']['dur']), float(entries['serialize']['dur']))
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=1)
+    def test_sampled_requests_are_logged_as_json(self):
+        """Test the structured log line"""
+        with self.assertLogs('api.timing', level='INFO') as logs:
+            self.client.get('/api/posts/')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(logs.records[0].levelname, 'INFO')
+        self.assertEqual((record['path'], record['status']), ('/api/posts/', 200))
+        self.assertIn('queries', record)
+
+    @override_settings(REQUEST_TIMING_SLOW_MS=0)
+    def test_slow_requests_are_logged_with_sql(self):
+        """Test that requests over the threshold log their slowest SQL"""
+        with self.assertLogs('api.timing', level='WARNING') as logs:
+            self.client.get('/api/posts/')
+        record = logs.records[0].timing
+        self.assertTrue(record['slow'])
+        self.assertTrue(any('api_post' in query['sql'] for query in record['slowest_queries']))
+
+    def test_repeated_queries_are_logged_as_n_plus_one(self):
+        """Test that the same SQL issued per item is reported"""
+        def view(request):
+            for post in Post.objects.all():
+                Post.objects.filter(pk=post.pk).exists()
+            return HttpResponse('ok')
+
+        middleware = RequestTimingMiddleware(view)
+        Post.objects.bulk_create([Post(title=f'Extra {i}', content='Text', dorm_number=3) for i in range(4)])
+        with self.assertLogs('api.timing', level='WARNING') as logs:
+            response = middleware(RequestFactory().get('/n-plus-one/'))
+
+        record = logs.records[0].timing
+        self.assertFalse(record['slow'])
+        self.assertEqual(record['duplicate_queries'][0]['count'], 6)
+        self.assertIn('LIMIT 1', record['duplicate_queries'][0]['sql'])
+        self.assertIn('7 queries', response['Server-Timing'])
+
+    @override_settings(ROOT_URLCONF='myproject.urls_async')
+    async def test_async_views_count_queries(self):
+        """Test that queries run via sync_to_async are attributed to the request"""
+        response = await AsyncClient().post(
+            '/api/auth/login/', {'username': 'nobody', 'password': 'x'}, content_type='application/json'
+        )
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertNotIn('"0 queries"', response['Server-Timing'])
+
+
+class MetricsTest(StudentTestCase):
+    """Test cases for the Prometheus /metrics endpoint"""
+
+    def setUp(self):
+        """Point the metric files at a fresh directory"""
+        super().setUp()
+        self.directory = self.temporary_dir('METRICS_DIR')
+        Post.objects.create(title='Post', content='Text', dorm_number=3)
+        cache.clear()
+
+    def scrape(self):
+        staff = User.objects.create_user(username=f'staff{User.objects.count()}', password='testpass123', is_staff=True)
+        scraper = APIClient()
+        scraper.force_login(staff)
+        response = scraper.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return response.content.decode()
+
+    def test_request_latency_status_queries_and_cache(self):
+        """Test the per-view series recorded by the middleware"""
+        self.client.get('/api/posts/')
+        self.client.get('/api/posts/')
+        self.client.get('/api/posts/999999/')
+        body = self.scrape()
+
+        self.assertIn('http_request_duration_seconds_count{view="manage_posts"} 2.0', body)
+        self.assertIn('http_request_duration_seconds_bucket{view="manage_posts",le="+Inf"} 2.0', body)
+        self.assertIn('http_responses_total{status="200",view="manage_posts"} 2.0', body)
+        self.assertIn('http_responses_total{status="404",view="get_post_detail"} 1.0', body)
+        self.assertRegex(body, r'http_request_db_queries_total\{view="manage_posts"\} [1-9]')
+        self.assertIn('feed_cache_requests_total{result="hit"} 1.0', body)
+        self.assertIn('feed_cache_requests_total{result="miss"} 1.0', body)
+        self.assertIn('feed_cache_hit_ratio 0.5', body)
+
+    def test_upload_size_histogram(self):
+        """Test that multipart bodies are measured"""
+        self.client.post('/api/posts/', {'title': 'Upload', 'content': 'Text'}, format='multipart')
+        body = self.scrape()
+        self.assertIn('http_upload_size_bytes_count{view="manage_posts"} 1.0', body)
+        self.assertIn('http_upload_size_bytes_bucket{view="manage_posts",le="16384.0"} 1.0', body)
+
+    def test_values_from_other_processes_are_summed(self):
+        """Test aggregation across worker processes through the shared directory"""
+        metrics.inc('feed_cache_requests_total', result='hit')
+        pid = os.fork()
+        if pid == 0:
+            try:
+                metrics.inc('feed_cache_requests_total', 2, result='hit')
+                metrics.gauge_add('http_requests_in_flight', 5)
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+        metrics.gauge_add('http_requests_in_flight', 1)
+
+        totals = metrics.collect()
+        self.assertEqual(totals[('feed_cache_requests_total', (('result', 'hit'),))], 3.0)
+        # Gauge процесу, що завершився, не враховується
+        self.assertEqual(totals[('http_requests_in_flight', ())], 1.0)
+
+    def test_value_file_grows_and_reopens(self):
+        """Test that a store keeps its values past the initial file size"""
+        path = os.path.join(self.directory, 'counter_1.db')
+        values = metrics.ValueFile(path)
+        for i in range(3000):
+            values.add(f'series_{i:04d}_' + 'x' * 20, i)
+        values.close()
+
+        reopened = metrics.ValueFile(path)
+        reopened.add('series_2999_' + 'x' * 20, 1)
+        reopened.close()
+        read = dict(metrics.read_file(path))
+        self.assertEqual(len(read), 3000)
+        self.assertEqual(read['series_2999_' + 'x' * 20], 3000.0)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token_required_when_configured(self):
+        """Test the optional bearer token"""
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        response = self.client.get('/metrics', headers={'Authorization': 'Bearer secret'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_series_key_is_encoded_once(self):
+        """Test that repeated samples reuse the encoded key of their series"""
+        metrics._encoded_key.cache_clear()
+        with mock.patch('json.dumps', wraps=json.dumps) as dumps:
+            for _ in range(3):
+                metrics.inc('http_responses_total', view='feed', status='200')
+        self.assertEqual(dumps.call_count, 1)
+        self.assertEqual(metrics._key('x', {'a': '1', 'b': '2'}), metrics._key('x', {'b': '2', 'a': '1'}))
+
+    def test_staff_only_by_default(self):
+        """Test that students and anonymous clients cannot scrape"""
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertIn('http_responses_total', self.scrape())
+        with override_settings(METRICS_PUBLIC=True):
+            self.assertEqual(APIClient().get('/metrics').status_code, 200)
+
+    def test_default_directory_is_removed_by_its_owner(self):
+        """Test the exit hook of the per-process temporary directory"""
+        directory = tempfile.mkdtemp(prefix='gurtaki-metrics-')
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        metrics._remove_default_dir(directory, os.getpid() + 1)
+        self.assertTrue(os.path.isdir(directory))
+        metrics._remove_default_dir(directory, os.getpid())
+        self.assertFalse(os.path.exists(directory))
+
+
+class ProfilingTest(StudentTestCase):
+    """Test cases for on-demand request profiling"""
+
+    def setUp(self):
+        """Keep profiles in a temporary directory"""
+        super().setUp()
+        self.directory = self.temporary_dir('PROFILING_DIR')
+        self.post = Post.objects.create(title='Post', content='Text', dorm_number=3)
+        cache.clear()
+        profiling._rules['checked'] = None
+
+    def test_signed_header_profiles_one_request(self):
+        """Test cProfile via X-Profile and the stored collapsed stacks"""
+        response = self.client.get('/api/posts/', headers={'X-Profile': profiling.make_token('cprofile')})
+        self.assertEqual(response.status_code, 200)
+
+        profile = profiling.load_profile(response['X-Profile-Id'])
+        self.assertEqual((profile['view'], profile['mode'], profile['trigger']), ('manage_posts', 'cprofile', 'header'))
+        self.assertEqual(profile['user'], 'student')
+        self.assertIn('manage_posts (api/views.py:', profile['collapsed'])
+        self.assertRegex(profile['collapsed'].splitlines()[0], r'^\S.* \d+$')
+        self.assertIn('cumulative', profile['stats'])
+
+    def test_requests_without_valid_header_are_not_profiled(self):
+        """Test that forged or missing tokens do nothing"""
+        self.assertNotIn('X-Profile-Id', self.client.get('/api/posts/'))
+        forged = self.client.get('/api/posts/', headers={'X-Profile': 'cprofile'})
+        self.assertNotIn('X-Profile-Id', forged)
+        self.assertEqual(profiling.list_profiles(), [])
+
+    @override_settings(PROFILING_SAMPLE_INTERVAL=0.001)
+    def test_sampling_mode_records_the_request_stack(self):
+        """Test the stack sampler on a slow view"""
+        def slow_view(request):
+            time.sleep(0.05)
+            return HttpResponse('ok')
+
+        middleware = profiling.ProfilingMiddleware(lambda request: HttpResponse())
+        request = RequestFactory().get('/slow/', HTTP_X_PROFILE=profiling.make_token('sample'))
+        response = middleware.process_view(request, slow_view, (), {})
+
+        profile = profiling.load_profile(response['X-Profile-Id'])
+        self.assertEqual(profile['unit'], 'samples')
+        top_stack, count = profile['collapsed'].splitlines()[0].rsplit(' ', 1)
+        self.assertTrue(top_stack.endswith('slow_view (api/tests.py:{})'.format(slow_view.__code__.co_firstlineno)))
+        self.assertGreater(int(count), 5)
+
+    @override_settings(ROOT_URLCONF='myproject.urls_async', DEBUG=True)
+    def test_asgi_handler_does_not_adapt_middleware(self):
+        """Test that under ASGI neither the middleware nor process_view goes through sync_to_async"""
+        with self.assertLogs('django.request', 'DEBUG') as logs:
+            handler = ASGIHandler()
+            logging.getLogger('django.request').debug('handler built')
+        self.assertFalse([line for line in logs.output if 'api.profiling' in line])
+        view_middleware = [method for method in handler._view_middleware
+                           if isinstance(getattr(method, '__self__', None), profiling.ProfilingMiddleware)]
+        self.assertEqual(len(view_middleware), 1)
+        self.assertTrue(iscoroutinefunction(view_middleware[0]))
+
+    @override_settings(ROOT_URLCONF='myproject.urls_async')
+    async def test_asgi_request_is_profiled(self):
+        """Test that a sync view served under ASGI is still profiled on request"""
+        auth = f'Token {await sync_to_async(issue_token)(self.user, self.profile)}'
+        client = AsyncClient()
+        response = await client.get('/api/posts/', headers={'Authorization': auth})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile-Id', response)
+
+        response = await client.get('/api/posts/', headers={'Authorization': auth,
+                                                            'X-Profile': profiling.make_token('cprofile')})
+        profile = profiling.load_profile(response['X-Profile-Id'])
+        self.assertEqual((profile['view'], profile['trigger']), ('manage_posts', 'header'))
+
+    def test_admin_rule_profiles_matching_view(self):
+        """Test that an enabled rule samples its view only"""
+        with self.captureOnCommitCallbacks(execute=True):
+            ProfilingRule.objects.create(view='get_post_detail', mode='cprofile', sample_rate=1.0)
+
+        self.client.get('/api/posts/')
+        # Правила читаються з кешу - кешована стрічка й далі без запитів
+        with self.assertNumQueries(0):
+            self.client.get('/api/posts/')
+        self.assertEqual(profiling.list_profiles(), [])
+        response = self.client.get(f'/api/posts/{self.post.pk}/')
+        profile = profiling.load_profile(response['X-Profile-Id'])
+        self.assertEqual((profile['view'], profile['trigger']), ('get_post_detail', 'rule'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProfilingRule.objects.update(enabled=False)
+            ProfilingRule.objects.first().save()
+        self.assertNotIn('X-Profile-Id', self.client.get(f'/api/posts/{self.post.pk}/'))
+
+    @override_settings(PROFILING_MAX_PROFILES=3)
+    def test_ring_buffer_keeps_newest_profiles(self):
+        """Test that old profiles are dropped"""
+        ids = [profiling.save_profile({'n': i, 'collapsed': ''}) for i in range(5)]
+        self.assertEqual([profile['id'] for profile in profiling.list_profiles()], ids[:1:-1])
+
+    def test_collapse_stats_rebuilds_call_paths(self):
+        """Test collapsed stacks derived from cProfile edges"""
+        def leaf():
+            return sum(range(20000))
+
+        def branch():
+            return leaf() + leaf()
+
+        profiler = cProfile.Profile()
+        profiler.runcall(branch)
+        lines = profiling.collapse_stats(pstats.Stats(profiler)).splitlines()
+        self.assertTrue(any('branch (' in line and ';leaf (' in line for line in lines))
+
+    def test_admin_lists_and_renders_profiles(self):
+        """Test the admin pages for stored profiles"""
+        admin_user = User.objects.create_superuser(username='admin', password='adminpass123')
+        profile_id = self.client.get('/api/posts/', headers={'X-Profile': profiling.make_token('cprofile')})['X-Profile-Id']
+        client = APIClient()
+        client.force_login(admin_user)
+
+        listing = client.get('/admin/api/profilingrule/profiles/')
+        self.assertContains(listing, profile_id)
+        self.assertContains(listing, 'X-Profile: ')
+        self.assertContains(client.get(f'/admin/api/profilingrule/profiles/{profile_id}/'), 'manage_posts (api/views.py:')
+        collapsed = client.get(f'/admin/api/profilingrule/profiles/{profile_id}/collapsed.txt')
+        self.assertEqual(collapsed['Content-Type'], 'text/plain; charset=utf-8')
+        self.assertEqual(client.get('/admin/api/profilingrule/profiles/not-an-id/').status_code, 404)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN is SQLite syntax')
+class QueryPlanTest(SnapshotTestMixin, TestCase):
+    """Query plan regression tests: every API read must use an index"""
+
+    def setUp(self):
+        """Authenticate as a seeded student with a real token"""
+        self.profile = StudentProfile.objects.select_related('user').order_by('id').first()
+        self.headers = {'Authorization': f'Token {issue_token(self.profile.user, self.profile)}'}
+        self.client = APIClient()
+        cache.clear()
+
+    def requests(self):
+        first_page = self.client.get('/api/posts/?page_size=5', headers=self.headers).json()
+        post_id = Post.objects.filter(dorm_number=self.profile.dorm_number).values_list('id', flat=True).first()
+        category = Category.objects.create(name='Plans')
+        watermark = self.client.get('/api/posts/changes/?limit=5', headers=self.headers).json()['watermark']
+        return {
+            'feed': lambda: self.client.get('/api/posts/', headers=self.headers),
+            'feed_next': lambda: self.client.get(first_page['next'], headers=self.headers),
+            'detail': lambda: self.client.get(f'/api/posts/{post_id}/', headers=self.headers),
+            'batch': lambda: self.client.get(f'/api/posts/batch/?ids={post_id},{post_id + 1},0', headers=self.headers),
+            'changes': lambda: self.client.get('/api/posts/changes/', headers=self.headers),
+            'changes_since': lambda: self.client.get('/api/posts/changes/', {'since': watermark}, headers=self.headers),
+            'search': lambda: self.client.get('/api/posts/search/', {'q': 'пральна'}, headers=self.headers),
+            'create': lambda: self.client.post('/api/posts/', {'title': 'New', 'content': 'Text'}, headers=self.headers),
+            'bulk': lambda: self.client.post(
+                '/api/posts/bulk/', [{'title': 'Bulk', 'content': 'Text', 'category': category.pk}],
+                format='json', headers=self.headers,
+            ),
+            'login': lambda: self.client.post(
+                '/api/auth/login/', {'username': self.profile.user.username, 'password': 'password123'}, format='json'
+            ),
+            'register': lambda: self.client.post(
+                '/api/auth/register/', {'username': 'plan_user', 'password': 'password123'}, format='json'
+            ),
+        }
+
+    def test_endpoints_do_not_scan_or_sort_large_tables(self):
+        """Test EXPLAIN QUERY PLAN of every statement each endpoint issues"""
+        for name, request in self.requests().items():
+            cache.clear()
+            with self.subTest(endpoint=name):
+                with query_plans.capture_statements() as statements:
+                    response = request()
+                self.assertLess(response.status_code, 400)
+                self.assertTrue(statements)
+                problems = query_plans.plan_problems(statements)
+                self.assertEqual(problems, [], '\n\n'.join(f'{sql}\n  ' + '\n  '.join(plan) for sql, plan in problems))
+
+    def test_checker_reports_scans_and_sorts(self):
+        """Test that the checker flags an unindexed filter and sort"""
+        with query_plans.capture_statements() as statements:
+            list(Post.objects.filter(content__contains='x').order_by('title')[:5])
+        [(sql, plan)] = query_plans.plan_problems(statements)
+        self.assertIn('SCAN api_post', plan[0])
+        self.assertTrue(any(step.startswith('USE TEMP B-TREE') for step in plan))
+
+
+@skipUnless(connection.vendor == 'sqlite', 'SQLite connection settings')
+class SQLiteProfileTest(TestCase):
+    """Test cases for the production SQLite connection settings"""
+
+    def open_connection(self, path):
+        from django.db.backends.sqlite3.base import DatabaseWrapper
+
+        wrapper = DatabaseWrapper({**settings.DATABASES['default'], 'NAME': path}, alias='sqlite_profile')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def setUp(self):
+        """Create a file database with one table"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.path = os.path.join(directory, 'profile.sqlite3')
+        setup = self.open_connection(self.path)
+        with setup.cursor() as cursor:
+            cursor.execute('CREATE TABLE item (id INTEGER PRIMARY KEY, name TEXT)')
+            cursor.execute("INSERT INTO item (name) VALUES ('first')")
+        setup.close()
+
+    def test_pragmas_are_applied_to_new_connections(self):
+        """Test WAL, synchronous, cache, mmap and busy timeout"""
+        wrapper = self.open_connection(self.path)
+        with wrapper.cursor() as cursor:
+            values = {}
+            for name in ('journal_mode', 'synchronous', 'cache_size', 'mmap_size', 'busy_timeout'):
+                cursor.execute(f'PRAGMA {name}')
+                values[name] = cursor.fetchone()[0]
+        self.assertEqual(values, {
+            'journal_mode': 'wal',
+            'synchronous': 1,
+            'cache_size': settings.SQLITE_PRAGMAS['cache_size'],
+            'mmap_size': settings.SQLITE_PRAGMAS['mmap_size'],
+            'busy_timeout': settings.SQLITE_PRAGMAS['busy_timeout'],
+        })
+        self.assertEqual(wrapper.transaction_mode, 'IMMEDIATE')
+
+    def test_reader_is_not_blocked_by_open_write_transaction(self):
+        """Test that a reader sees the last commit while a writer holds the lock"""
+        writer = self.open_connection(self.path)
+        reader = self.open_connection(self.path)
+        writer.ensure_connection()
+        # Маленький кеш змушує записувача скидати сторінки на диск - з rollback
+        # journal це ексклюзивне блокування, і читач чекав би до кінця транзакції
+        writer.connection.execute('PRAGMA cache_size=2')
+        writer.connection.execute('BEGIN IMMEDIATE')
+        writer.connection.executemany('INSERT INTO item (name) VALUES (?)', [('x' * 200,)] * 2000)
+
+        started = time.perf_counter()
+        with reader.cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM item')
+            self.assertEqual(cursor.fetchone()[0], 1)
+        self.assertLess(time.perf_counter() - started, 1)
+        writer.connection.commit()
+
+
+class PostgresSettingsTest(TestCase):
+    """Test cases for the USE_POSTGRESQL switch in settings"""
+
+    def load_settings(self, **env):
+        import importlib
+        import myproject.settings as project_settings
+
+        self.addCleanup(importlib.reload, project_settings)
+        with mock.patch.dict(os.environ, env):
+            return importlib.reload(project_settings)
+
+    def test_switch_selects_pooled_postgres(self):
+        """Test that DB_* variables configure psycopg with a per-worker pool"""
+        loaded = self.load_settings(USE_POSTGRESQL='1', DB_NAME='gurtaki_test', DB_HOST='db', WEB_THREADS='8')
+        database = loaded.DATABASES['default']
+        self.assertEqual(database['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual((database['NAME'], database['HOST'], database['PORT']), ('gurtaki_test', 'db', '5432'))
+        self.assertEqual(database['OPTIONS']['pool']['max_size'], 8)
+        self.assertEqual(database['CONN_MAX_AGE'], 0)
+        self.assertFalse(database['DISABLE_SERVER_SIDE_CURSORS'])
+
+    def test_sqlite_is_the_default(self):
+        """Test that SQLite stays the default"""
+        loaded = self.load_settings(USE_POSTGRESQL='0')
+        self.assertEqual(loaded.DATABASES['default']['ENGINE'], 'django.db.backends.sqlite3')
+
+
+class PostAdminExportTest(TestCase):
+    """Test cases for the streaming CSV export in the post admin"""
+
+    def test_export_streams_selected_posts(self):
+        """Test that the admin action streams one CSV row per selected post"""
+        admin_user = User.objects.create_superuser(username='admin', password='adminpass123')
+        posts = [Post.objects.create(title=f'Post {i}', content='Text', dorm_number=3) for i in range(3)]
+        self.client.force_login(admin_user)
+
+        response = self.client.post('/admin/api/post/', {
+            'action': 'export_csv',
+            '_selected_action': [post.pk for post in posts[:2]],
+        })
+        self.assertTrue(response.streaming)
+        rows = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(rows[0].split(',')[:3], ['id', 'title', 'slug'])
+        self.assertEqual([row.split(',')[1] for row in rows[1:]], ['Post 0', 'Post 1'])
+
+
+class DormTransferTest(TestCase):
+    """Test cases for the gzip NDJSON dorm export and import"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Події')
+        self.student = User.objects.create_user(username='student3', password='testpass123')
+        StudentProfile.objects.create(user=self.student, dorm_number=3, is_approved=True)
+        self.other = User.objects.create_user(username='student4', password='testpass123')
+        StudentProfile.objects.create(user=self.other, dorm_number=4)
+        self.created_at = timezone.now() - timezone.timedelta(days=3, microseconds=123457)
+        self.post = Post.objects.create(title='Кіно в холі', content='Текст', dorm_number=3,
+                                        author=self.student, category=self.category, pinned=True)
+        Post.objects.filter(pk=self.post.pk).update(created_at=self.created_at)
+        Post.objects.create(title='Чужий пост', content='Текст', dorm_number=4, author=self.other)
+
+    def export(self, dorm=3, chunk_size=transfer.DEFAULT_CHUNK_SIZE, include_passwords=False):
+        buffer = BytesIO()
+        rows = transfer.export_dorm(dorm, buffer, chunk_size=chunk_size, include_passwords=include_passwords)
+        buffer.seek(0)
+        return rows, buffer
+
+    def read_lines(self, buffer):
+        return [json.loads(line) for line in gzip.decompress(buffer.getvalue()).splitlines()]
+
+    def test_export_contains_only_the_dorm(self):
+        """Test that the export has a header and the dorm's users, profiles and posts"""
+        rows, buffer = self.export(chunk_size=1)
+        lines = self.read_lines(buffer)
+
+        self.assertEqual(rows, 3)
+        self.assertEqual(lines[0]['format'], transfer.FORMAT)
+        self.assertEqual(lines[0]['dorm'], 3)
+        self.assertEqual([line['model'] for line in lines[1:]], ['user', 'profile', 'post'])
+        self.assertEqual(lines[1]['data']['username'], 'student3')
+        self.assertEqual(lines[3]['data']['category'], 'Події')
+        self.assertNotIn('password', lines[1]['data'])
+
+    def test_export_includes_authors_from_other_dorms(self):
+        """Test that a post written by a non-resident keeps its author through the round trip"""
+        Post.objects.create(title='Від коменданта', content='Текст', dorm_number=3, author=self.other)
+        _, buffer = self.export()
+        users = [line['data']['username'] for line in self.read_lines(buffer) if line.get('model') == 'user']
+        self.assertEqual(users, ['student3', 'student4'])
+        Post.objects.all().delete()
+        User.objects.all().delete()
+
+        counts = transfer.import_dorm(buffer)
+
+        self.assertEqual((counts['users'], counts['profiles'], counts['authors_missing']), (2, 1, 0))
+        post = Post.objects.get(title='Від коменданта')
+        self.assertEqual(post.author.username, 'student4')
+        self.assertFalse(post.author.has_usable_password())
+
+    def test_import_counts_posts_without_exported_author(self):
+        """Test that posts whose author is not in the file are counted and reported"""
+        _, buffer = self.export()
+        lines = [line for line in self.read_lines(buffer) if line.get('model') != 'user']
+        Post.objects.filter(dorm_number=3).delete()
+        path = os.path.join(tempfile.mkdtemp(), 'dorm-3.ndjson.gz')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        with open(path, 'wb') as fh:
+            fh.write(gzip.compress(b''.join(json.dumps(line).encode() + b'\n' for line in lines)))
+
+        out = StringIO()
+        call_command('import_dorm', path, stdout=out)
+        self.assertIn('1 posts reference users missing from the export', out.getvalue())
+        self.assertIsNone(Post.objects.get(title='Кіно в холі').author)
+
+    def test_round_trip_preserves_ids(self):
+        """Test that importing into an empty database keeps IDs, timestamps and references"""
+        _, buffer = self.export(include_passwords=True)
+        post_id, user_id = self.post.pk, self.student.pk
+        Post.objects.all().delete()
+        User.objects.all().delete()
+        Category.objects.all().delete()
+
+        counts = transfer.import_dorm(buffer, batch_size=1)
+
+        self.assertEqual((counts['users'], counts['profiles'], counts['posts'], counts['remapped']), (1, 1, 1, 0))
+        post = Post.objects.select_related('author__profile', 'category').get()
+        self.assertEqual(post.pk, post_id)
+        self.assertEqual(post.author_id, user_id)
+        self.assertEqual(post.author.profile.dorm_number, 3)
+        self.assertEqual(post.category.slug, 'події')
+        self.assertEqual(post.created_at, self.created_at)
+        self.assertTrue(post.pinned)
+        self.assertTrue(post.author.check_password('testpass123'))
+        self.assertTrue(PostChange.objects.filter(post_id=post_id).exists())
+
+    def test_import_remaps_clashing_ids(self):
+        """Test that rows whose IDs are taken get new IDs and references follow them"""
+        _, buffer = self.export()
+        post_id, user_id = self.post.pk, self.student.pk
+        Post.objects.filter(pk=post_id).delete()
+        # Інший користувач з тим самим ID, але іншим username
+        User.objects.filter(pk=user_id).update(username='someone_else')
+
+        counts = transfer.import_dorm(buffer)
+
+        self.assertEqual(counts['users'], 1)
+        self.assertEqual(counts['users_matched'], 0)
+        imported = User.objects.get(username='student3')
+        self.assertNotEqual(imported.pk, user_id)
+        self.assertEqual(imported.profile.dorm_number, 3)
+        post = Post.objects.get(title='Кіно в холі')
+        self.assertEqual(post.pk, post_id)
+        self.assertEqual(post.author_id, imported.pk)
+
+    def test_import_matches_existing_usernames(self):
+        """Test that re-importing an existing dorm reuses accounts and profiles"""
+        _, buffer = self.export()
+
+        counts = transfer.import_dorm(buffer)
+
+        self.assertEqual((counts['users'], counts['users_matched']), (0, 1))
+        self.assertEqual(counts['profiles_skipped'], 1)
+        self.assertEqual(Post.objects.filter(title='Кіно в холі', author=self.student).count(), 2)
+
+    def test_import_rejects_other_files(self):
+        """Test that a file that is not an export leaves the database unchanged"""
+        bad = BytesIO(gzip.compress(b'{"format": "something-else"}\n'))
+        with self.assertRaises(transfer.ImportFormatError):
+            transfer.import_dorm(bad)
+        with self.assertRaises(transfer.ImportFormatError):
+            transfer.import_dorm(BytesIO(b'not gzip'))
+
+    def test_commands_round_trip(self):
+        """Test that export_dorm and import_dorm work through files"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'dorm-3.ndjson.gz')
+        call_command('export_dorm', dorm=3, output=path, stdout=StringIO())
+        Post.objects.filter(dorm_number=3).delete()
+
+        out = StringIO()
+        call_command('import_dorm', path, stdout=out)
+        self.assertIn('posts: 1 created', out.getvalue())
+        self.assertTrue(Post.objects.filter(pk=self.post.pk).exists())
+        with self.assertRaises(CommandError):
+            call_command('import_dorm', os.path.join(directory, 'missing.gz'), stdout=StringIO())
+
+    def test_staff_endpoint_streams_export(self):
+        """Test that staff get the export as a gzip stream and students get 403"""
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {issue_token(self.student, self.student.profile)}')
+        self.assertEqual(client.get('/api/dorms/3/export/').status_code, 403)
+
+        staff = User.objects.create_user(username='warden', password='testpass123', is_staff=True)
+        client.credentials(HTTP_AUTHORIZATION=f'Token {issue_token(staff)}')
+        response = client.get('/api/dorms/3/export/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('dorm-3.ndjson.gz', response['Content-Disposition'])
+        lines = [json.loads(line) for line in gzip.decompress(b''.join(response.streaming_content)).splitlines()]
+        self.assertEqual(len(lines), 4)
+        self.assertNotIn('password', lines[1]['data'])
+
+
+class RendererTest(StudentTestCase):
+    """Test cases for FastJSONRenderer and MessagePack negotiation"""
+
+    def setUp(self):
+        super().setUp()
+        self.make_posts(3, title='Оголошення {i}', content='Текст\u2028з «лапками» — і тире')
+        cache.clear()
+
+    def assertSameAsJSONRenderer(self, data, **kwargs):
+        self.assertEqual(renderers.FastJSONRenderer().render(data, **kwargs), JSONRenderer().render(data, **kwargs))
+
+    def test_output_matches_json_renderer(self):
+        """Test byte-for-byte equality on values where the encoders could disagree"""
+        kyiv = datetime.timezone(datetime.timedelta(hours=3))
+        payloads = [
+            {'created_at': timezone.now(), 'naive': datetime.datetime(2026, 1, 1, 12, 30),
+             'local': datetime.datetime(2026, 7, 1, 9, 0, 0, 5, tzinfo=kyiv),
+             'date': datetime.date(2026, 1, 1), 'time': datetime.time(8, 15), 'delta': datetime.timedelta(minutes=5)},
+            {'text': 'Юнікод \u2028 \u2029 "лапки" \\ \x01 \x7f 😀', 'lazy': lazy(str, str)('ліниво')},
+            {'floats': [0.1, 2.5, -0.0, 1e15, 1e16, 1e-4, 1e-5, 1.5e300, 5e-324, 123456789.125]},
+            {'decimal': decimal.Decimal('1.10'), 'tuple': (1, 2), 'big': 2 ** 70, 'nested': {'a': [None, True, False]}},
+            {1: 'int key'},
+            [], {}, 'text', 1e16, 42,
+        ]
+        for data in payloads:
+            with self.subTest(data=data):
+                self.assertSameAsJSONRenderer(data)
+
+    def test_feed_response_matches_json_renderer(self):
+        """Test that the feed is rendered exactly as DRF's JSONRenderer would"""
+        response = self.client.get('/api/posts/')
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+        self.assertIn(b'\\u2028', response.content)
+
+    def test_indent_and_fallback_without_orjson(self):
+        """Test pretty printing and the stdlib path without orjson"""
+        data = {'created_at': timezone.now(), 'title': 'Пост'}
+        self.assertSameAsJSONRenderer(data, accepted_media_type='application/json; indent=4')
+        with mock.patch('api.renderers.orjson', None):
+            self.assertSameAsJSONRenderer(data)
+
+    def test_unserializable_value_raises_like_json_renderer(self):
+        """Test that unknown types still raise TypeError"""
+        with self.assertRaises(TypeError):
+            renderers.FastJSONRenderer().render({'value': object()})
+
+    def test_feed_varies_on_accept(self):
+        """Test that cached feed responses are keyed by the negotiated format"""
+        response = self.client.get('/api/posts/')
+        self.assertIn('Accept', response['Vary'])
+
+    @skipUnless(renderers.msgpack is not None, 'msgpack is not installed')
+    def test_msgpack_negotiation(self):
+        """Test that Accept: application/msgpack returns the same data as MessagePack"""
+        json_response = self.client.get('/api/posts/')
+        response = self.client.get('/api/posts/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(renderers.msgpack.unpackb(response.content), json.loads(json_response.content))
+        self.assertNotEqual(response['ETag'], json_response['ETag'])
+
+    @skipUnless(renderers.msgpack is None, 'msgpack is installed')
+    def test_msgpack_not_acceptable_without_package(self):
+        """Test that MessagePack is not offered when msgpack is missing"""
+        response = self.client.get('/api/posts/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response.status_code, 406)
+
+
+class PostExcerptTest(TestCase):
+    """Test cases for the stored post excerpt"""
+
+    def test_make_excerpt_strips_markdown_and_truncates(self):
+        """Test that the excerpt is plain text of at most EXCERPT_LENGTH characters"""
+        content = '# Збори\n\n**Важливо**: див. [розклад](https://example.com) ![фото](a.jpg)\n\n- пункт `код`'
+        self.assertEqual(make_excerpt(content), 'Збори Важливо: див. розклад пункт код')
+        long_excerpt = make_excerpt('слово ' * 200)
+        self.assertEqual(len(long_excerpt), EXCERPT_LENGTH)
+        self.assertTrue(long_excerpt.endswith('…'))
+
+    def test_excerpt_is_kept_in_sync_on_every_write(self):
+        """Test save, save(update_fields), update and bulk_create"""
+        post = Post.objects.create(title='Пост', content='Перший текст', dorm_number=1)
+        self.assertEqual(Post.objects.get(pk=post.pk).excerpt, 'Перший текст')
+
+        post.content = 'Другий текст'
+        post.save(update_fields=['content'])
+        self.assertEqual(Post.objects.get(pk=post.pk).excerpt, 'Другий текст')
+
+        Post.objects.filter(pk=post.pk).update(content='Третій текст')
+        self.assertEqual(Post.objects.get(pk=post.pk).excerpt, 'Третій текст')
+
+        Post.objects.bulk_create([Post(title='Пакет', content='Текст пакета', dorm_number=1)])
+        self.assertEqual(Post.objects.get(title='Пакет').excerpt, 'Текст пакета')
+
+    def test_migration_fills_existing_posts(self):
+        """Test that the data migration computes excerpts of old rows"""
+        from django.apps import apps
+
+        post = Post.objects.create(title='Старий', content='Старий текст', dorm_number=1)
+        Post.objects.filter(pk=post.pk).update(excerpt='')
+        migration = importlib.import_module('api.migrations.0010_post_excerpt')
+        migration.fill_excerpts(apps, None)
+        self.assertEqual(Post.objects.get(pk=post.pk).excerpt, 'Старий текст')
+
+
+class SparseFieldsTest(StudentTestCase):
+    """Test cases for ?fields= on the feed and PostSerializer"""
+
+    def setUp(self):
+        super().setUp()
+        self.make_posts(3, title='Пост {i}', content='Довгий текст. ' * 500, author=self.user)
+        cache.clear()
+
+    def test_feed_returns_only_requested_fields(self):
+        """Test that the feed honours ?fields= and never selects content"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/posts/?fields=title,excerpt')
+        self.assertEqual(response.status_code, 200)
+        for item in response.data['results']:
+            self.assertEqual(set(item), {'id', 'title', 'excerpt'})
+            self.assertLessEqual(len(item['excerpt']), EXCERPT_LENGTH)
+        post_queries = [q['sql'] for q in queries.captured_queries if 'FROM "api_post"' in q['sql']]
+        self.assertTrue(post_queries)
+        for sql in post_queries:
+            self.assertNotIn('"api_post"."content"', sql)
+
+    def test_feed_without_fields_has_everything(self):
+        """Test that the default feed keeps content and adds the excerpt"""
+        item = self.client.get('/api/posts/').data['results'][0]
+        self.assertIn('content', item)
+        self.assertIn('excerpt', item)
+        self.assertIn('image_srcset', item)
+
+    def test_feed_cache_and_etag_are_per_fieldset(self):
+        """Test that cached pages of different fieldsets do not mix"""
+        full = self.client.get('/api/posts/')
+        sparse = self.client.get('/api/posts/?fields=title')
+        self.assertNotEqual(full['ETag'], sparse['ETag'])
+        self.assertEqual(set(sparse.data['results'][0]), {'id', 'title'})
+        again = self.client.get('/api/posts/?fields=title')
+        self.assertEqual(again.data['results'], sparse.data['results'])
+
+    def test_unknown_field_is_rejected(self):
+        """Test that a typo in ?fields= is a 400, not a silently empty list"""
+        response = self.client.get('/api/posts/?fields=title,contnet')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('contnet', response.data['detail'])
+
+    def test_serializer_sparse_fields(self):
+        """Test that PostSerializer lists honour ?fields= and keep nested serializers whole"""
+        request = RequestFactory().get('/api/posts/?fields=title,author')
+        posts = list(Post.objects.select_related('author'))
+        data = PostSerializer(posts, many=True, context={'request': request}).data
+        self.assertEqual(set(data[0]), {'id', 'title', 'author'})
+        self.assertEqual(set(data[0]['author']), {'id', 'username', 'email', 'first_name', 'last_name', 'role'})
+        self.assertEqual(FastPostSerializer(posts, many=True, context={'request': request}).data, data)
+
+        single = PostSerializer(posts[0], context={'fields': ['excerpt']}).data
+        self.assertEqual(set(single), {'id', 'excerpt'})
+
+
+class PrefetchSerializerTest(ConstantQueriesTestMixin, TestCase):
+    """Test cases for querysets planned from serializer fields"""
+
+    def make_posts(self, count):
+        Post.objects.all().delete()
+        User.objects.all().delete()
+        category = Category.objects.get_or_create(name='Події')[0]
+        authors = User.objects.bulk_create([User(username=f'author_{i}') for i in range(count)])
+        Post.objects.bulk_create([
+            Post(title=f'Пост {i}', content='Текст', dorm_number=1, author=author, category=category)
+            for i, author in enumerate(authors)
+        ])
+
+    def test_post_list_query_count_is_constant(self):
+        """Test that PostSerializer lists cost one query from 10 to 1000 posts"""
+        def run():
+            return PostSerializer(PostSerializer.setup_queryset(Post.objects.all()), many=True).data
+
+        self.assertEqual(self.assertConstantQueries(self.make_posts, run), 1)
+
+    def test_planned_queryset_gives_the_same_output(self):
+        """Test that the planned queryset serializes exactly like a plain one"""
+        self.make_posts(5)
+        Post.objects.create(title='Без автора', content='Текст', dorm_number=1, attachment='attachments/a.pdf')
+        plain = PostSerializer(Post.objects.all(), many=True).data
+        planned = PostSerializer(PostSerializer.setup_queryset(Post.objects.all()), many=True).data
+        self.assertEqual(planned, plain)
+
+    def test_helper_detects_n_plus_one(self):
+        """Test that the helper fails for a list that queries per row"""
+        def run():
+            return PostSerializer(Post.objects.all(), many=True).data
+
+        with self.assertRaises(AssertionError):
+            self.assertConstantQueries(self.make_posts, run, sizes=(2, 5))
+
+    def test_sparse_fields_narrow_the_query(self):
+        """Test that ?fields= drops joins and columns of unused fields"""
+        request = RequestFactory().get('/api/posts/?fields=title')
+        queryset = PostSerializer.setup_queryset(Post.objects.all(), {'request': request})
+        sql = str(queryset.query)
+        self.assertNotIn('auth_user', sql)
+        self.assertNotIn('"api_post"."content"', sql)
+        self.assertIn('"api_post"."title"', sql)
+
+    def test_reverse_relation_is_prefetched(self):
+        """Test that a many=True nested serializer becomes a planned Prefetch"""
+        class TitleSerializer(serializers.ModelSerializer):
+            class Meta:
+                model = Post
+                fields = ('id', 'title')
+
+        class AuthorWithPostsSerializer(UserSerializer):
+            posts = TitleSerializer(many=True, read_only=True)
+
+            class Meta(UserSerializer.Meta):
+                fields = UserSerializer.Meta.fields + ('posts',)
+
+        def make_authors(count):
+            self.make_posts(count)
+
+        def run():
+            queryset = AuthorWithPostsSerializer.setup_queryset(User.objects.all())
+            return AuthorWithPostsSerializer(queryset, many=True).data
+
+        self.assertEqual(self.assertConstantQueries(make_authors, run, sizes=(10, 200)), 2)
+        self.assertEqual(run()[0]['posts'][0]['title'], 'Пост 0')
+
+
+class PostBatchTest(StudentTestCase):
+    """Test cases for /api/posts/batch/ and the single-query post detail"""
+
+    def setUp(self):
+        super().setUp()
+        # Справжній токен, щоб рахувати й запити автентифікації
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {issue_token(self.user, self.profile)}')
+        self.posts = self.make_posts(3, title='Пост {i}', content='Текст')
+        self.posts[0].image_variants = {'small': {'width': 320, 'height': 240, 'webp': 'posts/a.webp', 'jpeg': 'posts/a.jpg'}}
+        self.posts[0].image = 'posts/a.jpg'
+        self.posts[0].save()
+        self.foreign = Post.objects.create(title='Чужий', content='Текст', dorm_number=4)
+        cache.clear()
+        # Робочий воркер уже тримає копію стану токенів користувача
+        get_token_state(self.user.pk)
+
+    def test_batch_returns_visible_posts_in_one_query(self):
+        """Test that one IN query returns the posts in request order and reports the rest"""
+        ids = [self.posts[2].pk, self.foreign.pk, self.posts[0].pk, 999999, self.posts[2].pk]
+        with self.assertNumQueries(1):
+            response = self.client.get(f"/api/posts/batch/?ids={','.join(map(str, ids))}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['id'] for item in response.data['results']], [self.posts[2].pk, self.posts[0].pk])
+        self.assertEqual(response.data['missing'], [self.foreign.pk, 999999])
+
+        item = response.data['results'][1]
+        self.assertTrue(item['image_url'].endswith('/media/posts/a.jpg'))
+        self.assertTrue(item['image_srcset']['small']['webp'].endswith('/media/posts/a.webp'))
+        self.assertNotIn('image_variants', item)
+        self.assertEqual(item['content'], 'Текст')
+
+    def test_batch_matches_detail_items(self):
+        """Test that batch items have the same shape as the detail view"""
+        detail = self.client.get(f'/api/posts/{self.posts[1].pk}/').data[0]
+        batch = self.client.get(f'/api/posts/batch/?ids={self.posts[1].pk}').data['results'][0]
+        self.assertEqual(batch, detail)
+
+    def test_batch_validates_ids(self):
+        """Test that malformed, empty and oversized id lists are rejected"""
+        too_many = 'ids=' + ','.join(str(i) for i in range(1, 102))
+        bad = ('ids=1,abc', 'ids=', '', too_many, 'ids=99999999999999999999', f'ids={2 ** 63}', 'ids=1_0',
+               'ids=-1', 'ids=%2B1', 'ids=%D9%A1')
+        for query in bad:
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f'/api/posts/batch/?{query}').status_code, 400)
+        response = self.client.get(f'/api/posts/batch/?ids={2 ** 63 - 1}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['missing'], [2 ** 63 - 1])
+
+    def test_batch_conditional_request(self):
+        """Test that an unchanged batch revalidates with 304 and no queries"""
+        url = f'/api/posts/batch/?ids={self.posts[0].pk},{self.posts[1].pk}'
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_detail_is_one_query(self):
+        """Test that the detail view checks the dorm in the same query that reads the post"""
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/posts/{self.posts[0].pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['title'], 'Пост 0')
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/posts/{self.foreign.pk}/')
+        self.assertEqual(response.status_code, 404)
+
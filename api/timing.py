@@ -0,0 +1,188 @@
+"""
+Per-request timing: SQL queries, DB time, serialization and total time.
+
+``RequestTimingMiddleware`` opens a collector for every request. Queries
+are recorded by an execute wrapper that ``install()`` adds to every database
+connection, so it works without ``DEBUG`` and for queries that async views
+run on ``sync_to_async`` threads (the collector lives in a context
+variable, which asgiref carries across threads). Views mark serialization
+with ``with timing.span('serialize'):``; DRF rendering is measured as
+``render``.
+
+Each response gets a ``Server-Timing`` header. A sample of requests is
+logged as one JSON line on the ``api.timing`` logger. Slow requests and
+requests that repeat the same SQL (N+1) are always logged, with the SQL.
+
+Settings:
+    REQUEST_TIMING_HEADER             add Server-Timing (default: True)
+    REQUEST_TIMING_SAMPLE_RATE        share of requests logged (default: 0.01)
+    REQUEST_TIMING_SLOW_MS            slow-request threshold (default: 500)
+    REQUEST_TIMING_DUPLICATE_QUERIES  repeats of one SQL that count as N+1 (default: 5)
+"""
+
+import contextvars
+import json
+import logging
+import random
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+
+logger = logging.getLogger(__name__)
+
+MAX_LOGGED_QUERIES = 20
+
+_current = contextvars.ContextVar('request_timing', default=None)
+
+
+class RequestTiming:
+    """
+    Measurements of one request.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = []  # (sql, seconds)
+        self.spans = Counter()
+
+    @property
+    def db_time(self):
+        return sum(duration for _, duration in self.queries)
+
+    def duplicates(self, threshold):
+        counts = Counter(sql for sql, _ in self.queries)
+        return [(sql, count) for sql, count in counts.most_common() if count >= threshold]
+
+
+def current():
+    return _current.get()
+
+
+@contextmanager
+def span(name):
+    """
+    Add the time spent in the block to ``name`` of the current request.
+    """
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.spans[name] += time.perf_counter() - started
+
+
+def _record_query(execute, sql, params, many, context):
+    timing = _current.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timing.queries.append((sql, time.perf_counter() - started))
+
+
+def _add_wrapper(connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def install():
+    """
+    Record queries on every database connection, present and future.
+    """
+    connection_created.connect(_add_wrapper, dispatch_uid='api.timing')
+    for connection in connections.all(initialized_only=True):
+        _add_wrapper(connection)
+
+
+def _setting(name, default):
+    return getattr(settings, f'REQUEST_TIMING_{name}', default)
+
+
+class RequestTimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timing = RequestTiming()
+        token = _current.set(timing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timing)
+
+    async def __acall__(self, request):
+        timing = RequestTiming()
+        token = _current.set(timing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timing)
+
+    def process_template_response(self, request, response):
+        # DRF Response рендериться після view - міряємо й цей час
+        timing = _current.get()
+        if timing is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                timing.spans['render'] += time.perf_counter() - started
+            response.add_post_render_callback(rendered)
+        return response
+
+    def finish(self, request, response, timing):
+        total = time.perf_counter() - timing.started
+        if _setting('HEADER', True):
+            entries = [f'db;dur={timing.db_time * 1000:.1f};desc="{len(timing.queries)} queries"']
+            entries += [f'{name};dur={seconds * 1000:.1f}' for name, seconds in sorted(timing.spans.items())]
+            entries.append(f'total;dur={total * 1000:.1f}')
+            response['Server-Timing'] = ', '.join(entries)
+        self.log(request, response, timing, total)
+        return response
+
+    def log(self, request, response, timing, total):
+        slow_ms = _setting('SLOW_MS', 500)
+        duplicates = timing.duplicates(_setting('DUPLICATE_QUERIES', 5))
+        slow = total * 1000 >= slow_ms
+        sampled = random.random() < _setting('SAMPLE_RATE', 0.01)
+        if not (slow or duplicates or sampled):
+            return
+
+        match = getattr(request, 'resolver_match', None)
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 1),
+            'db_ms': round(timing.db_time * 1000, 1),
+            'queries': len(timing.queries),
+            **{f'{name}_ms': round(seconds * 1000, 1) for name, seconds in timing.spans.items()},
+        }
+        if slow or duplicates:
+            record['slow'] = slow
+            record['duplicate_queries'] = [{'sql': sql, 'count': count} for sql, count in duplicates]
+            slowest = sorted(timing.queries, key=lambda query: query[1], reverse=True)[:MAX_LOGGED_QUERIES]
+            record['slowest_queries'] = [{'sql': sql, 'ms': round(seconds * 1000, 2)} for sql, seconds in slowest]
+            logger.warning(json.dumps(record, ensure_ascii=False), extra={'timing': record})
+        else:
+            logger.info(json.dumps(record, ensure_ascii=False), extra={'timing': record})
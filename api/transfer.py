@@ -0,0 +1,287 @@
+"""
+Streaming export and import of one dorm's data as gzip-compressed NDJSON.
+
+An export is one JSON object per line: a header, then the dorm's users
+(residents and the authors of its posts), their student profiles and the
+dorm's posts, in that order::
+
+    {"format": "gurtaki-dorm", "version": 1, "dorm": 3, "exported_at": "..."}
+    {"model": "user", "data": {"id": 12, "username": "...", ...}}
+    {"model": "profile", "data": {"id": 7, "user_id": 12, ...}}
+    {"model": "post", "data": {"id": 40, "author_id": 12, "category": "Події", ...}}
+
+Rows are read with ``.iterator(chunk_size=...)`` (a server-side cursor on
+PostgreSQL) and written as they come, so memory does not depend on the size
+of the dorm. Files (photos, images, attachments) are referenced by name,
+not copied. Password hashes are included only on request
+(``include_passwords``); users imported without one get an unusable
+password and have to reset it.
+
+The import inserts rows with batched ``bulk_create``. IDs are preserved
+when they are free in the target database; otherwise the row gets a new ID
+and references to it are remapped. A user whose username already exists
+is matched to the existing account instead of being created. Categories
+are matched by name.
+"""
+
+import datetime
+import gzip
+import itertools
+import json
+import zlib
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Category, Post, StudentProfile, explicit_timestamps
+
+
+FORMAT = 'gurtaki-dorm'
+VERSION = 1
+DEFAULT_CHUNK_SIZE = 2000
+DEFAULT_BATCH_SIZE = 1000
+
+USER_FIELDS = ('id', 'username', 'password', 'first_name', 'last_name', 'email', 'is_active', 'is_staff',
+               'date_joined', 'last_login')
+PROFILE_FIELDS = ('id', 'user_id', 'dorm_number', 'student_id_photo', 'is_approved')
+POST_FIELDS = ('id', 'title', 'slug', 'content', 'dorm_number', 'author_id', 'category__name', 'image',
+               'image_variants', 'attachment', 'is_published', 'pinned', 'created_at', 'updated_at', 'published_at')
+DATETIME_FIELDS = ('date_joined', 'last_login', 'created_at', 'updated_at', 'published_at')
+MODELS = ('user', 'profile', 'post')
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+# --- Експорт ---
+
+def _default(value):
+    # DjangoJSONEncoder обрізає мікросекунди - тоді імпорт не відтворить час точно
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def _line(obj):
+    return (json.dumps(obj, default=_default, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+def export_lines(dorm_number, chunk_size=DEFAULT_CHUNK_SIZE, include_passwords=False):
+    """
+    Yield the NDJSON lines (bytes) of ``dorm_number``.
+
+    Users are the dorm's residents plus everyone who wrote one of its posts,
+    so no post loses its author on import. Password hashes are left out
+    unless ``include_passwords`` is set.
+    """
+    yield _line({'format': FORMAT, 'version': VERSION, 'dorm': dorm_number, 'exported_at': timezone.now()})
+
+    fields = USER_FIELDS if include_passwords else tuple(name for name in USER_FIELDS if name != 'password')
+    authors = Post.objects.filter(dorm_number=dorm_number, author__isnull=False).values('author_id')
+    users = (User.objects.filter(Q(profile__dorm_number=dorm_number) | Q(pk__in=authors))
+             .order_by('id').values(*fields))
+    for row in users.iterator(chunk_size=chunk_size):
+        yield _line({'model': 'user', 'data': row})
+
+    profiles = StudentProfile.objects.filter(dorm_number=dorm_number).order_by('id').values(*PROFILE_FIELDS)
+    for row in profiles.iterator(chunk_size=chunk_size):
+        yield _line({'model': 'profile', 'data': row})
+
+    posts = Post.objects.filter(dorm_number=dorm_number).order_by('id').values(*POST_FIELDS)
+    for row in posts.iterator(chunk_size=chunk_size):
+        row['category'] = row.pop('category__name')
+        yield _line({'model': 'post', 'data': row})
+
+
+def gzip_stream(lines, level=6):
+    """
+    Gzip-compress an iterable of byte strings on the fly.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 = заголовок gzip
+    for line in lines:
+        chunk = compressor.compress(line)
+        if chunk:
+            yield chunk
+    yield compressor.flush()
+
+
+def export_dorm(dorm_number, fileobj, chunk_size=DEFAULT_CHUNK_SIZE, include_passwords=False):
+    """
+    Write the gzip-compressed export to the binary file ``fileobj``.
+
+    Returns the number of exported rows.
+    """
+    lines = [0]
+
+    def counted():
+        for line in export_lines(dorm_number, chunk_size, include_passwords):
+            lines[0] += 1
+            yield line
+
+    for chunk in gzip_stream(counted()):
+        fileobj.write(chunk)
+    # Перший рядок - заголовок
+    return lines[0] - 1
+
+
+# --- Імпорт ---
+
+def _check_header(header):
+    if not isinstance(header, dict) or header.get('format') != FORMAT:
+        raise ImportFormatError('Not a dorm export')
+    if header.get('version') != VERSION:
+        raise ImportFormatError(f"Unsupported export version {header.get('version')!r} (expected {VERSION})")
+    return header
+
+
+def _parse_datetimes(data):
+    for name in DATETIME_FIELDS:
+        if data.get(name):
+            data[name] = parse_datetime(data[name])
+    return data
+
+
+def read_records(fileobj):
+    """
+    Yield ``(model, data)`` from a gzip-compressed export in ``fileobj``.
+
+    The header is checked first; ``ImportFormatError`` is raised for anything
+    that is not an export of this format and version.
+    """
+    with gzip.GzipFile(fileobj=fileobj, mode='rb') as lines:
+        try:
+            _check_header(json.loads(next(lines, b'null')))
+            for number, line in enumerate(lines, start=2):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if (not isinstance(record, dict) or record.get('model') not in MODELS
+                        or not isinstance(record.get('data'), dict)):
+                    raise ImportFormatError(f'Line {number}: not a user, profile or post record')
+                yield record['model'], _parse_datetimes(record['data'])
+        except ImportFormatError:
+            raise
+        except (OSError, EOFError, ValueError) as e:
+            # Пошкоджений gzip або JSON
+            raise ImportFormatError(f'Not a valid export: {e}') from e
+
+
+class Importer:
+    """
+    Insert the records of an export in batches, remapping IDs that clash.
+
+    ``user_ids`` maps exported user IDs to IDs in this database; it is the
+    only state that grows with the input (one entry per user). Posts whose
+    author is not in the export are imported without one and counted in
+    ``authors_missing``.
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.user_ids = {}
+        self.categories = {}
+        self.counts = dict.fromkeys(
+            ('users', 'users_matched', 'profiles', 'profiles_skipped', 'posts', 'authors_missing', 'remapped'), 0)
+
+    def run(self, records):
+        with transaction.atomic(), explicit_timestamps():
+            for model, group in itertools.groupby(records, key=lambda record: record[0]):
+                handler = getattr(self, f'import_{model}s')
+                while batch := [data for _, data in itertools.islice(group, self.batch_size)]:
+                    handler(batch)
+            # PostgreSQL не зсуває послідовності після явних ID (SQLite - сам)
+            statements = connection.ops.sequence_reset_sql(no_style(), [User, StudentProfile, Post])
+            if statements:
+                with connection.cursor() as cursor:
+                    for sql in statements:
+                        cursor.execute(sql)
+        return self.counts
+
+    def _free_ids(self, model, rows):
+        ids = [row['id'] for row in rows]
+        taken = set(model.objects.filter(pk__in=ids).values_list('pk', flat=True))
+        return {pk for pk in ids if pk not in taken}
+
+    def _keep_or_drop_id(self, data, free_ids):
+        if data['id'] not in free_ids:
+            del data['id']
+            self.counts['remapped'] += 1
+        return data
+
+    def import_users(self, rows):
+        existing = dict(User.objects.filter(username__in=[row['username'] for row in rows])
+                        .values_list('username', 'id'))
+        free_ids = self._free_ids(User, rows)
+        pending = []
+        for row in rows:
+            if row['username'] in existing:
+                self.user_ids[row['id']] = existing[row['username']]
+                self.counts['users_matched'] += 1
+                continue
+            old_id = row['id']
+            data = self._keep_or_drop_id(dict(row), free_ids)
+            # Експорт без хешів паролів: вхід лише після скидання пароля
+            data.setdefault('password', make_password(None))
+            pending.append((old_id, User(**data)))
+        User.objects.bulk_create([user for _, user in pending], batch_size=self.batch_size)
+        for old_id, user in pending:
+            self.user_ids[old_id] = user.pk
+        self.counts['users'] += len(pending)
+
+    def import_profiles(self, rows):
+        user_ids = [self.user_ids.get(row['user_id']) for row in rows]
+        with_profile = set(StudentProfile.objects.filter(user_id__in=[pk for pk in user_ids if pk is not None])
+                           .values_list('user_id', flat=True))
+        free_ids = self._free_ids(StudentProfile, rows)
+        profiles = []
+        for row, user_id in zip(rows, user_ids):
+            # Власник невідомий або вже має профіль (збіг за username)
+            if user_id is None or user_id in with_profile:
+                self.counts['profiles_skipped'] += 1
+                continue
+            data = self._keep_or_drop_id(dict(row), free_ids)
+            data['user_id'] = user_id
+            profiles.append(StudentProfile(**data))
+        StudentProfile.objects.bulk_create(profiles, batch_size=self.batch_size)
+        self.counts['profiles'] += len(profiles)
+
+    def _category_id(self, name):
+        if name is None:
+            return None
+        if name not in self.categories:
+            # Через save(), щоб нова категорія отримала slug
+            category = Category.objects.filter(name=name).first()
+            if category is None:
+                category = Category(name=name)
+                category.save()
+            self.categories[name] = category.pk
+        return self.categories[name]
+
+    def import_posts(self, rows):
+        free_ids = self._free_ids(Post, rows)
+        posts = []
+        for row in rows:
+            data = self._keep_or_drop_id(dict(row), free_ids)
+            author_id = data['author_id']
+            data['author_id'] = self.user_ids.get(author_id)
+            if author_id is not None and data['author_id'] is None:
+                self.counts['authors_missing'] += 1
+            data['category_id'] = self._category_id(data.pop('category'))
+            posts.append(Post(**data))
+        Post.objects.bulk_create(posts, batch_size=self.batch_size)
+        self.counts['posts'] += len(posts)
+
+
+def import_dorm(fileobj, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Load a gzip-compressed export from ``fileobj`` in one transaction.
+
+    Returns the counts of created, matched, skipped and remapped rows.
+    """
+    return Importer(batch_size).run(read_records(fileobj))
@@ -1,11 +1,31 @@
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils.text import slugify
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
+from rest_framework import status
+from rest_framework.exceptions import ParseError
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
-from .models import Post, StudentProfile
+from . import feed_cache, images, search, sync, timing, transfer
+from .authentication import SignedTokenAuthentication, issue_token, revoke_token
+from .models import Category, Post, StudentProfile
+from .pagination import FeedCursorPagination
+from .serializers import BulkPostItemSerializer
+import hashlib
+import logging
 import os # 👈 ДОДАНО: Необхідний імпорт для чистоти коду
+import re
+import time
+
+
+logger = logging.getLogger(__name__)
 
 # --- РЕЄСТРАЦІЯ (ТІЛЬКИ ІМ'Я + ПАРОЛЬ, АКТИВАЦІЯ ОДРАЗУ) ---
 @api_view(['POST'])
@@ -46,11 +66,130 @@ def login(request):
     user = authenticate(username=username, password=password)
     
     if user:
-        token, _ = Token.objects.get_or_create(user=user)
-        return Response({'token': token.key})
+        # 👇 Підписаний токен: перевіряється без запитів до БД
+        profile = StudentProfile.objects.filter(user=user).first()
+        return Response({'token': issue_token(user, profile)})
     return Response({'detail': 'Невірні дані'}, status=400)
 
 
+# --- ВИХІД (відкликання підписаного токена) ---
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def logout(request):
+    if isinstance(request.successful_authenticator, SignedTokenAuthentication):
+        revoke_token(request.auth)
+    elif isinstance(request.auth, Token):
+        request.auth.delete()
+    return Response({'message': 'Ви вийшли з акаунта.'})
+
+
+# 👇 ВИПРАВЛЕННЯ: ВСТАНОВЛЕННЯ БАЗОВОЇ АДРЕСИ
+# ВИКОРИСТОВУЄМО ВАШУ IP, щоб уникнути 127.0.0.1
+BASE_ADDRESS = 'http://172.23.168.1:8000'
+
+
+def _media_url(name):
+    return BASE_ADDRESS + default_storage.url(name)
+
+
+def _image_srcset(variants):
+    # {'small': {'width': 320, 'height': 240, 'webp': url, 'jpeg': url}, ...}
+    srcset = {}
+    for variant, entry in (variants or {}).items():
+        if variant == 'source':
+            continue
+        srcset[variant] = {
+            key: _media_url(value) if key in images.FORMATS else value
+            for key, value in entry.items()
+        }
+    return srcset or None
+
+
+def _image_url(post):
+    if not post.image:
+        return None
+    # Створюємо повний URL: IP_ADDRESS:PORT/media/path/to/image.jpg
+    return BASE_ADDRESS + post.image.url
+
+
+# Поля поста у списках: як читати кожне і які колонки для цього потрібні
+POST_FIELDS = {
+    'id': (lambda post: post.id, ('id',)),
+    'title': (lambda post: post.title, ('title',)),
+    'excerpt': (lambda post: post.excerpt, ('excerpt',)),
+    'content': (lambda post: post.content, ('content',)),
+    'created_at': (lambda post: post.created_at, ('created_at',)),
+    'dorm_number': (lambda post: post.dorm_number, ('dorm_number',)),
+    'pinned': (lambda post: post.pinned, ('pinned',)),
+    'image_url': (_image_url, ('image',)),
+    'image_srcset': (lambda post: _image_srcset(post.image_variants), ('image_variants',)),
+}
+# Колонки курсора стрічки (див. api/pagination.py) потрібні завжди
+CURSOR_COLUMNS = ('id', 'pinned', 'created_at')
+
+
+def _requested_fields(request):
+    """
+    Fields named in ``?fields=`` (``id`` is always included), in a fixed order.
+
+    Returns ``None`` when the parameter is absent, meaning all fields.
+    """
+    raw = request.query_params.get('fields')
+    if raw is None:
+        return None
+    names = {name.strip() for name in raw.split(',') if name.strip()}
+    unknown = sorted(names - POST_FIELDS.keys())
+    if unknown:
+        raise ParseError(f"Невідомі поля: {', '.join(unknown)}. Доступні: {', '.join(POST_FIELDS)}.")
+    return tuple(name for name in POST_FIELDS if name in names or name == 'id')
+
+
+def _post_columns(fields):
+    columns = dict.fromkeys(CURSOR_COLUMNS)
+    for name in fields or POST_FIELDS:
+        columns.update(dict.fromkeys(POST_FIELDS[name][1]))
+    return tuple(columns)
+
+
+def _post_to_dict(post, fields=None):
+    return {name: POST_FIELDS[name][0](post) for name in fields or POST_FIELDS}
+
+
+# 👇 Умовні запити (ETag / Last-Modified) на основі версії стрічки гуртожитку,
+# без звернення до БД і без серіалізації тіла відповіді
+def _feed_etag(request, dorm_number, version, *parts):
+    # JSON і MessagePack - різні представлення, тож і ETag різний
+    parts += (request.accepted_renderer.format,)
+    digest = hashlib.sha1(':'.join(str(part) for part in parts).encode()).hexdigest()[:16]
+    return f'"{dorm_number}-{version}-{digest}"'
+
+
+def _last_modified_seconds(last_modified):
+    # Last-Modified має точність до секунди: поки секунда останньої зміни не
+    # минула, наступна зміна в ту ж секунду мала б ту саму дату. Тоді дату не
+    # віддаємо й If-Modified-Since не перевіряємо - лишається ETag
+    seconds = int(last_modified)
+    return seconds if seconds < int(time.time()) else None
+
+
+def _not_modified(request, etag, last_modified):
+    response = get_conditional_response(request, etag=etag, last_modified=_last_modified_seconds(last_modified))
+    if response is not None:
+        _set_validators(response, etag, last_modified)
+    return response
+
+
+def _set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    seconds = _last_modified_seconds(last_modified)
+    if seconds is not None:
+        response['Last-Modified'] = http_date(seconds)
+    # Відповідь залежить від користувача - лише приватний кеш з перевіркою
+    response['Cache-Control'] = 'private, no-cache'
+    patch_vary_headers(response, ['Authorization', 'Accept'])
+    return response
+
+
 # --- ПОСТИ (FIXED: GET з image_url) ---
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
@@ -63,34 +202,38 @@ def manage_posts(request):
         return Response({'detail': 'Ви не авторизовані або профіль не знайдено.'}, status=401)
 
     if request.method == 'GET':
-        posts = Post.objects.filter(dorm_number=user_dorm).order_by('-created_at')
-        
-        data = []
-        # 👇 ВИПРАВЛЕННЯ: ВСТАНОВЛЕННЯ БАЗОВОЇ АДРЕСИ
-        # ВИКОРИСТОВУЄМО ВАШУ IP, щоб уникнути 127.0.0.1
-        BASE_ADDRESS = 'http://172.23.168.1:8000' 
-
-        for post in posts:
-            image_url = None
-            if post.image: 
-                # Створюємо повний URL: IP_ADDRESS:PORT/media/path/to/image.jpg
-                image_url = BASE_ADDRESS + post.image.url
-            
-            # 👇 СТВОРЕННЯ СЛОВНИКА ДАНИХ З image_url
-            data.append({
-                'id': post.id,
-                'title': post.title,
-                'content': post.content,
-                'created_at': post.created_at,
-                'dorm_number': post.dorm_number,
-                'image_url': image_url,
-            })
-        
-        # DEBUG: Перевірка, що URL генерується
-        if data and data[0]['image_url']:
-            print(f"\n✅ Sending Image URL: {data[0]['image_url']}\n")
-            
-        return Response(data)
+        paginator = FeedCursorPagination()
+        cursor = request.query_params.get(paginator.cursor_query_param)
+        page_size = paginator.get_page_size(request)
+
+        fields = _requested_fields(request)
+
+        version, last_modified = feed_cache.get_validators(user_dorm)
+        etag = _feed_etag(request, user_dorm, version, 'feed', page_size, cursor or '', ','.join(fields or ()))
+        not_modified = _not_modified(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        # 👇 Кеш стрічки гуртожитку: версія скидається при кожному записі поста
+        cached = feed_cache.get_page(user_dorm, cursor, page_size, version, fields)
+        if cached is None:
+            # Лише потрібні колонки: без content стрічка не читає довгий текст
+            posts = Post.objects.filter(dorm_number=user_dorm).only(*_post_columns(fields))
+
+            # 👇 Курсорна пагінація: сторінка N коштує стільки ж, скільки перша
+            page = paginator.paginate_queryset(posts, request)
+            with timing.span('serialize'):
+                cached = {
+                    'results': [_post_to_dict(post, fields) for post in page],
+                    'next_cursor': paginator.next_cursor,
+                }
+            feed_cache.set_page(user_dorm, cursor, page_size, cached, version, fields)
+        else:
+            paginator.request = request
+            paginator.next_cursor = cached['next_cursor']
+
+        response = paginator.get_paginated_response(cached['results'])
+        return _set_validators(response, etag, last_modified)
 
     elif request.method == 'POST':
         try:
@@ -98,33 +241,249 @@ def manage_posts(request):
                  return Response({'detail': 'Необхідно вказати заголовок та зміст.'}, status=400)
             
             # 👇 ДОДАНО: Обробка зображення (якщо надсилається)
+            image = request.data.get('image', None) # Припускаємо, що поле називається 'image'
+            if hasattr(image, 'read'):
+                # Лише заголовок файлу: "бомби" відхиляємо до декодування
+                try:
+                    images.validate_post_image(image)
+                except ValidationError as e:
+                    return Response({'detail': e.messages[0]}, status=400)
             Post.objects.create(
                 title=request.data['title'],
                 content=request.data['content'],
                 dorm_number=user_dorm,
-                image=request.data.get('image', None) # Припускаємо, що поле називається 'image'
+                image=image
             )
-            print("🚀 Пост успішно створено!")
             return Response({'message': 'Пост додано!'})
         
         except Exception as e:
-            print(f"🛑 КРИТИЧНА ПОМИЛКА СЕРВЕРА: {e}")
+            logger.exception('Could not create post')
             return Response({'detail': 'Помилка при збереженні поста: ' + str(e)}, status=500)
 
 
-# --- ДЕТАЛІ ПОСТА (ЗАЛИШАЄМО БЕЗ ЗМІН) ---
+# --- ПАКЕТНЕ СТВОРЕННЯ ПОСТІВ (розклад на тиждень одним запитом) ---
+BULK_MAX_POSTS = 100
+BULK_MODES = ('atomic', 'best_effort')
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_create_posts(request):
+    try:
+        user_dorm = request.user.profile.dorm_number
+    except Exception:
+        return Response({'detail': 'Ви не авторизовані або профіль не знайдено.'}, status=401)
+
+    # Приймаємо як {"mode": ..., "posts": [...]}, так і просто [...]
+    payload = request.data
+    if isinstance(payload, list):
+        payload = {'posts': payload}
+    items = payload.get('posts') if hasattr(payload, 'get') else None
+    mode = payload.get('mode', 'atomic') if hasattr(payload, 'get') else None
+    if not isinstance(items, list) or not items:
+        return Response({'detail': 'Передайте непорожній список постів.'}, status=400)
+    if len(items) > BULK_MAX_POSTS:
+        return Response({'detail': f'Не більше {BULK_MAX_POSTS} постів за раз.'}, status=400)
+    if mode not in BULK_MODES:
+        return Response({'detail': 'Режим має бути atomic або best_effort.'}, status=400)
+
+    # 👇 Спочатку перевіряємо всі пости (категорії - одним запитом), потім пишемо
+    requested = {str(item.get('category')) for item in items if isinstance(item, dict)}
+    requested = [int(pk) for pk in requested if pk.isdigit()]
+    context = {'category_ids': set(Category.objects.filter(pk__in=requested).values_list('pk', flat=True))}
+
+    results = []
+    to_create = []
+    for index, item in enumerate(items):
+        serializer = BulkPostItemSerializer(data=item, context=context)
+        if not serializer.is_valid():
+            results.append({'index': index, 'status': 'error', 'errors': serializer.errors})
+            continue
+        data = serializer.validated_data
+        post = Post(
+            title=data['title'],
+            content=data['content'],
+            category_id=data.get('category'),
+            dorm_number=user_dorm,
+            author_id=request.user.pk,
+            # bulk_create не викликає Post.save, тож slug ставимо тут
+            slug=slugify(data['title'], allow_unicode=True)[:220],
+        )
+        results.append({'index': index, 'status': 'created'})
+        to_create.append((results[-1], post))
+
+    failed = len(items) - len(to_create)
+    if failed and mode == 'atomic':
+        for result in results:
+            if result['status'] == 'created':
+                result['status'] = 'skipped'
+        return Response({'created': 0, 'failed': failed, 'results': results}, status=400)
+
+    if to_create:
+        # Одна транзакція і один INSERT; кеш стрічки скидається раз на пакет
+        with transaction.atomic():
+            created = Post.objects.bulk_create([post for _, post in to_create])
+        for (result, _), post in zip(to_create, created):
+            result['id'] = post.pk
+
+    if not to_create:
+        code = status.HTTP_400_BAD_REQUEST
+    elif failed:
+        code = status.HTTP_207_MULTI_STATUS
+    else:
+        code = status.HTTP_201_CREATED
+    return Response({'created': len(to_create), 'failed': failed, 'results': results}, status=code)
+
+
+# --- ДЕЛЬТА-СИНХРОНІЗАЦІЯ: лише пости, змінені після водяного знака ---
+SYNC_PAGE_SIZE = 100
+SYNC_MAX_PAGE_SIZE = 500
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def post_changes(request):
+    try:
+        user_dorm = request.user.profile.dorm_number
+    except Exception:
+        return Response({'detail': 'Ви не авторизовані або профіль не знайдено.'}, status=401)
+
+    try:
+        limit = int(request.query_params.get('limit', SYNC_PAGE_SIZE))
+    except ValueError:
+        limit = SYNC_PAGE_SIZE
+    limit = max(1, min(limit, SYNC_MAX_PAGE_SIZE))
+
+    posts, deleted_ids, watermark, has_more = sync.sync_page(user_dorm, request.query_params.get('since'), limit)
+    with timing.span('serialize'):
+        changed = [_post_to_dict(post) for post in posts]
+    return Response({
+        'changed': changed,
+        'deleted': deleted_ids,
+        'watermark': watermark,
+        'has_more': has_more,
+    })
+
+
+# --- ПОШУК ПО ПОСТАХ ГУРТОЖИТКУ ---
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search_posts(request):
+    try:
+        user_dorm = request.user.profile.dorm_number
+    except Exception:
+        return Response({'detail': 'Ви не авторизовані або профіль не знайдено.'}, status=401)
+
+    query = request.query_params.get('q', '').strip()
+    if not search.query_tokens(query):
+        return Response({'detail': 'Введіть пошуковий запит.'}, status=400)
+
+    try:
+        limit = int(request.query_params.get('limit', SEARCH_PAGE_SIZE))
+    except ValueError:
+        limit = SEARCH_PAGE_SIZE
+    limit = max(1, min(limit, SEARCH_MAX_PAGE_SIZE))
+
+    posts = search.search_posts(user_dorm, query, limit)
+    with timing.span('serialize'):
+        results = [_post_to_dict(post) for post in posts]
+    return Response({'results': results})
+
+
+# --- ДЕТАЛІ ПОСТА ---
+def _detail_dict(item):
+    # Рядок .values() поста з готовими URL зображення
+    item['image_url'] = _media_url(item['image']) if item['image'] else None
+    item['image_srcset'] = _image_srcset(item.pop('image_variants'))
+    return item
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_post_detail(request, post_id):
     try:
         user_dorm = request.user.profile.dorm_number
-        
-        # Нам також потрібно повертати URL зображення тут, але для простоти поки повертаємо .values()
-        post = Post.objects.get(id=post_id, dorm_number=user_dorm)
-        
-        return Response(list(Post.objects.filter(id=post_id).values()))
+
+        # Будь-яка зміна поста скидає версію його гуртожитку, тож вона ж
+        # підходить і як валідатор для окремого поста
+        version, last_modified = feed_cache.get_validators(user_dorm)
+        etag = _feed_etag(request, user_dorm, version, 'post', post_id)
+        not_modified = _not_modified(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        # Один запит: перевірка гуртожитку - частина того ж WHERE
+        data = list(Post.objects.filter(id=post_id, dorm_number=user_dorm).values())
+        if not data:
+            raise Post.DoesNotExist
+        with timing.span('serialize'):
+            for item in data:
+                _detail_dict(item)
+        response = Response(data)
+        return _set_validators(response, etag, last_modified)
         
     except Post.DoesNotExist:
         return Response({'detail': 'Оголошення не знайдено або доступ заборонено.'}, status=404)
     except Exception as e:
         return Response({'detail': str(e)}, status=500)
+
+
+# --- КІЛЬКА ПОСТІВ ОДНИМ ЗАПИТОМ (/api/posts/batch/?ids=1,2,3) ---
+BATCH_MAX_IDS = 100
+BATCH_MAX_ID = 2 ** 63 - 1
+BATCH_ID_RE = re.compile(r'[0-9]{1,19}')
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_posts_batch(request):
+    try:
+        user_dorm = request.user.profile.dorm_number
+    except Exception:
+        return Response({'detail': 'Ви не авторизовані або профіль не знайдено.'}, status=401)
+
+    values = [value.strip() for value in request.query_params.get('ids', '').split(',') if value.strip()]
+    # Лише ASCII-цифри (int() приймає і '1_0', і '١٢'); більше за BIGINT база не прийме
+    if not all(BATCH_ID_RE.fullmatch(value) and int(value) <= BATCH_MAX_ID for value in values):
+        return Response({'detail': 'ids - це числа через кому.'}, status=400)
+    # Порядок запиту зберігаємо, повтори відкидаємо
+    ids = list(dict.fromkeys(int(value) for value in values))
+    if not ids:
+        return Response({'detail': 'Вкажіть ids.'}, status=400)
+    if len(ids) > BATCH_MAX_IDS:
+        return Response({'detail': f'Не більше {BATCH_MAX_IDS} ids за запит.'}, status=400)
+
+    version, last_modified = feed_cache.get_validators(user_dorm)
+    etag = _feed_etag(request, user_dorm, version, 'batch', *ids)
+    not_modified = _not_modified(request, etag, last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    # Один запит по первинному ключу; без сортування - порядок відновлюємо самі
+    rows = {row['id']: row for row in Post.objects.filter(id__in=ids, dorm_number=user_dorm).order_by().values()}
+    with timing.span('serialize'):
+        results = [_detail_dict(rows[post_id]) for post_id in ids if post_id in rows]
+    # Неіснуючі й чужі пости не розрізняємо, щоб не розкривати інші гуртожитки
+    response = Response({
+        'results': results,
+        'missing': [post_id for post_id in ids if post_id not in rows],
+    })
+    return _set_validators(response, etag, last_modified)
+
+
+# --- ЕКСПОРТ ГУРТОЖИТКУ (ЛИШЕ ДЛЯ ПЕРСОНАЛУ) ---
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def export_dorm(request, dorm_number):
+    # Той самий формат, що й у manage.py export_dorm, але без хешів паролів;
+    # стискаємо на льоту
+    response = StreamingHttpResponse(
+        transfer.gzip_stream(transfer.export_lines(dorm_number)),
+        content_type='application/gzip',
+    )
+    response['Content-Disposition'] = f'attachment; filename="dorm-{dorm_number}.ndjson.gz"'
+    return response
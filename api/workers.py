@@ -0,0 +1,28 @@
+"""
+Process pools for the CPU-bound management commands.
+
+Workers only do CPU and file work (image encoding, data generation); the
+parent process keeps all database access. A worker must not inherit an open
+database connection: with ``fork`` it would share the parent's socket, and
+closing it at exit could break the parent's session.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.db import connections
+
+
+def worker_pool(workers):
+    """
+    Return a ``ProcessPoolExecutor`` of ``workers`` processes, already started.
+
+    With the ``fork`` start method the executor forks every worker at its
+    first ``submit()``, so the connections are closed and that first submit
+    is made here, before the caller can run another query.
+    """
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=django.setup)
+    connections.close_all()
+    # Порожнє завдання: форк усіх воркерів відбувається саме зараз
+    pool.submit(int)
+    return pool
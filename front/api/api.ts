@@ -27,11 +27,40 @@ api.interceptors.request.use(
 export interface Post {
   id: number;
   title: string;
-  content: string;
+  // У стрічці замість повного тексту приходить лише excerpt (див. LIST_FIELDS)
+  content?: string;
+  excerpt?: string;
   created_at?: string;
   dorm_number: number;
+  pinned?: boolean;
   // 👇 ДОДАНО: Поле для URL зображення з бекенду
   image_url?: string; 
+  // Зменшені копії зображення: small / medium / original у WebP та JPEG
+  image_srcset?: ImageSrcSet | null;
+}
+
+export interface ImageVariant {
+  width: number;
+  height: number;
+  webp: string;
+  jpeg: string;
+}
+
+export type ImageSrcSet = Partial<Record<'small' | 'medium' | 'original', ImageVariant>>;
+
+// Найменша копія, не вужча за `minWidth`; інакше - оригінальний URL
+export const pickImageUrl = (post: Post, minWidth: number) => {
+  const variants = Object.values(post.image_srcset || {})
+    .filter((variant): variant is ImageVariant => !!variant)
+    .sort((a, b) => a.width - b.width);
+  const variant = variants.find((v) => v.width >= minWidth) || variants[variants.length - 1];
+  return variant ? variant.webp : post.image_url;
+};
+
+// Сторінка стрічки з курсором на наступну сторінку
+export interface PostPage {
+  next: string | null;
+  results: Post[];
 }
 
 // ВХІД
@@ -43,6 +72,11 @@ export const loginUser = async (username: string, password: string) => {
   return response.data;
 };
 
+// ВИХІД (відкликає токен на сервері)
+export const logoutUser = async () => {
+  await api.post('/api/auth/logout/');
+};
+
 // РЕЄСТРАЦІЯ
 export const registerUser = async (name: string, password: string) => {
   
@@ -56,18 +90,103 @@ export const registerUser = async (name: string, password: string) => {
   return response.data;
 };
 
-// ОТРИМАННЯ СПИСКУ ПОСТІВ
-export const getPosts = async () => {
-  const response = await api.get<Post[]>('/api/posts/'); 
+// 👇 Умовні запити: зберігаємо ETag / Last-Modified і тіло відповіді,
+// а на 304 Not Modified повертаємо збережену копію
+interface CachedResponse {
+  etag?: string;
+  lastModified?: string;
+  data: unknown;
+}
+
+const responseCache = new Map<string, CachedResponse>();
+
+const getWithValidators = async <T>(url: string): Promise<T> => {
+  const cached = responseCache.get(url);
+  const headers: Record<string, string> = {};
+  if (cached?.etag) headers['If-None-Match'] = cached.etag;
+  if (cached?.lastModified) headers['If-Modified-Since'] = cached.lastModified;
+
+  const response = await api.get<T>(url, {
+    headers,
+    validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+  });
+
+  if (response.status === 304 && cached) {
+    return cached.data as T;
+  }
+
+  responseCache.set(url, {
+    etag: response.headers['etag'],
+    lastModified: response.headers['last-modified'],
+    data: response.data,
+  });
   return response.data;
 };
 
+// Очищення збережених відповідей (наприклад, при виході з акаунта)
+export const clearResponseCache = () => responseCache.clear();
+
+// ОТРИМАННЯ СПИСКУ ПОСТІВ
+// Передайте `next` з попередньої сторінки, щоб завантажити наступну
+// Поля, які показує список; посилання `next` зберігає цей параметр
+const LIST_FIELDS = 'title,excerpt,created_at,dorm_number,pinned,image_url,image_srcset';
+
+export const getPosts = async (next?: string | null) => {
+  return getWithValidators<PostPage>(next || `/api/posts/?fields=${LIST_FIELDS}`);
+};
+
+// ДЕЛЬТА-СИНХРОНІЗАЦІЯ
+// Зберігайте `watermark` і передавайте його наступного разу;
+// поки `has_more` === true, викликайте знову з новим водяним знаком.
+// `reset` === true: водяний знак застарів (журнал очищено) - відповідь
+// містить пости з нуля, локальну копію треба замінити, а не доповнити
+export interface PostChanges {
+  changed: Post[];
+  deleted: number[];
+  watermark: string;
+  has_more: boolean;
+  reset?: boolean;
+}
+
+export const getPostChanges = async (since?: string | null): Promise<PostChanges> => {
+  try {
+    const response = await api.get<PostChanges>('/api/posts/changes/', {
+      params: since ? { since } : {},
+    });
+    return response.data;
+  } catch (error) {
+    if (since && axios.isAxiosError(error) && error.response?.status === 410) {
+      return { ...(await getPostChanges(null)), reset: true };
+    }
+    throw error;
+  }
+};
+
+// ПОШУК ПО ПОСТАХ
+export const searchPosts = async (q: string) => {
+  const response = await api.get<{ results: Post[] }>('/api/posts/search/', {
+    params: { q },
+  });
+  return response.data.results;
+};
+
 // ОТРИМАННЯ ДЕТАЛЕЙ ПОСТА ПО ID
 export const getPostDetail = async (id: number) => {
-  const response = await api.get<Post[]>(`/api/posts/${id}/`); 
-  
+  const data = await getWithValidators<Post[]>(`/api/posts/${id}/`);
+
   // Бекенд повертає масив, тому беремо перший елемент
-  return response.data[0]; 
+  return data[0];
+};
+
+// КІЛЬКА ПОСТІВ ОДНИМ ЗАПИТОМ (до 100 id)
+// `missing` - id, яких немає або які з іншого гуртожитку
+export interface PostBatch {
+  results: Post[];
+  missing: number[];
+}
+
+export const getPostsBatch = async (ids: number[]) => {
+  return getWithValidators<PostBatch>(`/api/posts/batch/?ids=${ids.join(',')}`);
 };
 
 
@@ -100,4 +219,26 @@ export const createPost = async (title: string, content: string, imageUri?: stri
         },
     });
     return response.data;
-};
\ No newline at end of file
+};
+
+// ПАКЕТНЕ СТВОРЕННЯ ПОСТІВ (наприклад, розклад на тиждень)
+export interface BulkPostItem {
+  title: string;
+  content: string;
+  category?: number | null;
+}
+
+export interface BulkPostResult {
+  index: number;
+  status: 'created' | 'skipped' | 'error';
+  id?: number;
+  errors?: Record<string, string[]>;
+}
+
+export const createPostsBulk = async (posts: BulkPostItem[], mode: 'atomic' | 'best_effort' = 'atomic') => {
+  // 400/207 теж містять результати по кожному посту
+  const response = await api.post('/api/posts/bulk/', { mode, posts }, {
+    validateStatus: (status) => status === 201 || status === 207 || status === 400,
+  });
+  return response.data as { created: number; failed: number; results: BulkPostResult[] };
+};
@@ -14,7 +14,7 @@ import {
 } from "react-native";
 import { useSafeAreaInsets } from 'react-native-safe-area-context';
 import { Ionicons } from '@expo/vector-icons'; 
-import { getPosts, Post } from "../../api/api"; 
+import { getPosts, pickImageUrl, Post } from "../../api/api"; 
 import { useTheme } from '../theme-context'; // 👈 ІМПОРТ ТЕМИ
 
 export default function Home() {
@@ -27,15 +27,14 @@ export default function Home() {
   const [posts, setPosts] = useState<Post[]>([]);
   const [loading, setLoading] = useState(true);
   const [refreshing, setRefreshing] = useState(false); 
+  const [nextPage, setNextPage] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   const fetchPosts = async () => {
     try {
-      const data = await getPosts();
-      if (Array.isArray(data)) {
-        setPosts(data.reverse()); 
-      } else {
-        setPosts([]);
-      }
+      const page = await getPosts();
+      setPosts(page.results);
+      setNextPage(page.next);
     } catch (error) {
       console.log("Помилка:", error);
     } finally {
@@ -44,6 +43,21 @@ export default function Home() {
     }
   };
 
+  // 👇 Нескінченна прокрутка: довантажуємо наступну сторінку за курсором
+  const fetchMorePosts = async () => {
+    if (!nextPage || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const page = await getPosts(nextPage);
+      setPosts((current) => [...current, ...page.results]);
+      setNextPage(page.next);
+    } catch (error) {
+      console.log("Помилка:", error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useFocusEffect(
     useCallback(() => {
       const checkAuth = async () => {
@@ -76,7 +90,7 @@ export default function Home() {
       {/* ВІДОБРАЖЕННЯ ФОТО АБО ЗАГЛУШКИ */}
       {item.image_url ? (
         <Image 
-          source={{ uri: item.image_url }} 
+          source={{ uri: pickImageUrl(item, 240) }} 
           style={styles.postImagePlaceholder}
         />
       ) : (
@@ -88,7 +102,7 @@ export default function Home() {
       <View style={styles.postTextContainer}>
         <Text style={[styles.postTitle, { color: colors.text }]}>{item.title}</Text>
         <Text style={[styles.postDescription, { color: colors.secondaryText }]} numberOfLines={2}>
-          {item.content}
+          {item.excerpt ?? item.content}
         </Text>
       </View>
     </View>
@@ -128,6 +142,8 @@ export default function Home() {
           keyExtractor={(item) => item.id.toString()}
           renderItem={renderPost}
           contentContainerStyle={styles.listContent}
+          onEndReached={fetchMorePosts}
+          onEndReachedThreshold={0.5}
           refreshControl={
             <RefreshControl 
               refreshing={refreshing} 
@@ -13,6 +13,7 @@ import {
   ScrollView
 } from "react-native";
 import { useSafeAreaInsets } from 'react-native-safe-area-context';
+import { clearResponseCache, logoutUser } from "../api/api";
 
 
 export default function Profile() {
@@ -48,7 +49,13 @@ export default function Profile() {
   }, [router]);
 
   const handleLogout = async () => {
+    try {
+      await logoutUser();
+    } catch (error) {
+      console.log(error);
+    }
     await AsyncStorage.removeItem('userToken');
+    clearResponseCache();
     router.replace("/auth");
   };
 
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'myproject.settings')
+# Під ASGI вхід і реєстрація обслуговуються async-views (див. myproject/urls_async.py)
+os.environ.setdefault('DJANGO_ROOT_URLCONF', 'myproject.urls_async')
 
 application = get_asgi_application()
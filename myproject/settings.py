@@ -5,7 +5,9 @@ Generated by 'django-admin startproject' using Django 5.2.8.
 """
 
 from pathlib import Path
+import importlib.util
 import os
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -42,6 +44,10 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    # Server-Timing і журнал повільних запитів / N+1 (див. api/timing.py)
+    'api.timing.RequestTimingMiddleware',
+    # Prometheus-метрики (/metrics); після RequestTimingMiddleware - бере з нього SQL
+    'api.metrics.MetricsMiddleware',
     
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -50,9 +56,12 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Профілювання на вимогу (X-Profile або правило в адмінці); має бути останнім
+    'api.profiling.ProfilingMiddleware',
 ]
 
-ROOT_URLCONF = 'myproject.urls'
+# myproject/asgi.py підставляє myproject.urls_async (async вхід/реєстрація)
+ROOT_URLCONF = os.environ.get('DJANGO_ROOT_URLCONF', 'myproject.urls')
 
 TEMPLATES = [
     {
@@ -72,13 +81,85 @@ TEMPLATES = [
 WSGI_APPLICATION = 'myproject.wsgi.application'
 
 
+# SQLite для конкурентного навантаження: WAL (читачі не чекають на записувача),
+# synchronous=NORMAL (у WAL безпечно, fsync лише на checkpoint), 64 МБ кешу
+# сторінок, 256 МБ mmap і очікування блокування замість "database is locked".
+# Прагми виконуються для кожного нового з'єднання (OPTIONS['init_command']).
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'cache_size': -64 * 1024,  # від'ємне - у КБ
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 20000,  # мс
+    'temp_store': 'memory',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Постійні з'єднання: прагми й кеш сторінок не втрачаються між запитами
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '600')),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+            # Транзакції одразу беруть блокування запису: без BEGIN IMMEDIATE
+            # читаюча транзакція, що потім пише, падає з "database is locked",
+            # не чекаючи busy_timeout
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': SQLITE_PRAGMAS['busy_timeout'] / 1000,
+        },
     }
 }
 
+# PostgreSQL (див. DATABASE_SETUP.md): USE_POSTGRESQL=1 і змінні DB_*.
+# Драйвер - psycopg 3 з вбудованим пулом Django. Пул живе в кожному процесі
+# окремо, а потоку воркера потрібне одне з'єднання, тож за замовчуванням
+# max_size = WEB_THREADS. Сума воркери × DB_POOL_MAX_SIZE має вміщатися в
+# max_connections сервера.
+if os.environ.get('USE_POSTGRESQL', '').lower() in ('1', 'true', 'yes'):
+    WEB_THREADS = int(os.environ.get('WEB_THREADS', '4'))
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'gurtaki'),
+            'USER': os.environ.get('DB_USER', 'postgres'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            # Пул замість постійних з'єднань (Django не дозволяє обидва)
+            'CONN_MAX_AGE': 0,
+            # .iterator() читає через серверний курсор; за PgBouncer у режимі
+            # transaction їх треба вимкнути
+            'DISABLE_SERVER_SIDE_CURSORS': os.environ.get('DB_DISABLE_SERVER_SIDE_CURSORS', '') == '1',
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '1')),
+                    'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', str(WEB_THREADS))),
+                    'timeout': float(os.environ.get('DB_POOL_TIMEOUT', '10')),
+                },
+            },
+            'TEST': {
+                'NAME': os.environ.get('DB_TEST_NAME') or None,
+            },
+        }
+    }
+
+
+# Кеш. Local-memory живе в межах одного процесу; якщо воркерів кілька,
+# використовуйте спільний бекенд, напр.
+# 'django.core.cache.backends.filebased.FileBasedCache' з 'LOCATION'.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'gurtaki'),
+    }
+}
+
+# Кеш сторінок стрічки (див. api/feed_cache.py)
+FEED_CACHE_ALIAS = 'default'
+FEED_CACHE_TIMEOUT = 300
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -115,6 +196,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Django REST framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
+        'api.authentication.SignedTokenAuthentication',
         'rest_framework.authentication.TokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ),
@@ -123,6 +205,65 @@ REST_FRAMEWORK = {
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    # Той самий JSON, що й у JSONRenderer, але через orjson (див. api/renderers.py)
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+# Accept: application/msgpack - лише якщо встановлено msgpack
+if importlib.util.find_spec('msgpack') is not None:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].insert(1, 'api.renderers.MessagePackRenderer')
+
+# Журнал змін для дельта-синхронізації: prune_post_changes видаляє старіші записи
+POST_CHANGE_RETENTION_DAYS = 30
+
+# Підписані токени (див. api/authentication.py)
+AUTH_TOKEN_TTL = 60 * 60 * 24 * 7
+AUTH_TOKEN_CACHE_ALIAS = 'default'
+# Скільки секунд воркер тримає копію стану токенів користувача (відкликання
+# з інших воркерів на local-memory кеші видно із цією затримкою)
+AUTH_TOKEN_STATE_TIMEOUT = 30
+
+# Пул для хешування паролів (див. api/hashing.py)
+AUTH_HASH_WORKERS = None  # None = половина ядер
+AUTH_HASH_MAX_QUEUE = 64
+
+# Час запитів (див. api/timing.py)
+REQUEST_TIMING_HEADER = True
+REQUEST_TIMING_SAMPLE_RATE = float(os.environ.get('REQUEST_TIMING_SAMPLE_RATE', '0.01'))
+REQUEST_TIMING_SLOW_MS = 500
+REQUEST_TIMING_DUPLICATE_QUERIES = 5
+
+# Prometheus: спільна тека для файлів метрик усіх воркерів (див. api/metrics.py)
+METRICS_DIR = os.environ.get('METRICS_DIR') or None
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or None
+# /metrics без автентифікації - лише якщо це явно дозволено
+METRICS_PUBLIC = os.environ.get('METRICS_PUBLIC') == '1'
+
+# Профілювання запитів на вимогу (див. api/profiling.py)
+PROFILING_DIR = os.environ.get('PROFILING_DIR') or None
+PROFILING_MAX_PROFILES = 100
+PROFILING_SAMPLE_INTERVAL = 0.002
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api': {
+            'handlers': ['console'],
+            'level': os.environ.get('API_LOG_LEVEL', 'INFO'),
+        },
+        # manage.py test: повільні запити (хешування паролів) і N+1 не друкуються
+        # між крапками тестів; assertLogs сам знижує рівень на час перевірки
+        'api.timing': {
+            'level': 'ERROR' if sys.argv[1:2] == ['test'] else 'NOTSET',
+        },
+    },
 }
 
 CORS_ALLOW_ALL_ORIGINS = True
@@ -3,17 +3,40 @@ from django.urls import path
 from django.conf import settings
 from django.conf.urls.static import static
 
-from api.views import register, login, manage_posts, get_post_detail 
+from api.metrics import metrics_view
+from api.views import (
+    register, login, logout, manage_posts, bulk_create_posts, get_post_detail, get_posts_batch, post_changes,
+    search_posts, export_dorm,
+)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     
+    # Prometheus
+    path('metrics', metrics_view),
+    
     # AUTH
     path('api/auth/register/', register),
     path('api/auth/login/', login),
+    path('api/auth/logout/', logout),
     
     path('api/posts/<int:post_id>/', get_post_detail),
     
+    # Кілька постів одним запитом (?ids=1,2,3)
+    path('api/posts/batch/', get_posts_batch),
+    
+    # Дельта-синхронізація (лише зміни після водяного знака)
+    path('api/posts/changes/', post_changes),
+    
+    # Пакетне створення постів
+    path('api/posts/bulk/', bulk_create_posts),
+    
+    # Пошук по постах гуртожитку
+    path('api/posts/search/', search_posts),
+    
+    # Експорт гуртожитку для персоналу (gzip NDJSON)
+    path('api/dorms/<int:dorm_number>/export/', export_dorm),
+    
     # POSTS (Загальний список та створення)
     path('api/posts/', manage_posts), 
     
@@ -0,0 +1,18 @@
+"""
+URL configuration for the ASGI deployment.
+
+Same routes as ``myproject.urls``, except that login and registration are
+served by the async views, which hash passwords off the event loop.
+"""
+
+from django.urls import path
+
+from api import async_views
+
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    # AUTH (async)
+    path('api/auth/register/', async_views.register),
+    path('api/auth/login/', async_views.login),
+] + sync_urlpatterns